@@ -1,5 +1,7 @@
 from .plugin import Plugins, Plugin
 from .files import FSFile
+from .local import LocalPlugin
 (Plugin, FSFile)
 
 plugins = Plugins()
+plugins.register(LocalPlugin)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import errno
+import logging
+import os
+
+from django.utils.lru_cache import lru_cache
+
+from .manifest import hash_file
+from .mirror import copy_file, link_file
+
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = "__blobs__"
+
+
+class BlobStore(object):
+    """Content-addressed store of files, keyed by the md5 of their content.
+
+    Files in local checkouts are hard linked to the blob with their content,
+    so each content is only stored once, and the key of a linked file can be
+    found without hashing it again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__keys__ = {}
+        self._scanned = False
+
+    def __str__(self):
+        return "<BlobStore: %s>" % self.path
+
+    def add(self, file_path):
+        """
+        Link a file to the blob with its content, adding the blob if it does
+        not exist
+
+        :returns key: The key of the file's content
+        """
+        key = hash_file(file_path)
+        blob_path = self.get_path(key)
+        file_stat = os.stat(file_path)
+        blob_stat = self._stat(blob_path)
+        if blob_stat is None:
+            if file_stat.st_nlink > 1:
+                # the file is linked from outside the store and may be
+                # written to in place, so the blob must be a copy
+                copy_file(file_path, blob_path)
+                linked = link_file(blob_path, file_path)
+            else:
+                linked = link_file(file_path, blob_path)
+        elif blob_stat.st_ino != file_stat.st_ino:
+            linked = link_file(blob_path, file_path)
+        else:
+            linked = True
+        if linked:
+            blob_stat = os.stat(blob_path)
+            self.__keys__[(blob_stat.st_dev, blob_stat.st_ino)] = key
+        return key
+
+    def get_key(self, file_path):
+        """
+        Get the key of the blob that a file is linked to, without reading
+        the file
+
+        :returns key: The key, or ``None`` if the file is not linked to a
+          blob
+        """
+        file_stat = self._stat(file_path)
+        if file_stat is None or file_stat.st_nlink < 2:
+            return
+        ident = (file_stat.st_dev, file_stat.st_ino)
+        if ident not in self.__keys__ and not self._scanned:
+            self.scan()
+        key = self.__keys__.get(ident)
+        if key is None:
+            return
+        # the blob may have been pruned by another process
+        blob_stat = self._stat(self.get_path(key))
+        if blob_stat is not None and blob_stat.st_ino == file_stat.st_ino:
+            return key
+        self.__keys__.pop(ident, None)
+
+    def get_path(self, key):
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def prune(self):
+        """
+        Remove blobs that are no longer linked to any file
+
+        :returns removed: The number of blobs removed
+        """
+        removed = 0
+        for key, blob_path, blob_stat in self._blobs():
+            if blob_stat.st_nlink == 1:
+                os.unlink(blob_path)
+                self.__keys__.pop((blob_stat.st_dev, blob_stat.st_ino), None)
+                removed += 1
+        logger.debug("Pruned %s blobs from %s" % (removed, self))
+        return removed
+
+    def scan(self):
+        """Find the keys of the blobs in the store"""
+        for key, blob_path, blob_stat in self._blobs():
+            self.__keys__[(blob_stat.st_dev, blob_stat.st_ino)] = key
+        self._scanned = True
+
+    def _blobs(self):
+        if not os.path.exists(self.path):
+            return
+        for prefix in os.listdir(self.path):
+            directory = os.path.join(self.path, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.startswith("."):
+                    # partly written blob
+                    continue
+                blob_path = os.path.join(directory, name)
+                blob_stat = self._stat(blob_path)
+                if blob_stat is not None:
+                    yield prefix + name, blob_path, blob_stat
+
+    def _stat(self, path):
+        try:
+            return os.stat(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+
+@lru_cache(maxsize=None)
+def get_blob_store(path):
+    """The shared ``BlobStore`` at ``path``"""
+    return BlobStore(path)
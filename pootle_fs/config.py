@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from collections import OrderedDict
+from ConfigParser import ConfigParser, Error as ConfigParserError
+from hashlib import sha1
+import io
+import threading
+
+from .exceptions import ConfigurationError
+
+
+def copy_config(config):
+    copied = ConfigParser()
+    for k, v in config.defaults().items():
+        copied.set("DEFAULT", k, v)
+    for section in config.sections():
+        copied.add_section(section)
+        for k, v in config.items(section, raw=True):
+            copied.set(section, k, v)
+    return copied
+
+
+def parse_config(content):
+    """
+    Parse and validate the content of a ``.pootle.ini``
+
+    :raises ConfigurationError: If the config cannot be parsed or is missing
+      required options
+    :return config: ``ConfigParser`` instance
+    """
+    config = ConfigParser()
+    try:
+        config.readfp(io.BytesIO(content))
+    except ConfigParserError as e:
+        raise ConfigurationError("Unable to parse config: %s" % e)
+    if not config.has_section("default"):
+        raise ConfigurationError("Config must have a [default] section")
+    for section in config.sections():
+        if not config.has_option(section, "translation_path"):
+            raise ConfigurationError(
+                "Config section [%s] must have a translation_path"
+                % section)
+    return config
+
+
+class ConfigCache(object):
+    """Process-wide cache of parsed configs, keyed by a hash of the config
+    content.
+
+    Each call to ``get`` returns a copy of the cached config, so callers can
+    change it without affecting other projects using the same config.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.__configs__ = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, content):
+        return self.get_key(content) in self.__configs__
+
+    def __len__(self):
+        return len(self.__configs__)
+
+    def clear(self):
+        with self._lock:
+            self.__configs__.clear()
+
+    def get(self, content):
+        """
+        Get a parsed config for ``content``, parsing it if it is not cached
+
+        :raises ConfigurationError: If the config is not valid
+        :return config: ``ConfigParser`` instance
+        """
+        key = self.get_key(content)
+        with self._lock:
+            config = self.__configs__.pop(key, None)
+            if config is not None:
+                self.__configs__[key] = config
+        if config is None:
+            config = parse_config(content)
+            with self._lock:
+                self.__configs__[key] = config
+                while len(self.__configs__) > self.maxsize:
+                    self.__configs__.popitem(last=False)
+        return copy_config(config)
+
+    def get_key(self, content):
+        return sha1(content).hexdigest()
+
+
+config_cache = ConfigCache()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from collections import OrderedDict
+from hashlib import md5
+import json
+
+
+def get_unit_fingerprint(unit):
+    """Hash of the parts of a translation unit that Pootle stores"""
+    return md5(
+        json.dumps(
+            [unit.source,
+             unit.target,
+             unit.getcontext(),
+             unit.getnotes(),
+             unit.getlocations(),
+             unit.isfuzzy(),
+             unit.isobsolete()])).hexdigest()
+
+
+def get_unit_fingerprints(ttk_store):
+    """Fingerprints of the translatable units of a ``translate`` store keyed
+    by unit id.
+    """
+    fingerprints = OrderedDict()
+    for unit in ttk_store.units:
+        if unit.isheader() or unit.isobsolete() or not unit.source:
+            continue
+        fingerprints[unit.getid()] = get_unit_fingerprint(unit)
+    return fingerprints
+
+
+def dump_fingerprints(fingerprints):
+    return json.dumps(fingerprints.items(), separators=(",", ":"))
+
+
+def load_fingerprints(data):
+    if not data:
+        return None
+    return OrderedDict(json.loads(data))
+
+
+class UnitDelta(object):
+    """Units added, changed and removed between two sets of unit
+    fingerprints.
+    """
+
+    def __init__(self, previous, current):
+        self.added = [
+            uid for uid in current
+            if uid not in previous]
+        self.changed = [
+            uid for uid, fingerprint in current.items()
+            if uid in previous and previous[uid] != fingerprint]
+        self.removed = [
+            uid for uid in previous
+            if uid not in current]
+        self.unchanged = len(current) - len(self.added) - len(self.changed)
+
+    def __len__(self):
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def __str__(self):
+        return (
+            "<UnitDelta: added: %s, changed: %s, removed: %s>"
+            % (len(self.added), len(self.changed), len(self.removed)))
+
+    @property
+    def has_changed(self):
+        return len(self) > 0
@@ -9,3 +9,14 @@
 
 class MissingPluginError(KeyError):
     pass
+
+
+class ConfigurationError(ValueError):
+    pass
+
+
+class StoreFSConflict(Exception):
+    """A ``StoreFS`` was changed or removed by another worker since it was
+    loaded
+    """
+    pass
@@ -6,13 +6,18 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import functools
+from hashlib import md5
 import logging
 import os
 
+from django.db.models import F
+from django.utils import timezone
 from django.utils.functional import cached_property
 
 from translate.storage.factory import getclass
 
+from pootle.core.models import Revision
 from pootle_app.models import Directory
 from pootle_language.models import Language
 from pootle_statistics.models import SubmissionTypes
@@ -20,14 +25,36 @@ from pootle_store.models import Store
 from pootle_store import models as store_models
 from pootle_translationproject.models import TranslationProject
 
+from .delta import UnitDelta, get_unit_fingerprints
+from .identity import get_identity_map, lookup
+from .manifest import get_signature
 from .models import FS_WINS, POOTLE_WINS, StoreFS
 
 
 logger = logging.getLogger(__name__)
 
 
+def memoized(f):
+    """Memoize an ``FSFile`` method until the file's cache is cleared"""
+
+    @functools.wraps(f)
+    def method_wrapper(self):
+        if f.__name__ not in self._cache:
+            self._cache[f.__name__] = f(self)
+        return self._cache[f.__name__]
+    return method_wrapper
+
+
 class FSFile(object):
 
+    # Largest delta, as a proportion of the file's units, that is applied
+    # unit by unit when pulling - larger deltas use ``Store.update``
+    delta_threshold = 0.5
+
+    # set where ``latest_hash`` is the md5 of the file content, so that the
+    # hash of content written by Pootle is found without reading the file
+    hashes_content = False
+
     def __init__(self, store_fs):
         """
         :param store_fs: ``FSStore`` object
@@ -38,12 +65,42 @@ class FSFile(object):
         self.store_fs = store_fs
         self.pootle_path = store_fs.pootle_path
         self.path = store_fs.path
+        # content of the file as last read or written by a sync
+        self.synced_content = None
+        self._cache = {}
 
     def __str__(self):
         return "<%s: %s::%s>" % (
             self.__class__.__name__, self.pootle_path, self.path)
 
     @property
+    def base_store(self):
+        """
+        The file as it was when last synced, parsed from its snapshot
+
+        :returns: A ``translate`` store or ``None`` if there is no snapshot
+        """
+        content = self.plugin.snapshots.get(self.store_fs)
+        if content is not None:
+            return getclass(self.file_path)(content)
+
+    @property
+    def current_hash(self):
+        """
+        The ``latest_hash`` of the file, memoized while the size and mtime of
+        the file are unchanged
+
+        The plugin reuses the hash between syncs while the file is unchanged
+        """
+        signature = get_signature(self.file_path)
+        memo = self._cache.get("current_hash")
+        if signature is None or memo is None or memo[0] != signature:
+            memo = (signature, self.plugin.get_file_hash(self))
+            self._cache["current_hash"] = memo
+        return memo[1]
+
+    @property
+    @memoized
     def directory(self):
         if self.store_fs.store:
             return self.store_fs.store.parent
@@ -76,13 +133,13 @@ class FSFile(object):
             self.fs.plugin.local_fs_path,
             self.path.strip("/"))
 
-    @cached_property
+    @property
     def fs(self):
-        return self.project.fs.get()
+        return self.store_fs.fs
 
     @property
     def fs_changed(self):
-        latest_hash = self.latest_hash
+        latest_hash = self.current_hash
         return (
             latest_hash
             and (
@@ -93,7 +150,7 @@ class FSFile(object):
     def language(self):
         if self.store_fs.store:
             return self.store_fs.store.translation_project.language
-        return Language.objects.get(code=self.pootle_path.split("/")[1])
+        return lookup(Language, "code", self.pootle_path.split("/")[1])
 
     @property
     def latest_hash(self):
@@ -108,7 +165,7 @@ class FSFile(object):
         return (
             self.store
             and (
-                self.store.get_max_unit_revision()
+                self.store_revision
                 != self.store_fs.last_sync_revision))
 
     @property
@@ -116,16 +173,27 @@ class FSFile(object):
         return self.store_fs.project
 
     @property
+    @memoized
     def store(self):
         if self.store_fs.store:
             return self.store_fs.store
         try:
-            return Store.objects.get(
-                pootle_path=self.pootle_path)
+            return lookup(Store, "pootle_path", self.pootle_path)
         except Store.DoesNotExist:
             return
 
     @property
+    @memoized
+    def store_revision(self):
+        """
+        The max unit revision of the ``Store``, memoized until the ``Store``
+        is changed
+        """
+        if self.store:
+            return self.store.get_max_unit_revision()
+
+    @property
+    @memoized
     def translation_project(self):
         if self.store_fs.store:
             return self.store_fs.store.translation_project
@@ -140,6 +208,111 @@ class FSFile(object):
         self.store_fs.resolve_conflict = POOTLE_WINS
         self.store_fs.save()
 
+    def apply_delta(self, tmp_store, fingerprints):
+        """
+        Update the ``Store`` with only the units that have been added, changed
+        or removed in the file since it was last synced.
+
+        The delta is not applied, and ``False`` is returned, if the file has
+        no fingerprints or snapshot from a previous sync, if the ``Store`` has
+        changed since the last sync, or if the delta is bigger than
+        ``delta_threshold``.
+
+        :param tmp_store: The parsed file
+        :param fingerprints: Unit fingerprints of the parsed file
+        :returns: ``True`` if the delta was applied
+        """
+        previous = self.store_fs.unit_fingerprints
+        if previous is None:
+            base_store = self.base_store
+            if base_store is not None:
+                previous = get_unit_fingerprints(base_store)
+        if previous is None or self.pootle_changed:
+            return False
+        delta = UnitDelta(previous, fingerprints)
+        if len(delta) > self.delta_threshold * max(len(fingerprints), 1):
+            return False
+        units = {
+            unit.unitid: unit
+            for unit
+            in self.store.unit_set.filter(
+                unitid_hash__in=[
+                    md5(uid.encode("utf-8")).hexdigest()
+                    for uid
+                    in delta.added + delta.changed + delta.removed])}
+        # units must match what was last synced - added or changed units
+        # may be obsolete in the Store, which only ``Store.update`` handles
+        in_sync = (
+            not any(uid in units for uid in delta.added)
+            and all(uid in units for uid in delta.changed + delta.removed)
+            and not any(units[uid].isobsolete() for uid in delta.changed))
+        if not in_sync:
+            return False
+        logger.debug("Applying %s: %s" % (delta, self.path))
+        if not delta.has_changed:
+            return True
+        user = self.plugin.pootle_user
+        current_time = timezone.now()
+        updated = []
+        for uid in delta.changed:
+            unit = units[uid]
+            old_target = unit.target_f
+            old_state = unit.state
+            if unit.update(tmp_store.findid(uid), user=user):
+                updated.append((unit, old_target, old_state))
+        if not (updated or delta.added or delta.removed):
+            # only fields that Pootle does not keep have changed
+            return True
+        revision = Revision.incr()
+        for uid in delta.removed:
+            unit = units[uid]
+            unit.makeobsolete()
+            unit.revision = revision
+            unit.save()
+        for unit, old_target, old_state in updated:
+            unit.revision = revision
+            unit.save()
+            # recorded as ``Store.update`` records a pulled unit
+            self.store.record_submissions(
+                unit, old_target, old_state, current_time, user,
+                SubmissionTypes.UPLOAD)
+        # added units are put at their position in the file, as
+        # ``Store.update`` does
+        positions = {
+            unit.getid(): index
+            for index, unit in enumerate(tmp_store.units)}
+        for uid in delta.added:
+            index = positions[uid]
+            self.store.unit_set.filter(index__gte=index).update(
+                index=F("index") + 1)
+            self.store.addunit(
+                tmp_store.findid(uid), index, user=user,
+                update_revision=revision)
+        self._cache["store_revision"] = revision
+        return True
+
+    def get_content_hash(self, content):
+        """
+        The ``latest_hash`` that the file has with ``content``
+
+        :returns: The md5 of ``content`` if ``hashes_content`` is set, or
+          else ``None`` as the hash can only be found from the file
+        """
+        if self.hashes_content:
+            return md5(content).hexdigest()
+
+    def clear_cache(self, *keys):
+        """
+        Clear memoized values for this file - call when the file or
+        ``Store`` changes.
+
+        :param keys: Names of the values to clear, defaults to all
+        """
+        if not keys:
+            self._cache.clear()
+        for k in keys:
+            self._cache.pop(k, None)
+
     def create_store(self):
         """
         Creates a ```Store``` and if necessary the ```TranslationProject```
@@ -154,6 +327,7 @@ class FSFile(object):
                 language=self.language)
             tp.directory.obsolete = False
             tp.directory.save()
+            self.clear_cache("translation_project", "directory")
         if not self.directory:
             directory = self.translation_project.directory
             if self.directory_path:
@@ -163,6 +337,7 @@ class FSFile(object):
                     if created:
                         logger.debug(
                             "Created directory: %s" % directory.path)
+            self.clear_cache("directory")
         if not self.store:
             store, created = Store.objects.get_or_create(
                 parent=self.directory, name=self.filename,
@@ -170,6 +345,10 @@ class FSFile(object):
             if created:
                 store.save()
                 logger.debug("Created Store: %s" % store.pootle_path)
+            identities = get_identity_map()
+            if identities is not None:
+                identities.add(Store, "pootle_path", store)
+            self.clear_cache("store", "store_revision")
         if not self.store_fs.store == self.store:
             self.store_fs.store = self.store
             self.store_fs.save()
@@ -184,8 +363,10 @@ class FSFile(object):
         if store and store.pk:
             store.makeobsolete()
         if self.store_fs.pk:
+            self.plugin.snapshots.delete(self.store_fs)
             self.store_fs.delete()
         self.remove_file()
+        self.clear_cache()
 
     def fetch(self):
         """
@@ -198,22 +379,75 @@ class FSFile(object):
         self.store_fs.save()
         return self.store_fs
 
+    def merge(self, pootle_wins=False):
+        """
+        Merge the FS file and the ``Store``, and write the result to both.
+
+        The file is parsed once and merged into the ``Store``, and the merged
+        ``Store`` is then serialized once to the file.
+
+        The hash of the file and the revision of the ``Store`` are then taken
+        from the serialized content and the ``Store.update``, rather than
+        read back from the file and database.
+        """
+        logger.debug("Merging file: %s" % self.path)
+        self.update_store(
+            self.read_store(), pootle_wins=pootle_wins, merge=True)
+        self.sync_from_pootle()
+        self.on_sync(self.current_hash, self.store_revision)
+
+    def merge_base(self, tmp_store):
+        """
+        Three-way merge a parsed file with its snapshot from the last sync.
+
+        Units that have not changed in the file since the last sync take
+        their translation from the ``Store``, so that only units changed in
+        both the file and the ``Store`` are conflicts.
+
+        :param tmp_store: The parsed file, which is updated in place
+        :returns: ``False`` if there is no snapshot to merge with
+        """
+        base_store = self.base_store
+        if base_store is None:
+            return False
+        base = get_unit_fingerprints(base_store)
+        unchanged = set(
+            uid for uid, fingerprint
+            in get_unit_fingerprints(tmp_store).items()
+            if base.get(uid) == fingerprint)
+        pootle_changed = self.store.unit_set.filter(
+            revision__gt=self.store_fs.last_sync_revision or 0)
+        for unit in pootle_changed.iterator():
+            if unit.unitid not in unchanged:
+                continue
+            tmp_unit = tmp_store.findid(unit.unitid)
+            tmp_unit.target = unit.target
+            tmp_unit.markfuzzy(unit.isfuzzy())
+        return True
+
     def on_sync(self, latest_hash, revision):
         """
         Called after FS and Pootle have been synced
+
+        The content that was read or written in the sync is saved as the
+        snapshot to merge with in the next sync.
         """
         self.store_fs.resolve_conflict = None
         self.store_fs.staged_for_merge = False
         self.store_fs.last_sync_hash = latest_hash
         self.store_fs.last_sync_revision = revision
         self.store_fs.save()
+        if self.synced_content is not None:
+            self.plugin.snapshots.save(
+                self.store_fs, latest_hash, self.synced_content)
+            self.synced_content = None
         logger.debug("File synced: %s" % self.path)
 
     def pull(self):
         """
         Pull FS file into Pootle
         """
-        current_hash = self.latest_hash
+        current_hash = self.current_hash
         last_hash = self.store_fs.last_sync_hash
         if self.store and last_hash == current_hash:
             return
@@ -229,12 +463,12 @@ class FSFile(object):
         """
         Push Pootle ``Store`` into FS
         """
-        current_revision = self.store.get_max_unit_revision()
+        current_revision = self.store_revision
         last_revision = self.store_fs.last_sync_revision
         if self.exists and last_revision == current_revision:
             return
         logger.debug("Pushing file: %s" % self.path)
-        directory = os.path.dirname(self.store_fs.file.file_path)
+        directory = os.path.dirname(self.file_path)
         if not os.path.exists(directory):
             logger.debug("Creating directory: %s" % directory)
             os.makedirs(directory)
@@ -244,39 +478,104 @@ class FSFile(object):
         with open(self.file_path) as f:
             return f.read()
 
+    def write(self, content):
+        """
+        Write ``content`` to the FS file
+
+        The file is replaced rather than written in place, so that any hard
+        links to it are not changed. The ``current_hash`` is found from
+        ``content`` where possible, rather than by hashing the file again.
+        """
+        tmp_path = os.path.join(
+            os.path.dirname(self.file_path),
+            ".%s.%s.tmp" % (os.path.basename(self.file_path), os.getpid()))
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(content)
+            os.rename(tmp_path, self.file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self.clear_cache("current_hash")
+        content_hash = self.get_content_hash(content)
+        if content_hash is not None:
+            self._cache["current_hash"] = (
+                get_signature(self.file_path), content_hash)
+
+    def read_store(self):
+        """
+        Parse the FS file
+
+        :returns: A ``translate`` store
+        """
+        with open(self.file_path) as f:
+            return getclass(f)(f.read())
+
     def remove_file(self):
         if self.exists:
             os.unlink(self.file_path)
+            self.clear_cache("current_hash")
+            self.plugin.on_file_changed(self.path)
 
     def sync_from_pootle(self):
         """
         Update FS file with the serialized content from Pootle ```Store```
         """
-        with open(self.file_path, "w") as f:
-            f.write(self.store.serialize())
+        content = self.store.serialize()
+        self.write(content)
+        self.synced_content = content
+        self.store_fs.unit_fingerprints = get_unit_fingerprints(
+            getclass(self.file_path)(content))
+        self.plugin.on_file_changed(self.path)
         logger.debug("Pushed file: %s" % self.path)
 
     def sync_to_pootle(self, pootle_wins=False, merge=False):
         """
         Update Pootle ``Store`` with the parsed FS file.
+
+        When not merging, only the units that have changed since the last
+        sync are applied if possible - see ``apply_delta``.
+        """
+        content = self.read()
+        tmp_store = getclass(self.file_path)(content)
+        fingerprints = get_unit_fingerprints(tmp_store)
+        if merge or not self.apply_delta(tmp_store, fingerprints):
+            self.update_store(tmp_store, pootle_wins=pootle_wins, merge=merge)
+        self.store_fs.unit_fingerprints = fingerprints
+        logger.debug("Pulled file: %s" % self.path)
+        self.synced_content = content
+        self.on_sync(self.current_hash, self.store_revision)
+
+    def update_store(self, tmp_store, pootle_wins=False, merge=False):
+        """
+        Update the ``Store`` from a parsed file with ``Store.update``.
+
+        When merging, units updated in Pootle since the last sync are
+        conflicts, resolved according to ``pootle_wins``. If there is a
+        snapshot of the file from the last sync, only units that have also
+        changed in the file are conflicts - see ``merge_base``.
         """
         resolve_conflict = (
             pootle_wins
             and store_models.POOTLE_WINS
             or store_models.FILE_WINS)
-        with open(self.file_path) as f:
-            if merge:
-                revision = self.store_fs.last_sync_revision
-            else:
-                revision = self.store.get_max_unit_revision() + 1
-            tmp_store = getclass(f)(f.read())
-            self.store.update(
-                tmp_store,
-                submission_type=SubmissionTypes.UPLOAD,
-                user=self.plugin.pootle_user,
-                store_revision=revision,
-                resolve_conflict=resolve_conflict)
-        logger.debug("Pulled file: %s" % self.path)
-        self.on_sync(
-            self.latest_hash,
-            self.store.get_max_unit_revision())
+        if merge:
+            revision = self.store_fs.last_sync_revision
+            self.merge_base(tmp_store)
+        else:
+            revision = self.store_revision + 1
+        updated = self.store.update(
+            tmp_store,
+            submission_type=SubmissionTypes.UPLOAD,
+            user=self.plugin.pootle_user,
+            store_revision=revision,
+            resolve_conflict=resolve_conflict)
+        if not isinstance(updated, tuple):
+            # older versions of Pootle do not return the revision and
+            # changes of the update
+            self.clear_cache("store_revision")
+            return
+        update_revision, changes = updated
+        if any(changes.values()):
+            # changed units are saved with the revision of the update
+            self._cache["store_revision"] = update_revision
@@ -39,21 +39,86 @@ class TranslationFileFinder(object):
             file_root = "/".join(file_root.split("/")[:-1])
         return file_root.rstrip("/")
 
-    def find(self):
+    @cached_property
+    def lang_dir_regex(self):
+        """
+        Regex that matches paths below the directory named by ``<lang>``, or
+        ``None`` if ``<lang>`` is part of the file name or the depth of its
+        directory is not fixed
+        """
+        head, tail = self.translation_path.split("<lang>", 1)
+        if "<" in head or "/" not in tail:
+            return
+        rest = tail.split("/", 1)[0]
+        if "<" in rest:
+            # only a <directory_path> can follow the <lang> directory
+            if not rest.startswith("<directory_path>"):
+                return
+            rest = ""
+        return re.compile(
+            r"%s(?P<lang>[\w\-\.]*)%s/" % (re.escape(head), re.escape(rest)))
+
+    def find(self, include_lang=None):
+        """
+        Find the files that match the translation path
+
+        :param include_lang: Function that takes a matched ``<lang>`` and
+          returns ``False`` if files for that language should be skipped.
+          Where ``<lang>`` names a directory, the directories of skipped
+          languages are not walked.
+        :yields file_path, matched:
+        """
         # print("Walking the FS: %s" % self.file_root)
         for root, dirs, files in os.walk(self.file_root):
+            if include_lang is not None:
+                dirs[:] = [
+                    d for d in dirs
+                    if self.include_path(
+                        os.path.join(root, d, ""), include_lang)]
             for filename in files:
                 file_path = os.path.join(root, filename)
-                match = self.match(file_path)
-                if match:
-                    matched = match.groupdict()
-                    matched["directory_path"] = (
-                        matched.get("directory_path", "").strip("/"))
-                    if not matched.get("filename"):
-                        matched["filename"] = os.path.splitext(
-                            os.path.basename(filename))[0]
-                    if matched["ext"]:
-                        yield file_path, matched
+                matched = self.match_file(file_path)
+                if not matched:
+                    continue
+                if include_lang is None or include_lang(matched["lang"]):
+                    yield file_path, matched
+
+    def get_dir_lang(self, path):
+        """
+        The ``<lang>`` of the language directory that ``path`` is below, or
+        ``None``. Directory paths should end with ``/``.
+        """
+        if self.lang_dir_regex is not None:
+            match = self.lang_dir_regex.match(path)
+            if match:
+                return match.group("lang")
+
+    def include_path(self, path, include_lang):
+        """
+        Check whether ``path`` is below the directory of a language that
+        ``include_lang`` includes, or is not in a language directory
+        """
+        lang = self.get_dir_lang(path)
+        return lang is None or include_lang(lang)
+
+    def match_file(self, file_path):
+        """
+        Match a file path against the translation path
+
+        :returns: A dictionary of the matched parts of the path, or ``None``
+          if it does not match
+        """
+        match = self.match(file_path)
+        if not match:
+            return
+        matched = match.groupdict()
+        matched["directory_path"] = (
+            matched.get("directory_path", "").strip("/"))
+        if not matched.get("filename"):
+            matched["filename"] = os.path.splitext(
+                os.path.basename(file_path))[0]
+        if matched["ext"]:
+            return matched
 
     @lru_cache(maxsize=None)
     def match(self, file_path):
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from contextlib import contextmanager
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class IdentityMap(object):
+    """Objects looked up during a sync, keyed by model, field and value.
+
+    Lookups that are not found are cached as missing. Once a set of objects
+    has been preloaded with ``complete`` set, lookups in that set that are
+    not found are treated as missing without querying the database.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.__objects__ = {}
+        self.__complete__ = {}
+
+    def __contains__(self, k):
+        return k in self.__objects__
+
+    def __len__(self):
+        return len(self.__objects__)
+
+    def __str__(self):
+        return (
+            "<IdentityMap: %s objects, %s hits, %s misses>"
+            % (len(self), self.hits, self.misses))
+
+    def add(self, model, field, obj):
+        self.__objects__[(model, field, getattr(obj, field))] = obj
+
+    def add_all(self, model, field, objects, complete=None):
+        """
+        Add objects to the map
+
+        :param complete: ``True`` if ``objects`` contains every object for
+          ``model``, or a function that takes a value of ``field`` and returns
+          ``True`` if the value is in the range covered by ``objects``
+        """
+        for obj in objects:
+            self.add(model, field, obj)
+        if complete:
+            self.__complete__[(model, field)] = complete
+
+    def discard(self, model, field, value):
+        self.__objects__.pop((model, field, value), None)
+
+    def get(self, model, field, value):
+        """
+        Get an object of ``model`` where ``field`` matches ``value``
+
+        :raises model.DoesNotExist: If there is no matching object
+        """
+        obj = self.memoize(
+            (model, field, value),
+            lambda: self._get(model, field, value))
+        if obj is None:
+            raise model.DoesNotExist(
+                "%s matching %s=%s does not exist"
+                % (model.__name__, field, value))
+        return obj
+
+    def memoize(self, key, getter):
+        """
+        Get the object for ``key``, calling ``getter`` to get it if it is not
+        already in the map
+        """
+        if key in self.__objects__:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.__objects__[key] = getter()
+        return self.__objects__[key]
+
+    def _get(self, model, field, value):
+        complete = self.__complete__.get((model, field))
+        if complete is True or (complete and complete(value)):
+            return
+        try:
+            return model.objects.get(**{field: value})
+        except model.DoesNotExist:
+            return
+
+
+def get_identity_map():
+    """The identity map for the current sync, or ``None``"""
+    return getattr(_local, "identity_map", None)
+
+
+@contextmanager
+def identity_map():
+    """
+    Use an identity map for lookups made in this context. If an identity map
+    is already in use it is reused.
+
+    :yields identities, created: The ``IdentityMap`` and whether it was
+      created for this context
+    """
+    identities = get_identity_map()
+    if identities is not None:
+        yield identities, False
+        return
+    identities = _local.identity_map = IdentityMap()
+    try:
+        yield identities, True
+    finally:
+        _local.identity_map = None
+        logger.debug(str(identities))
+
+
+@contextmanager
+def use_identity_map(identities):
+    """
+    Use an existing identity map for lookups made in this context. If an
+    identity map is already in use, or ``identities`` is ``None``, lookups
+    are not changed.
+    """
+    if identities is None or get_identity_map() is not None:
+        yield
+        return
+    _local.identity_map = identities
+    try:
+        yield
+    finally:
+        _local.identity_map = None
+
+
+def lookup(model, field, value):
+    """
+    Get an object of ``model`` where ``field`` matches ``value``, using the
+    current identity map if there is one
+
+    :raises model.DoesNotExist: If there is no matching object
+    """
+    identities = get_identity_map()
+    if identities is None:
+        return model.objects.get(**{field: value})
+    return identities.get(model, field, value)
+
+
+def memoize(key, getter):
+    """
+    Memoize the result of ``getter`` in the current identity map if there is
+    one
+    """
+    identities = get_identity_map()
+    if identities is None:
+        return getter()
+    return identities.memoize(key, getter)
@@ -10,10 +10,11 @@ from collections import OrderedDict
 import logging
 
 from django.utils.functional import cached_property
-from django.utils.lru_cache import lru_cache
 
 from pootle_language.models import Language
 
+from .identity import lookup
+
 
 LANG_MAP_PRESETS = {
     "foo": (
@@ -62,11 +63,10 @@ class LanguageMapper(object):
                 return fs_code
         return pootle_code
 
-    @lru_cache(maxsize=None)
     def get_lang(self, lang_code):
         try:
-            return Language.objects.get(
-                code=self.get_pootle_code(lang_code))
+            return lookup(
+                Language, "code", self.get_pootle_code(lang_code))
         except Language.DoesNotExist:
             return None
 
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+from django.conf import settings
+
+from .files import FSFile
+from .manifest import hash_file
+from .mirror import mirror_paths
+from .plugin import PULL_DIR, Plugin
+
+
+class LocalFSFile(FSFile):
+    hashes_content = True
+
+    @property
+    def latest_hash(self):
+        return self.plugin.hash_path(self.path)
+
+
+class LocalPlugin(Plugin):
+    """Syncs with a directory on the Pootle server, set as the ``url`` of
+    the ``ProjectFS``.
+
+    Only the files that changed in the FS directory since the last pull are
+    mirrored to the local checkout, and only the files changed by a sync are
+    mirrored back when pushing. Files are hard linked rather than copied
+    where the filesystem allows it.
+    """
+
+    name = "local"
+    file_class = LocalFSFile
+    link_files = True
+    # languages of the last sparse pull in this process
+    _sparse_langs = None
+
+    @property
+    def fs_manifest(self):
+        """A ``CheckoutManifest`` of the FS directory as it was last pulled"""
+        return self.manifest_class(
+            self.fs.url,
+            os.path.join(
+                settings.POOTLE_FS_PATH,
+                PULL_DIR,
+                "%s.fs.manifest" % self.fs.project.code))
+
+    def clear_repo(self):
+        super(LocalPlugin, self).clear_repo()
+        self.fs_manifest.clear()
+
+    def hash_path(self, path):
+        """
+        The key of the blob that the file is linked to, or else the md5 of
+        its content
+        """
+        file_path = os.path.join(self.local_fs_path, path.lstrip("/"))
+        if os.path.exists(file_path):
+            key = self.blobs is not None and self.blobs.get_key(file_path)
+            return key or hash_file(file_path)
+
+    def pull(self):
+        """
+        Mirror the files that changed in the FS directory to the local
+        checkout
+
+        With ``POOTLE_FS_SPARSE`` set, the directories of languages that are
+        not in Pootle are left out of the checkout. The whole directory is
+        mirrored again when the languages change.
+
+        :returns changes: ``PathChanges`` made to the local checkout
+        """
+        fs_manifest = self.fs_manifest.load()
+        fs_changes = fs_manifest.scan()
+        include = self.get_sparse_filter()
+        sparse_langs = None
+        if include is not None:
+            sparse_langs = self.get_language_codes()
+        full = (
+            fs_changes is None
+            or not self.checkout_manifest.version
+            or sparse_langs != self._sparse_langs)
+        changes = mirror_paths(
+            self.fs.url, self.local_fs_path,
+            None if full else fs_changes,
+            link=self.link_files, include=include)
+        fs_manifest.save()
+        self._sparse_langs = sparse_langs
+        return changes
+
+    def push(self, response=None, paths=None):
+        """
+        Mirror the files written to and removed from the local checkout by
+        the sync to the FS directory
+
+        Without ``paths`` every file in the local checkout is mirrored, but
+        nothing is removed from the FS directory, as files missing from the
+        checkout may have been added to the FS since it was pulled.
+
+        With ``POOTLE_FS_SPARSE`` set, the directories of languages that are
+        left out of the checkout are left alone in the FS directory.
+
+        Files in a ``BlobStore`` are copied rather than linked, as the FS
+        directory may be written to in place.
+        """
+        include = self.get_sparse_filter()
+        if include is not None and paths is not None:
+            paths = [path for path in paths if include(path)]
+        mirror_paths(
+            self.local_fs_path, self.fs.url, paths,
+            link=self.link_files and self.blobs is None,
+            include=include, prune=paths is not None)
+        return response
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import errno
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_DIR = "__locks__"
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class FileLock(object):
+    """Exclusive lock shared by the threads of a process, and by processes on
+    the same host through ``flock`` on a lock file.
+
+    Where ``fcntl`` is not available the lock only works within a process.
+    """
+
+    poll_interval = 0.05
+    _thread_locks = {}
+    _thread_locks_lock = threading.Lock()
+
+    def __init__(self, path, timeout=None):
+        """
+        :param timeout: Seconds to wait for the lock when used as a context
+          manager, or ``None`` to wait forever
+        """
+        self.path = path
+        self.timeout = timeout
+        self._fd = None
+        with self._thread_locks_lock:
+            self._thread_lock = self._thread_locks.setdefault(
+                path, threading.Lock())
+
+    def __enter__(self):
+        if not self.acquire(timeout=self.timeout):
+            raise LockTimeout(
+                "Timed out waiting for lock: %s" % self.path)
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    @property
+    def locked(self):
+        return self._fd is not None
+
+    def acquire(self, blocking=True, timeout=None):
+        """
+        :param blocking: Wait for the lock if it is held
+        :param timeout: Seconds to wait for the lock, or ``None`` to wait
+          forever
+        :return acquired: ``True`` if the lock was acquired
+        """
+        deadline = None
+        if blocking and timeout is not None:
+            deadline = time.time() + timeout
+        if not self._wait(self._thread_lock.acquire, blocking, deadline):
+            return False
+        acquired = False
+        try:
+            self._fd = self._open()
+            acquired = self._wait(self._flock, blocking, deadline)
+        finally:
+            if not acquired:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+        return acquired
+
+    def release(self):
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+            self._thread_lock.release()
+
+    def _flock(self, blocking=False):
+        if fcntl is None:
+            return True
+        flags = fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._fd, flags)
+        except IOError as e:
+            if e.errno not in (errno.EAGAIN, errno.EACCES):
+                raise
+            return False
+        return True
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        return os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _wait(self, acquire, blocking, deadline):
+        if blocking and deadline is None:
+            return acquire(True)
+        while True:
+            if acquire(False):
+                return True
+            if not blocking:
+                return False
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
@@ -7,8 +7,10 @@
 # AUTHORS file for copyright and authorship information.
 
 from optparse import make_option
+import json
 import os
 import sys
+import time
 
 from django.core.management.base import (
     BaseCommand, CommandError, OutputWrapper)
@@ -17,6 +19,7 @@ from django.utils.functional import cached_property
 
 from pootle_project.models import Project
 
+from pootle_fs.locks import LockTimeout
 from pootle_fs.models import ProjectFS
 
 
@@ -56,7 +59,13 @@ class TranslationsSubCommand(SubCommand):
             help='Filter translations by filesystem path'),
         make_option(
             '-P', '--pootle_path', action='store', dest='pootle_path',
-            help='Filter translations by Pootle path'))
+            help='Filter translations by Pootle path'),
+        make_option(
+            '--format', action='store', dest='format', default='text',
+            type='choice', choices=['text', 'jsonl'],
+            help=(
+                'Output format - "jsonl" streams a JSON record per line for '
+                'each entry as it is produced, followed by a summary')))
     option_list = SubCommand.option_list + shared_option_list
 
     @cached_property
@@ -64,6 +73,51 @@ class TranslationsSubCommand(SubCommand):
         if hasattr(self, "fs"):
             return self.fs.plugin
 
+    @property
+    def elapsed(self):
+        return round(time.time() - self.started, 3)
+
+    def handle_action(self, action, **kwargs):
+        """
+        Call the plugin ``action`` with ``kwargs`` and output the response
+
+        With ``--format=jsonl`` each action is written as it is added to the
+        response, and again if its ``complete`` status changes.
+        """
+        self.started = time.time()
+        if self.format != "jsonl":
+            return self.handle_response(getattr(self.plugin, action)(**kwargs))
+        kwargs["response"] = self.plugin.response_class(
+            self.plugin, on_change=self.write_action_record)
+        response = getattr(self.plugin, action)(**kwargs)
+        self.write_record(
+            dict(type="summary",
+                 project=self.plugin.project.code,
+                 completed={k: response.count_completed(k)
+                            for k in response},
+                 failed={k: response.count_failed(k)
+                         for k in response},
+                 elapsed=self.elapsed))
+        return response
+
+    def set_options(self, options):
+        self.format = options.get("format") or "text"
+
+    def write_action_record(self, action):
+        self.write_record(
+            dict(type="action",
+                 action=action.action_type,
+                 status=action.original_status.status,
+                 pootle_path=action.pootle_path,
+                 fs_path=action.fs_path,
+                 complete=action.complete,
+                 msg=action.msg,
+                 elapsed=self.elapsed))
+
+    def write_record(self, record):
+        self.stdout.write(json.dumps(record, sort_keys=True))
+        self.stdout.flush()
+
     def handle_added_from_pootle(self, action):
         if action.original_status.status in ["conflict", "conflict_untracked"]:
             return action.pootle_path, action.fs_path
@@ -107,9 +161,9 @@ class TranslationsSubCommand(SubCommand):
             self.style.FS_MISSING)
 
     def handle_actions(self, action_type):
-        failed = self.response.failed(action_type)
+        has_failed = self.response.count_failed(action_type)
         title = self.response.get_action_title(action_type)
-        if any(failed):
+        if has_failed:
             self.stdout.write(title, self.style.ERROR)
         else:
             self.stdout.write(title, self.style.HTTP_INFO)
@@ -122,8 +176,8 @@ class TranslationsSubCommand(SubCommand):
                 self.write_line(*handler(action))
             else:
                 self.write_line(action.pootle_path, action.fs_path)
-        if any(failed):
-            for action in failed:
+        if has_failed:
+            for action in self.response.failed(action_type):
                 self.write_line(
                     action.pootle_path,
                     action.fs_path,
@@ -150,3 +204,45 @@ class TranslationsSubCommand(SubCommand):
             self.stderr = OutputWrapper(
                 options.get('stderr', sys.stderr), self.style.ERROR)
         return self.handle(*args, **options)
+
+
+class ActionSubCommand(TranslationsSubCommand):
+    """Subcommand that changes the project, and so holds the project lock
+    while it runs
+    """
+
+    shared_option_list = (
+        make_option(
+            '--lock-timeout', action='store', dest='lock_timeout',
+            type='float',
+            help=(
+                'Seconds to wait for another command on the project to '
+                'finish, defaults to waiting until it does')),
+        make_option(
+            '--no-wait', action='store_true', dest='no_wait',
+            help='Fail if another command on the project is running'),
+        make_option(
+            '--lock-files', action='store_true', dest='lock_files',
+            help=(
+                'Lock each file that is changed instead of the project, so '
+                'that other commands can sync the project at the same time')))
+    option_list = TranslationsSubCommand.option_list + shared_option_list
+
+    def handle_action(self, action, **kwargs):
+        if self.no_wait:
+            kwargs["lock_timeout"] = 0
+        else:
+            kwargs["lock_timeout"] = self.lock_timeout
+        if self.lock_files:
+            kwargs["lock_files"] = True
+        try:
+            return super(ActionSubCommand, self).handle_action(
+                action, **kwargs)
+        except LockTimeout as e:
+            raise CommandError(str(e))
+
+    def set_options(self, options):
+        super(ActionSubCommand, self).set_options(options)
+        self.lock_timeout = options.get("lock_timeout")
+        self.no_wait = options.get("no_wait")
+        self.lock_files = options.get("lock_files")
@@ -6,8 +6,13 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from fnmatch import fnmatch
+from glob import has_magic
 import logging
+import multiprocessing
+from optparse import make_option
 import os
+import socket
 import sys
 
 
@@ -37,40 +42,89 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 from django.core.management import (
     NO_DEFAULT,
     BaseCommand, CommandError, handle_default_options)
+from django.conf import settings
 from django.core.management.base import OutputWrapper
+from django.db import connections
+from django.utils import six
+from django.utils.module_loading import import_string
 
 from pootle_project.models import Project
 
 from pootle_fs.models import ProjectFS
-
-from .fs_commands.add_translations import AddTranslationsCommand
-from .fs_commands.config import ConfigCommand
-from .fs_commands.info import ProjectInfoCommand
-from .fs_commands.fetch_translations import FetchTranslationsCommand
-from .fs_commands.merge_translations import MergeTranslationsCommand
-from .fs_commands.rm_translations import RmTranslationsCommand
-from .fs_commands.set_fs import SetFSCommand
-from .fs_commands.status import StatusCommand
-from .fs_commands.sync_translations import SyncTranslationsCommand
+from pootle_fs.response import ActionResponse
+from pootle_fs.worker import get_socket_path, send_command
 
 
 logger = logging.getLogger('pootle.fs')
 
 
+def run_project_subcommand(task):
+    """
+    Run a subcommand for a project, capturing its output. Used by the worker
+    processes of ``Command.handle_projects``.
+
+    :param task: A ``(project_code, subcommand, args, options)`` tuple
+    :returns: A ``(project_code, exit_code, output)`` tuple, the exit code is
+      ``1`` if the subcommand raised and ``2`` if any of its actions failed
+    """
+    project_code, subcommand, args, options = task
+    output = six.StringIO()
+    options = dict(options, stdout=output, stderr=output)
+    try:
+        result = Command().get_subcommand(subcommand).execute(
+            project_code, *args, **options)
+    except Exception as e:
+        logger.exception(
+            "Failed fs %s: %s" % (subcommand, project_code))
+        output.write("%s: %s\n" % (e.__class__.__name__, e))
+        return project_code, 1, output.getvalue()
+    exit_code = 0
+    if isinstance(result, ActionResponse) and result.has_failed:
+        exit_code = 2
+    return project_code, exit_code, output.getvalue()
+
+
 class Command(BaseCommand):
     help = "Pootle FS."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--all', action='store_true', dest='all_projects',
+            help='Run the subcommand for every enabled FS project'),
+        make_option(
+            '-j', '--jobs', action='store', dest='jobs', type='int',
+            help=(
+                'Number of projects to run at a time with --all or a project '
+                'glob, defaults to POOTLE_FS_JOBS or the number of CPUs')))
+    # subcommands are imported when they are run
     subcommands = {
-        "add_translations": AddTranslationsCommand,
-        "config": ConfigCommand,
-        "info": ProjectInfoCommand,
-        "fetch_translations": FetchTranslationsCommand,
-        "merge_translations": MergeTranslationsCommand,
-        "rm_translations": RmTranslationsCommand,
-        "set_fs": SetFSCommand,
-        "status": StatusCommand,
-        "sync_translations": SyncTranslationsCommand}
+        "add_translations": "add_translations.AddTranslationsCommand",
+        "config": "config.ConfigCommand",
+        "info": "info.ProjectInfoCommand",
+        "fetch_translations": "fetch_translations.FetchTranslationsCommand",
+        "merge_translations": "merge_translations.MergeTranslationsCommand",
+        "rm_translations": "rm_translations.RmTranslationsCommand",
+        "set_fs": "set_fs.SetFSCommand",
+        "status": "status.StatusCommand",
+        "sync_translations": "sync_translations.SyncTranslationsCommand"}
+    # subcommands that are not run for a project
+    global_subcommands = {
+        "scheduler": "scheduler.SchedulerCommand",
+        "worker": "worker.WorkerCommand"}
 
     def execute(self, *args, **kwargs):
+        if args and args[0] in self.global_subcommands:
+            subcommand = self.get_subcommand(args[0])
+            defaults = self.get_subcommand_defaults(subcommand)
+            defaults.update(kwargs)
+            return subcommand.execute(*args[1:], **defaults)
+        if kwargs.get("all_projects") or args and has_magic(args[0]):
+            if kwargs.get("all_projects"):
+                pattern = "*"
+            else:
+                pattern, args = args[0], args[1:]
+            self.stdout = OutputWrapper(kwargs.get('stdout', sys.stdout))
+            return self.handle_projects(
+                pattern, args and args[0] or "info", args[1:], **kwargs)
         if args:
             project_code = args[0]
             args = args[1:]
@@ -81,36 +135,133 @@ class Command(BaseCommand):
             except Project.DoesNotExist:
                 raise CommandError("Unrecognised project: %s" % project_code)
             if args:
-                subcommand = args[0]
-                try:
-                    subcommand = self.subcommands[subcommand]()
-                except KeyError:
-                    raise CommandError(
-                        "Unrecognised command: %s" % subcommand)
-                defaults = {}
-                for opt in subcommand.option_list:
-                    if opt.default is NO_DEFAULT:
-                        defaults[opt.dest] = None
-                    else:
-                        defaults[opt.dest] = opt.default
+                subcommand = self.get_subcommand(args[0])
+                defaults = self.get_subcommand_defaults(subcommand)
                 defaults.update(kwargs)
                 return subcommand.execute(
                     project_code, *args[1:], **defaults)
         return super(Command, self).execute(*args, **kwargs)
 
+    def get_project_codes(self, pattern="*"):
+        """The codes of the enabled FS projects that match ``pattern``"""
+        return sorted(
+            code for code
+            in ProjectFS.objects.filter(enabled=True).values_list(
+                "project__code", flat=True)
+            if fnmatch(code, pattern))
+
+    def forward_to_worker(self, argv):
+        """
+        Run the command line in the fs worker, if one is running
+
+        :returns forwarded: ``False`` if there is no worker to run it
+        """
+        if not self.is_project_command(argv):
+            return False
+        socket_path = get_socket_path()
+        if not os.path.exists(socket_path):
+            return False
+        try:
+            exit_code, out, err = send_command(socket_path, argv[2:])
+        except socket.error as e:
+            logger.debug("No fs worker, running in process: %s" % e)
+            return False
+        OutputWrapper(sys.stdout).write(out, ending="")
+        OutputWrapper(sys.stderr).write(err, ending="")
+        if exit_code:
+            sys.exit(exit_code)
+        return True
+
+    def is_project_command(self, argv):
+        """Whether the command line ``argv`` is for a single project"""
+        return bool(
+            argv[2:]
+            and argv[2] not in self.global_subcommands
+            and not argv[2].startswith("-")
+            and not has_magic(argv[2]))
+
+    def get_subcommand(self, name):
+        path = self.subcommands.get(name) or self.global_subcommands.get(name)
+        if path is None:
+            raise CommandError("Unrecognised command: %s" % name)
+        return import_string(
+            "pootle_fs.management.commands.fs_commands.%s" % path)()
+
+    def get_subcommand_defaults(self, subcommand):
+        defaults = {}
+        for opt in subcommand.option_list:
+            if opt.default is NO_DEFAULT:
+                defaults[opt.dest] = None
+            else:
+                defaults[opt.dest] = opt.default
+        return defaults
+
     def handle(self, *args, **kwargs):
+        project_fs = (
+            ProjectFS.objects.select_related("project")
+                             .order_by("project__code"))
         any_configured = False
-        for project in Project.objects.all():
-            try:
-                self.stdout.write(
-                    "%s\t%s"
-                    % (project.code, project.fs.get().url))
-                any_configured = True
-            except ProjectFS.DoesNotExist:
-                pass
+        for fs in project_fs:
+            self.stdout.write("%s\t%s" % (fs.project.code, fs.url))
+            any_configured = True
         if not any_configured:
             self.stdout.write("No projects configured")
 
+    def handle_projects(self, pattern, subcommand, args, **kwargs):
+        """
+        Run ``subcommand`` for each enabled FS project that matches
+        ``pattern``, in a pool of ``jobs`` processes, and write the output
+        of each project when it has finished
+
+        :raises CommandError: If the subcommand failed for any project
+        :returns results: A list of ``(project_code, exit_code, output)``
+        """
+        if subcommand in self.global_subcommands:
+            raise CommandError(
+                "%s is not run for a project" % subcommand)
+        project_codes = self.get_project_codes(pattern)
+        if not project_codes:
+            raise CommandError("No FS projects match: %s" % pattern)
+        options = self.get_subcommand_defaults(self.get_subcommand(subcommand))
+        options.update(
+            (k, v) for k, v in kwargs.items()
+            if k not in ("all_projects", "jobs", "stdout", "stderr"))
+        tasks = [
+            (project_code, subcommand, tuple(args), options)
+            for project_code in project_codes]
+        jobs = min(
+            len(tasks),
+            (kwargs.get("jobs")
+             or getattr(settings, "POOTLE_FS_JOBS", None)
+             or multiprocessing.cpu_count()))
+        if jobs < 2:
+            results = [run_project_subcommand(task) for task in tasks]
+        else:
+            # forked workers must open their own database connections
+            for connection in connections.all():
+                connection.close()
+            pool = multiprocessing.Pool(jobs)
+            try:
+                results = pool.map(run_project_subcommand, tasks)
+            finally:
+                pool.close()
+                pool.join()
+        failed = []
+        for project_code, exit_code, output in results:
+            if exit_code:
+                failed.append(project_code)
+                title = "%s (exit code %s)" % (project_code, exit_code)
+            else:
+                title = project_code
+            self.stdout.write(title)
+            self.stdout.write("=" * len(title))
+            self.stdout.write(output)
+        if failed:
+            raise CommandError(
+                "Failed for %s of %s projects: %s"
+                % (len(failed), len(results), ", ".join(failed)))
+        return results
+
     def run_from_argv(self, argv):
         """
         Set up any environment changes requested (e.g., Python path
@@ -121,29 +272,8 @@ class Command(BaseCommand):
         """
         options = None
         try:
-            if argv[2:] and not argv[2].startswith("-"):
-                project_code = argv[2]
-                try:
-                    Project.objects.get(code=project_code)
-                except Project.DoesNotExist:
-                    raise CommandError(
-                        "Unrecognised project: %s" % project_code)
-                if argv[3:]:
-                    subcommand = argv[3]
-                else:
-                    subcommand = "info"
-                try:
-                    subcommand = self.subcommands[subcommand]()
-                except KeyError:
-                    raise CommandError(
-                        "Unrecognised command: %s" % subcommand)
-                return subcommand.run_from_argv(
-                    argv[:1] + [subcommand, project_code] + argv[4:])
-
-            parser = self.create_parser(argv[0], argv[1])
-            options, args = parser.parse_args(argv[2:])
-            handle_default_options(options)
-            self.execute(*args, **options.__dict__)
+            if not self.forward_to_worker(argv):
+                self.run_argv(argv)
         except Exception as e:
             do_raise = (
                 "--traceback" in argv
@@ -158,3 +288,68 @@ class Command(BaseCommand):
                 self, 'stderr', OutputWrapper(sys.stderr, self.style.ERROR))
             stderr.write('%s: %s' % (e.__class__.__name__, e))
             sys.exit(1)
+
+    def run_argv(self, argv, forwarded=False, **streams):
+        """
+        Run the command for the command line ``argv``
+
+        :param forwarded: The command line was sent to the fs worker, and
+          must not change the worker process with ``--settings``,
+          ``--pythonpath`` or ``--no-color``
+        :param streams: ``stdout`` and ``stderr`` for the command to write to
+        """
+        if argv[2:] and argv[2] in self.global_subcommands:
+            return self._run_subcommand_argv(
+                argv[:1] + ["%s %s" % tuple(argv[1:3])], argv[2], (),
+                argv[3:], streams, forwarded=forwarded)
+        if self.is_project_command(argv):
+            project_code = argv[2]
+            try:
+                Project.objects.get(code=project_code)
+            except Project.DoesNotExist:
+                raise CommandError(
+                    "Unrecognised project: %s" % project_code)
+            if argv[3:]:
+                subcommand = argv[3]
+            else:
+                subcommand = "info"
+            return self._run_subcommand_argv(
+                argv[:1] + ["%s %s" % (argv[1], subcommand)], subcommand,
+                (project_code, ), argv[4:], streams, forwarded=forwarded)
+        if forwarded:
+            raise CommandError(
+                "Only commands for a single project can be forwarded")
+
+        parser = self.create_parser(argv[0], argv[1])
+        # options after a project glob or subcommand are the subcommand's
+        parser.disable_interspersed_args()
+        options, args = parser.parse_args(argv[2:])
+        handle_default_options(options)
+        kwargs = dict(options.__dict__, **streams)
+        if options.all_projects or args and has_magic(args[0]):
+            # parse the subcommand's options
+            name_index = options.all_projects and 0 or 1
+            if args[name_index:]:
+                name = args[name_index]
+                sub_options, sub_args = (
+                    self.get_subcommand(name)
+                        .create_parser(argv[0], name)
+                        .parse_args(args[name_index + 1:]))
+                args = args[:name_index + 1] + sub_args
+                kwargs.update(sub_options.__dict__)
+        return self.execute(*args, **kwargs)
+
+    def _run_subcommand_argv(self, prog, name, args, argv, streams,
+                             forwarded=False):
+        subcommand = self.get_subcommand(name)
+        options, sub_args = subcommand.create_parser(*prog).parse_args(argv)
+        if forwarded:
+            # the settings, path and environment of the worker are shared
+            # by every command it runs
+            options.settings = options.pythonpath = None
+            options.no_color = False
+        else:
+            handle_default_options(options)
+        return subcommand.execute(
+            *(tuple(args) + tuple(sub_args)),
+            **dict(options.__dict__, **streams))
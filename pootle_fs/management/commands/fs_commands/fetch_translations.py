@@ -8,10 +8,10 @@
 
 from optparse import make_option
 
-from pootle_fs.management.commands import TranslationsSubCommand
+from pootle_fs.management.commands import ActionSubCommand
 
 
-class FetchTranslationsCommand(TranslationsSubCommand):
+class FetchTranslationsCommand(ActionSubCommand):
     help = "Fetch translations into Pootle from FS."
 
     shared_option_list = (
@@ -20,11 +20,13 @@ class FetchTranslationsCommand(TranslationsSubCommand):
             help=(
                 'Fetch translations that are conflicting with Pootle '
                 'stores')), )
-    option_list = TranslationsSubCommand.option_list + shared_option_list
+    option_list = ActionSubCommand.option_list + shared_option_list
 
     def handle(self, project_code, *args, **options):
-        return self.handle_response(
-            self.get_fs(project_code).plugin.fetch_translations(
-                force=options["force"],
-                fs_path=options['fs_path'],
-                pootle_path=options['pootle_path']))
+        self.get_fs(project_code)
+        self.set_options(options)
+        return self.handle_action(
+            "fetch_translations",
+            force=options["force"],
+            fs_path=options['fs_path'],
+            pootle_path=options['pootle_path'])
@@ -8,21 +8,23 @@
 
 from optparse import make_option
 
-from pootle_fs.management.commands import TranslationsSubCommand
+from pootle_fs.management.commands import ActionSubCommand
 
 
-class MergeTranslationsCommand(TranslationsSubCommand):
+class MergeTranslationsCommand(ActionSubCommand):
     help = "Merge translations between Pootle and FS."
 
     shared_option_list = (
         make_option('--pootle-wins',
                     action='store_true', dest='pootle_wins',
                     help='Status type'), )
-    option_list = TranslationsSubCommand.option_list + shared_option_list
+    option_list = ActionSubCommand.option_list + shared_option_list
 
     def handle(self, project_code, *args, **options):
-        return self.handle_response(
-            self.get_fs(project_code).plugin.merge_translations(
-                fs_path=options['fs_path'],
-                pootle_path=options['pootle_path'],
-                pootle_wins=options["pootle_wins"]))
+        self.get_fs(project_code)
+        self.set_options(options)
+        return self.handle_action(
+            "merge_translations",
+            fs_path=options['fs_path'],
+            pootle_path=options['pootle_path'],
+            pootle_wins=options["pootle_wins"])
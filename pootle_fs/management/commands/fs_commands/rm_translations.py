@@ -6,14 +6,16 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from pootle_fs.management.commands import TranslationsSubCommand
+from pootle_fs.management.commands import ActionSubCommand
 
 
-class RmTranslationsCommand(TranslationsSubCommand):
+class RmTranslationsCommand(ActionSubCommand):
     help = "Rm translations into Pootle from FS."
 
     def handle(self, project_code, *args, **options):
-        return self.handle_response(
-            self.get_fs(project_code).plugin.rm_translations(
-                fs_path=options['fs_path'],
-                pootle_path=options['pootle_path']))
+        self.get_fs(project_code)
+        self.set_options(options)
+        return self.handle_action(
+            "rm_translations",
+            fs_path=options['fs_path'],
+            pootle_path=options['pootle_path'])
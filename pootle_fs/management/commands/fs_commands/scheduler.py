@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from pootle_fs.scheduler import Scheduler
+
+
+class SchedulerCommand(BaseCommand):
+    help = (
+        "Run the fetch and push jobs of FS projects at their fetch and push "
+        "frequencies.")
+
+    requires_system_checks = False
+    shared_option_list = (
+        make_option(
+            '-j', '--jobs', action='store', dest='jobs', type='int',
+            help=(
+                'Number of jobs to run at a time, defaults to POOTLE_FS_JOBS '
+                'or the number of CPUs')),
+        make_option(
+            '--once', action='store_true', dest='once',
+            help='Run the jobs that are due and exit'),
+        make_option(
+            '--add-stores', action='store_true', dest='add_stores',
+            help='Make push jobs add new Stores to the FS'))
+    option_list = BaseCommand.option_list + shared_option_list
+
+    def handle(self, *args, **options):
+        Scheduler(
+            max_jobs=options["jobs"],
+            add_stores=options["add_stores"]).run(once=options["once"])
@@ -7,6 +7,7 @@
 # AUTHORS file for copyright and authorship information.
 
 from optparse import make_option
+import time
 
 from pootle_fs.management.commands import TranslationsSubCommand
 
@@ -18,14 +19,28 @@ class StatusCommand(TranslationsSubCommand):
     shared_option_list = (
         make_option(
             '-t', '--type', action='append', dest='status_type',
-            help='Status type'), )
+            help='Status type'),
+        make_option(
+            '--counts', action='store_true', dest='counts',
+            help='Only show the number of files with each status'),
+        make_option(
+            '--max-age', action='store', dest='max_age', type='int',
+            help=(
+                'Use the local checkout without pulling if it was pulled '
+                'less than this many seconds ago')),
+        make_option(
+            '--no-pull', action='store_true', dest='no_pull',
+            help=(
+                'Use the local checkout without pulling, unless it has not '
+                'been pulled yet')), )
     option_list = TranslationsSubCommand.option_list + shared_option_list
 
     @property
     def status(self):
         if not self.__status__:
             self.__status__ = self.plugin.status(
-                fs_path=self.fs_path, pootle_path=self.pootle_path)
+                fs_path=self.fs_path, pootle_path=self.pootle_path,
+                max_age=self.max_age)
         return self.__status__
 
     def handle_status(self, status_type):
@@ -134,10 +149,67 @@ class StatusCommand(TranslationsSubCommand):
             self.style.FS_MISSING,
             self.style.FS_MISSING)
 
+    def handle_jsonl(self):
+        counts = {}
+        for k in self.status:
+            counts[k] = 0
+            for status in self.status[k]:
+                counts[k] += 1
+                self.write_record(
+                    dict(type="status",
+                         status=k,
+                         pootle_path=status.pootle_path,
+                         fs_path=status.fs_path,
+                         elapsed=self.elapsed))
+        self.write_record(
+            dict(type="summary",
+                 project=self.plugin.project.code,
+                 counts=counts,
+                 age=self.status.age,
+                 elapsed=self.elapsed))
+
+    def handle_counts(self):
+        counts = self.plugin.status_counts(
+            fs_path=self.fs_path, pootle_path=self.pootle_path,
+            max_age=self.max_age)
+        if self.format == "jsonl":
+            self.write_record(
+                dict(type="summary",
+                     project=self.plugin.project.code,
+                     counts={k: counts[k] for k in counts},
+                     age=counts.age,
+                     elapsed=self.elapsed))
+            return
+        self.write_age(counts)
+        if not counts.has_changed:
+            self.stdout.write("Everything up-to-date")
+            return
+        for k in counts:
+            self.stdout.write(
+                counts.get_status_title(k), self.style.HTTP_INFO)
+
+    def write_age(self, status):
+        # only shown when the local checkout may not have been pulled
+        if self.max_age is not None and status.age is not None:
+            self.stdout.write(
+                "Files pulled %d seconds ago" % status.age,
+                self.style.NOTICE)
+            self.stdout.write("")
+
     def handle(self, project_code, *args, **options):
         self.fs = self.get_fs(project_code)
+        self.set_options(options)
         self.pootle_path = options["pootle_path"]
         self.fs_path = options["fs_path"]
+        self.max_age = options.get("max_age")
+        if options.get("no_pull"):
+            self.max_age = float("inf")
+        self.started = time.time()
+        if options.get("counts"):
+            return self.handle_counts()
+        if self.format == "jsonl":
+            return self.handle_jsonl()
+        self.write_age(self.status)
         if not self.status.has_changed:
             self.stdout.write("Everything up-to-date")
             return
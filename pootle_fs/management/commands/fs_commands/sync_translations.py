@@ -6,14 +6,25 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from pootle_fs.management.commands import TranslationsSubCommand
+from optparse import make_option
 
+from pootle_fs.management.commands import ActionSubCommand
 
-class SyncTranslationsCommand(TranslationsSubCommand):
+
+class SyncTranslationsCommand(ActionSubCommand):
     help = "Sync translations into Pootle from FS."
 
+    shared_option_list = (
+        make_option(
+            '--chunk-size', action='store', dest='chunk_size', type='int',
+            help='Number of files to commit to the database at a time'), )
+    option_list = ActionSubCommand.option_list + shared_option_list
+
     def handle(self, project_code, *args, **options):
-        return self.handle_response(
-            self.get_fs(project_code).plugin.sync_translations(
-                fs_path=options['fs_path'],
-                pootle_path=options['pootle_path']))
+        self.get_fs(project_code)
+        self.set_options(options)
+        return self.handle_action(
+            "sync_translations",
+            fs_path=options['fs_path'],
+            pootle_path=options['pootle_path'],
+            chunk_size=options['chunk_size'])
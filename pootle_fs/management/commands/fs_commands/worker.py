@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from pootle_fs.worker import create_server, get_socket_path
+
+
+logger = logging.getLogger('pootle.fs')
+
+
+class WorkerCommand(BaseCommand):
+    help = (
+        "Run fs commands sent by other fs commands in this process, so they "
+        "share its plugins and database connections.")
+
+    requires_system_checks = False
+    shared_option_list = (
+        make_option(
+            '--socket', action='store', dest='socket',
+            help=(
+                'Unix socket to listen on, defaults to '
+                'POOTLE_FS_WORKER_SOCKET')),
+        make_option(
+            '-j', '--jobs', action='store', dest='jobs', type='int',
+            default=4,
+            help='Number of commands to run at a time'))
+    option_list = BaseCommand.option_list + shared_option_list
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"] or get_socket_path()
+        server = create_server(socket_path, jobs=options["jobs"])
+        logger.info("fs worker listening on %s" % socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
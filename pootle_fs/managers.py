@@ -13,6 +13,8 @@ from pootle_language.models import Language
 from pootle_project.models import Project
 from pootle_store.models import Store
 
+from .identity import lookup, memoize
+
 
 def validate_project_fs(**kwargs):
     from . import plugins
@@ -38,7 +40,7 @@ def validate_store_fs(**kwargs):
     # Lets see if there is a Store matching pootle_path
     if not store:
         try:
-            store = Store.objects.get(pootle_path=pootle_path)
+            store = lookup(Store, "pootle_path", pootle_path)
         except Store.DoesNotExist:
             pass
 
@@ -63,7 +65,7 @@ def validate_store_fs(**kwargs):
 
     # If project is not set then get from the pootle_path
     try:
-        path_project = Project.objects.get(code=pootle_path.split("/")[2])
+        path_project = lookup(Project, "code", pootle_path.split("/")[2])
     except (IndexError, Project.DoesNotExist):
         raise ValidationError("Unrecognised project in path: %s" % pootle_path)
 
@@ -75,12 +77,12 @@ def validate_store_fs(**kwargs):
             % (project, pootle_path))
 
     # Ensure project has FS enabled
-    if not project.fs.exists():
+    if not memoize(("fs_exists", project.pk), project.fs.exists):
         raise ValidationError("Project does not have any FS plugin enabled")
 
     # Ensure language exists
     try:
-        Language.objects.get(code=pootle_path.split("/")[1])
+        lookup(Language, "code", pootle_path.split("/")[1])
     except (IndexError, Language.DoesNotExist):
         raise ValidationError(
             "Unrecognised language in path: %s"
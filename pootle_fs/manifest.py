@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import errno
+from hashlib import md5
+import json
+import logging
+import os
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+# VCS metadata is not part of the checkout
+IGNORED_DIRS = (".git", ".hg", ".svn", ".bzr")
+
+
+def get_signature(file_path):
+    """
+    The size and modification time of a file
+
+    :returns: A ``(size, mtime)`` tuple, or ``None`` if the file does not
+      exist
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return
+    return stat.st_size, stat.st_mtime
+
+
+def hash_file(file_path, chunk_size=65536):
+    """The md5 hex digest of a file's content"""
+    file_hash = md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def scan_files(root):
+    """
+    Get the signature of every file below ``root``
+
+    :returns: A dictionary of signatures keyed by path relative to ``root``,
+      eg ``/po/en.po``
+    """
+    files = {}
+    for dirpath, dirs, filenames in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            signature = get_signature(file_path)
+            if signature is not None:
+                files[file_path[len(root):]] = signature
+    return files
+
+
+class PathChanges(object):
+    """Paths that were added, modified and removed in a local checkout"""
+
+    def __init__(self, added=(), modified=(), removed=()):
+        self.added = set(added)
+        self.modified = set(modified)
+        self.removed = set(removed)
+
+    def __contains__(self, path):
+        return (
+            path in self.added
+            or path in self.modified
+            or path in self.removed)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PathChanges)
+            and self.serialize() == other.serialize())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __iter__(self):
+        for path in sorted(self.added | self.modified | self.removed):
+            yield path
+
+    def __len__(self):
+        return len(self.added) + len(self.modified) + len(self.removed)
+
+    def __nonzero__(self):
+        return len(self) > 0
+
+    def __str__(self):
+        return (
+            "<PathChanges: %s added, %s modified, %s removed>"
+            % (len(self.added), len(self.modified), len(self.removed)))
+
+    @property
+    def changed(self):
+        """Paths that exist and have new content"""
+        return self.added | self.modified
+
+    @classmethod
+    def from_files(cls, before, after):
+        """
+        Compare two dictionaries of file signatures
+
+        :param before: Signatures from ``scan_files``
+        :param after: Signatures from ``scan_files``
+        """
+        return cls(
+            added=set(after) - set(before),
+            modified=set(
+                path for path, signature in after.items()
+                if path in before and before[path] != signature),
+            removed=set(before) - set(after))
+
+    def serialize(self):
+        return dict(
+            added=sorted(self.added),
+            modified=sorted(self.modified),
+            removed=sorted(self.removed))
+
+    def update(self, changes):
+        """
+        Add ``changes`` that were made after these changes
+        """
+        for path in changes.added:
+            if path in self.removed:
+                self.removed.discard(path)
+                self.modified.add(path)
+            elif path not in self.modified:
+                self.added.add(path)
+        for path in changes.modified:
+            if path not in self.added:
+                self.modified.add(path)
+        for path in changes.removed:
+            if path in self.added:
+                self.added.discard(path)
+            else:
+                self.modified.discard(path)
+                self.removed.add(path)
+        return self
+
+
+class CheckoutManifest(object):
+    """The files in a local checkout, and the paths that changed in each of
+    the last ``history`` versions of it.
+
+    A new version is recorded each time the checkout is pulled, and when
+    files are written to it or removed from it while syncing.
+    """
+
+    history = 20
+
+    def __init__(self, root, path):
+        """
+        :param root: Directory of the local checkout
+        :param path: File the manifest is stored in
+        """
+        self.root = root.rstrip("/")
+        self.path = path
+        self.version = 0
+        self.files = {}
+        self.changes = []
+
+    def __str__(self):
+        return (
+            "<CheckoutManifest: %s version %s, %s files>"
+            % (self.root, self.version, len(self.files)))
+
+    @property
+    def signature(self):
+        """Signature of the stored manifest, that changes each time it is
+        saved
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return
+        # saving replaces the file, so the inode changes
+        return stat.st_ino, stat.st_size, stat.st_mtime
+
+    def changes_since(self, version):
+        """
+        Get the paths that changed after ``version`` of the checkout
+
+        :returns: A ``PathChanges`` or ``None`` if they are not known
+        """
+        if not version or not self.version or version > self.version:
+            return
+        versions = [v for v, changes in self.changes if v > version]
+        if versions != list(range(version + 1, self.version + 1)):
+            return
+        changes = PathChanges()
+        for v, _changes in self.changes:
+            if v > version:
+                changes.update(_changes)
+        return changes
+
+    def clear(self):
+        self.version = 0
+        self.files = {}
+        self.changes = []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path) as f:
+            data = json.load(f)
+        self.version = data["version"]
+        self.files = {
+            path: tuple(signature)
+            for path, signature in data["files"].items()}
+        self.changes = [
+            (v, PathChanges(**changes))
+            for v, changes in data["changes"]]
+        return self
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        data = dict(
+            version=self.version,
+            files=self.files,
+            changes=[
+                (v, changes.serialize())
+                for v, changes in self.changes])
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.rename(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def scan(self):
+        """
+        Record a new version from the files in the checkout
+
+        :returns: The ``PathChanges`` since the last version, or ``None`` if
+          there was no previous version
+        """
+        files = scan_files(self.root)
+        changes = None
+        if self.version:
+            changes = PathChanges.from_files(self.files, files)
+        self.files = files
+        return self._add_version(changes)
+
+    def update(self, paths):
+        """
+        Record a new version where only ``paths`` may have changed
+
+        :returns: The ``PathChanges`` since the last version
+        """
+        if not self.version:
+            return self.scan()
+        before = {}
+        after = {}
+        for path in paths:
+            if path in self.files:
+                before[path] = self.files.pop(path)
+            signature = get_signature(
+                os.path.join(self.root, path.lstrip("/")))
+            if signature is not None:
+                after[path] = self.files[path] = signature
+        return self._add_version(PathChanges.from_files(before, after))
+
+    def _add_version(self, changes):
+        if changes is not None and not changes:
+            return changes
+        self.version += 1
+        if changes is None:
+            self.changes = []
+        else:
+            self.changes = (
+                self.changes + [(self.version, changes)])[-self.history:]
+        logger.debug(
+            "Checkout %s version %s: %s"
+            % (self.root, self.version, changes))
+        return changes
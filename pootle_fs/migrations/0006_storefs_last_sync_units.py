@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_fs', '0005_storefs_staged_for_merge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storefs',
+            name='last_sync_units',
+            field=models.TextField(null=True, blank=True),
+            preserve_default=True,
+        ),
+    ]
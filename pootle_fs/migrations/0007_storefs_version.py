@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_fs', '0006_storefs_last_sync_units'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storefs',
+            name='version',
+            field=models.IntegerField(default=0),
+            preserve_default=True,
+        ),
+    ]
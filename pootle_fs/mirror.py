@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import errno
+import logging
+import os
+import shutil
+
+from .manifest import PathChanges, hash_file, scan_files
+
+
+logger = logging.getLogger(__name__)
+
+
+def _makedirs(directory):
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def _prune_dirs(root, directory):
+    """Remove empty directories from ``directory`` up to ``root``"""
+    while directory.startswith(root + "/"):
+        try:
+            os.rmdir(directory)
+        except OSError as e:
+            if e.errno in (errno.ENOTEMPTY, errno.EEXIST, errno.ENOENT):
+                return
+            raise
+        directory = os.path.dirname(directory)
+
+
+def _stat(file_path):
+    try:
+        return os.stat(file_path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def _same_file(source_stat, target_stat):
+    return (
+        source_stat.st_ino == target_stat.st_ino
+        and source_stat.st_dev == target_stat.st_dev)
+
+
+def _same_signature(source_stat, target_stat):
+    # copies only keep the mtime to the microsecond
+    return (
+        source_stat.st_size == target_stat.st_size
+        and abs(source_stat.st_mtime - target_stat.st_mtime) < 1e-5)
+
+
+def _tmp_path(target_path):
+    return os.path.join(
+        os.path.dirname(target_path),
+        ".%s.%s.tmp" % (os.path.basename(target_path), os.getpid()))
+
+
+def copy_file(source_path, target_path):
+    """Replace ``target_path`` with a copy of ``source_path``"""
+    _makedirs(os.path.dirname(target_path))
+    tmp_path = _tmp_path(target_path)
+    try:
+        shutil.copy2(source_path, tmp_path)
+        os.rename(tmp_path, target_path)
+    finally:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def link_file(source_path, target_path):
+    """
+    Replace ``target_path`` with a hard link to ``source_path``
+
+    The target is replaced with a rename, so any other links to it are not
+    changed.
+
+    :returns linked: ``False`` if the filesystem does not allow the link
+    """
+    _makedirs(os.path.dirname(target_path))
+    tmp_path = _tmp_path(target_path)
+    if os.path.lexists(tmp_path):
+        os.unlink(tmp_path)
+    try:
+        os.link(source_path, tmp_path)
+    except OSError as e:
+        # different filesystems, too many links or no link support
+        if e.errno in (errno.EXDEV, errno.EMLINK, errno.EPERM):
+            return False
+        raise
+    try:
+        os.rename(tmp_path, target_path)
+    finally:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+    return True
+
+
+def remove_file(target, path):
+    """
+    Remove the file at ``path`` in ``target``, and any directories that it
+    leaves empty
+
+    :returns changed: ``"removed"`` if the file was removed
+    """
+    target_path = os.path.join(target, path.lstrip("/"))
+    try:
+        os.unlink(target_path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return
+    _prune_dirs(target, os.path.dirname(target_path))
+    return "removed"
+
+
+def mirror_file(source, target, path, link=False):
+    """
+    Make the file at ``path`` in ``target`` the same as in ``source``
+
+    Files are compared by size and mtime, and where the size is the same but
+    the mtime is not, by content hash. Files with the same content are not
+    copied again - with ``link`` they are hard linked instead if possible,
+    otherwise only the mtime of the target is updated.
+
+    :param link: Hard link the target to the source where the filesystem
+      allows it, rather than copying it
+    :returns changed: ``"added"``, ``"modified"`` or ``"removed"`` if the
+      content of the target was changed, otherwise ``None``
+    """
+    source_path = os.path.join(source, path.lstrip("/"))
+    target_path = os.path.join(target, path.lstrip("/"))
+    source_stat = _stat(source_path)
+    target_stat = _stat(target_path)
+    if source_stat is None:
+        return remove_file(target, path)
+    if target_stat is not None:
+        if _same_file(source_stat, target_stat):
+            return
+        if _same_signature(source_stat, target_stat):
+            return
+        same_content = (
+            source_stat.st_size == target_stat.st_size
+            and hash_file(source_path) == hash_file(target_path))
+        if same_content:
+            if not (link and link_file(source_path, target_path)):
+                os.utime(
+                    target_path,
+                    (source_stat.st_atime, source_stat.st_mtime))
+            return
+    if not (link and link_file(source_path, target_path)):
+        copy_file(source_path, target_path)
+    if target_stat is None:
+        return "added"
+    return "modified"
+
+
+def mirror_paths(source, target, paths=None, link=False, include=None,
+                 prune=True):
+    """
+    Make the files at ``paths`` in ``target`` the same as in ``source``.
+
+    Files that exist in ``source`` are copied to ``target`` unless they are
+    already the same, and with ``prune`` files that do not exist in
+    ``source`` are removed from ``target``. See ``mirror_file``.
+
+    :param paths: Paths relative to both directories, eg ``/po/en.po``. If
+      ``None`` every file in ``source``, and with ``prune`` in ``target``,
+      is mirrored.
+    :param link: Hard link files rather than copying them where possible
+    :param include: Function that takes a path and returns ``False`` if it
+      should not be mirrored. With ``prune`` excluded files are removed from
+      ``target`` if they are there, otherwise they are left alone.
+    :param prune: Remove files from ``target`` that are not in ``source``.
+      Without it files in ``target`` are only ever added or updated.
+    :returns changes: ``PathChanges`` made to ``target``
+    """
+    source = source.rstrip("/")
+    target = target.rstrip("/")
+    if paths is None:
+        paths = set(scan_files(source))
+        if prune:
+            paths |= set(scan_files(target))
+    changes = dict(added=[], modified=[], removed=[])
+    for path in paths:
+        if include is not None and not include(path):
+            if not prune:
+                continue
+            changed = remove_file(target, path)
+        elif not prune and not os.path.lexists(
+                os.path.join(source, path.lstrip("/"))):
+            continue
+        else:
+            changed = mirror_file(source, target, path, link=link)
+        if changed:
+            changes[changed].append(path)
+    changes = PathChanges(**changes)
+    logger.debug("Mirrored %s to %s: %s" % (source, target, changes))
+    return changes
@@ -6,13 +6,15 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from django.db import models
+from django.db import models, transaction
 from django.utils.functional import cached_property
 
 from pootle_project.models import Project
 from pootle_store.models import Store
 
-from .exceptions import MissingPluginError
+from .delta import dump_fingerprints, load_fingerprints
+from .exceptions import MissingPluginError, StoreFSConflict
+from .identity import lookup
 from .managers import (
     ProjectFSManager, validate_project_fs,
     StoreFSManager, validate_store_fs)
@@ -33,6 +35,7 @@ class StoreFS(models.Model):
     last_sync_revision = models.IntegerField(blank=True, null=True)
     last_sync_mtime = models.DateTimeField(null=True, blank=True)
     last_sync_hash = models.CharField(max_length=64, blank=True, null=True)
+    last_sync_units = models.TextField(blank=True, null=True)
     staged_for_removal = models.BooleanField(default=False)
     staged_for_merge = models.BooleanField(default=False)
     resolve_conflict = models.IntegerField(
@@ -41,16 +44,33 @@ class StoreFS(models.Model):
         choices=[(0, ""),
                  (POOTLE_WINS, "pootle"),
                  (FS_WINS, "fs")])
+    # bumped by every save, see ``save``
+    version = models.IntegerField(default=0)
 
     objects = StoreFSManager()
 
-    @property
+    @cached_property
     def file(self):
         return self.fs.plugin.file_class(self)
 
     @cached_property
     def fs(self):
-        return self.project.fs.get()
+        # shares the plugin's ProjectFS while syncing
+        return lookup(ProjectFS, "project_id", self.project_id)
+
+    @property
+    def unit_fingerprints(self):
+        """Fingerprints of the file's units when it was last synced, or
+        ``None`` if they are not known
+        """
+        return load_fingerprints(self.last_sync_units)
+
+    @unit_fingerprints.setter
+    def unit_fingerprints(self, fingerprints):
+        if fingerprints is None:
+            self.last_sync_units = None
+        else:
+            self.last_sync_units = dump_fingerprints(fingerprints)
 
     def save(self, *args, **kwargs):
         validated = validate_store_fs(
@@ -62,7 +82,29 @@ class StoreFS(models.Model):
         self.project = validated.get("project")
         self.pootle_path = validated.get("pootle_path")
         self.path = validated.get("path")
-        return super(StoreFS, self).save(*args, **kwargs)
+        if self.pk is None:
+            return super(StoreFS, self).save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "version" not in update_fields:
+            kwargs["update_fields"] = list(update_fields) + ["version"]
+        with transaction.atomic():
+            # only save if the row still has the version that this instance
+            # was loaded with
+            claimed = StoreFS.objects.filter(
+                pk=self.pk, version=self.version).update(
+                    version=models.F("version") + 1)
+            if not claimed:
+                raise StoreFSConflict(
+                    "File was changed by another worker: %s" % self.path)
+            self.version += 1
+            saved = False
+            try:
+                result = super(StoreFS, self).save(*args, **kwargs)
+                saved = True
+            finally:
+                if not saved:
+                    self.version -= 1
+        return result
 
 
 class ProjectFS(models.Model):
@@ -82,7 +124,7 @@ class ProjectFS(models.Model):
     def plugin(self):
         from pootle_fs import plugins
         try:
-            return plugins[self.fs_type](self)
+            return plugins.get_plugin(self)
         except KeyError:
             raise MissingPluginError(
                 "No such plugin: %s" % self.fs_type)
@@ -6,34 +6,59 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from ConfigParser import ConfigParser
+from contextlib import contextmanager
 from fnmatch import fnmatch
 import functools
+import hashlib
+import inspect
 import io
 import logging
 import os
 import shutil
+import tempfile
+import threading
+import time
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files import File
+from django.db.models import Q
 from django.utils.functional import cached_property
 from django.utils.lru_cache import lru_cache
 
+from pootle_language.models import Language
+from pootle_project.models import Project
 from pootle_store.models import Store
 
+from .blobs import BLOB_DIR, get_blob_store
+from .config import config_cache
+from .exceptions import StoreFSConflict
 from .files import FSFile
 from .finder import TranslationFileFinder
+from .identity import get_identity_map, identity_map, memoize
 from .language import LanguageMapper
+from .locks import LOCK_DIR, FileLock, LockTimeout
+from .manifest import CheckoutManifest, PathChanges, get_signature
 from .models import FS_WINS, POOTLE_WINS, ProjectFS
 from .response import ActionResponse
-from .status import ProjectFSStatus
+from .snapshots import SNAPSHOT_DIR, SnapshotStore
+from .status import ProjectFSStatus, ProjectFSStatusCounts
+from .transaction import ChunkedTransaction
 
 
 logger = logging.getLogger(__name__)
 
+PULL_DIR = "__pulls__"
+
 
 def responds_to_status(f):
+    """
+    Run a plugin action with a ``status`` and ``response``, holding the
+    project lock
+
+    The action takes optional ``lock_timeout`` and ``lock_files``, see
+    ``Plugin.locked``.
+    """
 
     @functools.wraps(f)
     def method_wrapper(self, *args, **kwargs):
@@ -43,14 +68,20 @@ def responds_to_status(f):
         else:
             response = self.response_class(self)
 
-        if "status" in kwargs:
-            status = kwargs["status"]
-            del kwargs["status"]
-        else:
-            status = self.status(
-                pootle_path=kwargs.get("pootle_path"),
-                fs_path=kwargs.get("fs_path"))
-        return f(self, status, response, *args, **kwargs)
+        lock_timeout = kwargs.pop("lock_timeout", None)
+        lock_files = kwargs.pop("lock_files", False)
+        with self.locked(timeout=lock_timeout, files=lock_files), \
+                self.identity_map():
+            max_age = kwargs.pop("max_age", None)
+            if "status" in kwargs:
+                status = kwargs["status"]
+                del kwargs["status"]
+            else:
+                status = self.status(
+                    pootle_path=kwargs.get("pootle_path"),
+                    fs_path=kwargs.get("fs_path"),
+                    max_age=max_age)
+            return f(self, status, response, *args, **kwargs)
     return method_wrapper
 
 
@@ -59,8 +90,16 @@ class Plugin(object):
     file_class = FSFile
     finder_class = TranslationFileFinder
     language_mapper_class = LanguageMapper
+    manifest_class = CheckoutManifest
     status_class = ProjectFSStatus
+    status_counts_class = ProjectFSStatusCounts
     response_class = ActionResponse
+    snapshot_class = SnapshotStore
+    # actions that write or remove the file in the local checkout
+    written_action_types = (
+        "pushed_to_fs", "merged_from_fs", "merged_from_pootle")
+    removed_action_types = ("removed", )
+    sync_chunk_size = 100
 
     def __init__(self, fs):
         from .models import ProjectFS
@@ -68,6 +107,12 @@ class Plugin(object):
             raise TypeError(
                 "pootle_fs.Plugin expects a ProjectFS")
         self.fs = fs
+        # plugin instances are shared, so per-sync state is per-thread
+        self._local = threading.local()
+        self._manifest = None
+        self._file_hashes = {}
+        self._file_hashes_version = 0
+        self._translation_files = None
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -83,6 +128,63 @@ class Plugin(object):
             if fs_path:
                 yield store, fs_path
 
+    @property
+    def blobs(self):
+        """The ``BlobStore`` shared by all projects, or ``None`` if
+        ``POOTLE_FS_BLOBS`` is not set
+        """
+        if getattr(settings, "POOTLE_FS_BLOBS", False):
+            return get_blob_store(
+                os.path.join(settings.POOTLE_FS_PATH, BLOB_DIR))
+
+    @property
+    def _chunked_transaction(self):
+        return getattr(self._local, "chunked_transaction", None)
+
+    @_chunked_transaction.setter
+    def _chunked_transaction(self, chunked):
+        self._local.chunked_transaction = chunked
+
+    @property
+    def _changed_paths(self):
+        return getattr(self._local, "changed_paths", None)
+
+    @_changed_paths.setter
+    def _changed_paths(self, paths):
+        self._local.changed_paths = paths
+
+    @property
+    def _project_locked(self):
+        return getattr(self._local, "project_locked", False)
+
+    @_project_locked.setter
+    def _project_locked(self, project_locked):
+        self._local.project_locked = project_locked
+
+    @property
+    def _files_locked(self):
+        return getattr(self._local, "files_locked", False)
+
+    @_files_locked.setter
+    def _files_locked(self, files_locked):
+        self._local.files_locked = files_locked
+
+    @property
+    def checkout_manifest(self):
+        """The ``CheckoutManifest`` of the local checkout as it was last
+        saved, reloaded when it changes
+        """
+        signature = self.manifest_class(
+            self.local_fs_path, self.manifest_path).signature
+        cached = self._manifest
+        if cached is None or cached[0] != signature:
+            manifest = self.manifest_class(
+                self.local_fs_path, self.manifest_path)
+            if signature is not None:
+                manifest.load()
+            cached = self._manifest = (signature, manifest)
+        return cached[1]
+
     @property
     def is_cloned(self):
         if os.path.exists(self.local_fs_path):
@@ -107,8 +209,18 @@ class Plugin(object):
         return os.path.join(
             settings.POOTLE_FS_PATH, self.fs.project.code)
 
+    @property
+    def manifest_path(self):
+        return os.path.join(
+            settings.POOTLE_FS_PATH,
+            PULL_DIR,
+            "%s.manifest" % self.fs.project.code)
+
     @property
     def pootle_user(self):
+        return memoize(("pootle_user", self.fs.pk), self._get_pootle_user)
+
+    def _get_pootle_user(self):
         User = get_user_model()
         config = self.read_config()
         if config.has_option("default", "pootle_user"):
@@ -125,6 +237,74 @@ class Plugin(object):
     def project(self):
         return self.fs.project
 
+    @property
+    def pull_age(self):
+        """Seconds since the local checkout was last pulled, or ``None`` if
+        it has not been pulled
+        """
+        pulled_at = self.pulled_at
+        if pulled_at is not None:
+            return max(0, time.time() - pulled_at)
+
+    @property
+    def pull_lock(self):
+        return FileLock(
+            os.path.join(
+                settings.POOTLE_FS_PATH,
+                LOCK_DIR,
+                "%s.pull" % self.fs.project.code))
+
+    def get_file_lock(self, pootle_path):
+        return FileLock(
+            os.path.join(
+                settings.POOTLE_FS_PATH,
+                LOCK_DIR,
+                self.fs.project.code,
+                hashlib.md5(pootle_path.encode("utf-8")).hexdigest()))
+
+    @property
+    def project_lock(self):
+        return FileLock(
+            os.path.join(
+                settings.POOTLE_FS_PATH,
+                LOCK_DIR,
+                "%s.project" % self.fs.project.code))
+
+    @property
+    def pull_ttl(self):
+        """Seconds that a pull is reused for when no ``max_age`` is given"""
+        return getattr(settings, "POOTLE_FS_PULL_TTL", 0)
+
+    @property
+    def pull_stamp_path(self):
+        return os.path.join(
+            settings.POOTLE_FS_PATH, PULL_DIR, self.fs.project.code)
+
+    @property
+    def pulled_at(self):
+        """Time that the last pull of the local checkout started, or ``None``
+        if it has not been pulled
+        """
+        if not self.is_cloned or not os.path.exists(self.pull_stamp_path):
+            return None
+        with open(self.pull_stamp_path) as f:
+            stamp = f.read().strip()
+        try:
+            return float(stamp)
+        except ValueError:
+            # stamp written before the start time was recorded
+            return os.path.getmtime(self.pull_stamp_path)
+
+    @cached_property
+    def snapshots(self):
+        return self.snapshot_class(
+            os.path.join(
+                settings.POOTLE_FS_PATH,
+                SNAPSHOT_DIR,
+                self.fs.project.code),
+            retention=getattr(
+                settings, "POOTLE_FS_SNAPSHOT_RETENTION", 2))
+
     @property
     def stores(self):
         return Store.objects.filter(
@@ -160,28 +340,77 @@ class Plugin(object):
         :param pootle_path: Path glob to filter translations to add matching
           ``pootle_path``
         """
-        from .models import StoreFS
+        if force:
+            status.load(
+                "pootle_untracked", "conflict_untracked",
+                "fs_removed", "conflict")
         to_create = status["pootle_untracked"]
         if force:
-            to_create += status["conflict_untracked"]
+            to_create = to_create + status["conflict_untracked"]
         for fs_status in to_create:
-            StoreFS.objects.create(
-                project=self.project,
-                pootle_path=fs_status.pootle_path,
-                path=fs_status.fs_path).file.add()
-            response.add("added_from_pootle", fs_status)
+            self.stage_action(
+                response, "added_from_pootle", fs_status,
+                functools.partial(self.track_file, fs_status, "add"))
         if force:
             for fs_status in status["fs_removed"]:
-                fs_status.store_fs.file.add()
-                response.add("added_from_pootle", fs_status)
+                self.stage_action(
+                    response, "added_from_pootle", fs_status,
+                    fs_status.store_fs.file.add)
             for fs_status in status["conflict"]:
-                fs_status.store_fs.file.add()
-                response.add("added_from_pootle", fs_status)
+                self.stage_action(
+                    response, "added_from_pootle", fs_status,
+                    fs_status.store_fs.file.add)
         return response
 
+    @contextmanager
+    def chunked_transaction(self, chunk_size=None):
+        """
+        Scope sync actions to a ``ChunkedTransaction``. If a chunked
+        transaction is already open it is reused.
+
+        Files that are written to or removed from the local checkout in the
+        transaction are recorded in the ``checkout_manifest`` when it ends.
+
+        :param chunk_size: Number of files to commit at a time, defaults to
+          ``sync_chunk_size``
+        """
+        if self._chunked_transaction is not None:
+            yield self._chunked_transaction
+            return
+        self._chunked_transaction = ChunkedTransaction(
+            chunk_size or self.sync_chunk_size)
+        self._changed_paths = set()
+        try:
+            with self._chunked_transaction as chunked:
+                yield chunked
+        finally:
+            self._chunked_transaction = None
+            changed_paths, self._changed_paths = self._changed_paths, None
+            if changed_paths:
+                self.record_local_changes(changed_paths)
+
+    @contextmanager
+    def identity_map(self):
+        """
+        Scope Project, Language, Store and user lookups to an
+        ``IdentityMap``, preloaded with the objects for this project. If an
+        identity map is already in use it is reused.
+        """
+        with identity_map() as (identities, created):
+            if created:
+                self.preload_identities(identities)
+            yield identities
+
     def clear_repo(self):
         if self.is_cloned:
             shutil.rmtree(self.local_fs_path)
+        if os.path.exists(self.pull_stamp_path):
+            os.unlink(self.pull_stamp_path)
+        self.checkout_manifest.clear()
+        self._manifest = None
+        self.snapshots.clear()
+        if self.blobs is not None:
+            self.blobs.prune()
 
     @responds_to_status
     def fetch_translations(self, status, response,
@@ -198,25 +427,27 @@ class Plugin(object):
         :param pootle_path: Path glob to filter translations to add matching
           ``pootle_path``
         """
-        from .models import StoreFS
+        if force:
+            status.load(
+                "fs_untracked", "conflict_untracked",
+                "pootle_removed", "conflict")
         to_create = status["fs_untracked"]
         if force:
             to_create = to_create + status["conflict_untracked"]
 
         for fs_status in to_create:
-            fs_store = StoreFS.objects.create(
-                project=self.project,
-                pootle_path=fs_status.pootle_path,
-                path=fs_status.fs_path)
-            fs_store.file.fetch()
-            response.add("fetched_from_fs", fs_status)
+            self.stage_action(
+                response, "fetched_from_fs", fs_status,
+                functools.partial(self.track_file, fs_status, "fetch"))
         if force:
             for fs_status in status["pootle_removed"]:
-                fs_status.store_fs.file.fetch()
-                response.add("fetched_from_fs", fs_status)
+                self.stage_action(
+                    response, "fetched_from_fs", fs_status,
+                    fs_status.store_fs.file.fetch)
             for fs_status in status["conflict"]:
-                fs_status.store_fs.file.fetch()
-                response.add("fetched_from_fs", fs_status)
+                self.stage_action(
+                    response, "fetched_from_fs", fs_status,
+                    fs_status.store_fs.file.fetch)
         return response
 
     def find_translations(self, fs_path=None, pootle_path=None):
@@ -229,44 +460,228 @@ class Plugin(object):
           ``pootle_path``
         :yields pootle_path, fs_path:
         """
-        config = self.read_config()
         missing_langs = set()
 
+        translation_files = self.find_translation_files(
+            missing_langs=missing_langs)
+        for path, section_subdirs, matched in translation_files:
+            if fs_path is not None:
+                if not fnmatch(path, fs_path):
+                    continue
+            language = self.lang_mapper[matched['lang']]
+            if not language:
+                missing_langs.add(matched['lang'])
+                continue
+            subdirs = (
+                list(section_subdirs)
+                + [m for m in
+                   matched.get('directory_path', '').split("/")
+                   if m])
+            _pootle_path = "/".join(
+                ["", language.code, self.project.code]
+                + subdirs
+                + ["%s.%s" % (matched["filename"],
+                              matched["ext"])])
+            if pootle_path is not None:
+                if not fnmatch(_pootle_path, pootle_path):
+                    continue
+            yield _pootle_path, path
+        if missing_langs:
+            logger.warning(
+                "Could not import files for languages: %s"
+                % (", ".join(sorted(missing_langs))))
+
+    def find_translation_files(self, missing_langs=None):
+        """
+        Find the files in the local checkout that match a translation path
+        of the project config
+
+        Files for languages that are not in Pootle are skipped, and where
+        the language is a directory it is not walked.
+
+        The files found are kept for the version of the checkout in the
+        ``checkout_manifest``. When the checkout changes only the paths that
+        were added or removed are matched again, otherwise the checkout is
+        walked.
+
+        :param missing_langs: A set to add the skipped languages to
+        :returns: A list of ``(fs_path, section_subdirs, matched)``
+        """
+        config = self.read_config()
+        language_codes = self.get_language_codes()
+        manifest = self.checkout_manifest
+        changes = None
+        cached = self._translation_files
+        if cached is not None:
+            if cached[0] is config and cached[1] == language_codes:
+                changes = manifest.changes_since(cached[2])
+        if changes is None:
+            skipped = set()
+            files = self._walk_translation_files(
+                config, self._get_lang_filter(language_codes, skipped))
+        else:
+            skipped = set(cached[4])
+            files = self._update_translation_files(
+                config, cached[3], changes,
+                self._get_lang_filter(language_codes, skipped))
+        self._translation_files = (
+            config, language_codes, manifest.version, files, skipped)
+        if missing_langs is not None:
+            missing_langs.update(skipped)
+        return [
+            (path, section_subdirs, matched)
+            for path in sorted(files)
+            for section_subdirs, matched in files[path]]
+
+    def _get_lang_filter(self, language_codes, skipped):
+
+        def include_lang(lang):
+            if self.lang_mapper.get_pootle_code(lang) in language_codes:
+                return True
+            skipped.add(lang)
+            return False
+        return include_lang
+
+    def _get_section_finders(self, config):
         for section in config.sections():
             if section == "default":
-                section_subdirs = []
+                section_subdirs = ()
             else:
-                section_subdirs = section.split("/")
-
-            finder = self.get_finder(
+                section_subdirs = tuple(section.split("/"))
+            yield section_subdirs, self.get_finder(
                 config.get(section, "translation_path"))
-            for file_path, matched in finder.find():
+
+    def _update_translation_files(self, config, files, changes,
+                                  include_lang):
+        files = dict(files)
+        for path in changes.removed | changes.added:
+            files.pop(path, None)
+        for section_subdirs, finder in self._get_section_finders(config):
+            for path in changes.added:
+                matched = finder.match_file(self.local_fs_path + path)
+                if matched and include_lang(matched["lang"]):
+                    files.setdefault(path, []).append(
+                        (section_subdirs, matched))
+        return files
+
+    def _walk_translation_files(self, config, include_lang):
+        files = {}
+        for section_subdirs, finder in self._get_section_finders(config):
+            for file_path, matched in finder.find(include_lang):
                 path = file_path.replace(self.local_fs_path, "")
-                if fs_path is not None:
-                    if not fnmatch(path, fs_path):
-                        continue
-                language = self.lang_mapper[matched['lang']]
-                if not language:
-                    missing_langs.add(matched['lang'])
-                    continue
-                subdirs = (
-                    section_subdirs
-                    + [m for m in
-                       matched.get('directory_path', '').split("/")
-                       if m])
-                _pootle_path = "/".join(
-                    ["", language.code, self.project.code]
-                    + subdirs
-                    + ["%s.%s" % (matched["filename"],
-                                  matched["ext"])])
-                if pootle_path is not None:
-                    if not fnmatch(_pootle_path, pootle_path):
-                        continue
-                yield _pootle_path, path
-        if missing_langs:
-            logger.warning(
-                "Could not import files for languages: %s"
-                % (", ".join(missing_langs)))
+                files.setdefault(path, []).append((section_subdirs, matched))
+        return files
+
+    def get_changed_fs_paths(self, response):
+        """
+        Get the fs paths that were written to or removed from the local
+        checkout by the completed actions of a sync
+
+        :param response: ``ActionResponse`` of the sync
+        :returns changes: ``PathChanges`` where written files are
+          ``modified``
+        """
+        return PathChanges(
+            modified=[
+                action_status.fs_path
+                for action_status
+                in response.completed(*self.written_action_types)],
+            removed=[
+                action_status.fs_path
+                for action_status
+                in response.completed(*self.removed_action_types)])
+
+    def get_file_hash(self, fs_file):
+        """
+        Get the ``latest_hash`` of an ``FSFile``, reusing the hash from an
+        earlier call if the file has not changed since
+
+        Hashes are forgotten for the paths that change in the
+        ``checkout_manifest``, and are also checked against the size and
+        mtime of the file.
+        """
+        return self._get_hash(
+            fs_file.path, fs_file.file_path, lambda: fs_file.latest_hash)
+
+    def get_path_hash(self, path):
+        """
+        Get the ``latest_hash`` of the file at ``path`` in the local checkout
+        with ``hash_path``, reusing hashes as ``get_file_hash`` does
+
+        :returns: The hash, or ``None`` if the plugin can not hash the file
+          without an ``FSFile``
+        """
+        return self._get_hash(
+            path,
+            os.path.join(self.local_fs_path, path.lstrip("/")),
+            lambda: self.hash_path(path))
+
+    def hash_path(self, path):
+        """
+        Hash the file at ``path`` in the local checkout without an
+        ``FSFile``. Plugins whose ``file_class`` can find the
+        ``latest_hash`` of a file from its path alone should return it, so
+        that status counts do not create a ``StoreFS`` and ``FSFile`` for
+        files that changed.
+
+        :returns: The hash, or ``None`` if the ``file_class`` must be used
+        """
+        return None
+
+    def _get_hash(self, path, file_path, get_hash):
+        manifest = self.checkout_manifest
+        if self._file_hashes_version != manifest.version:
+            changes = manifest.changes_since(self._file_hashes_version)
+            if changes is None:
+                self._file_hashes = {}
+            else:
+                for changed_path in changes:
+                    self._file_hashes.pop(changed_path, None)
+            self._file_hashes_version = manifest.version
+        signature = get_signature(file_path)
+        cached = self._file_hashes.get(path)
+        if signature is not None and cached and cached[0] == signature:
+            return cached[1]
+        file_hash = get_hash()
+        if signature is not None and file_hash:
+            self._file_hashes[path] = (signature, file_hash)
+        else:
+            self._file_hashes.pop(path, None)
+        return file_hash
+
+    def get_language_codes(self):
+        """The codes of the languages in Pootle"""
+        return memoize(
+            ("language_codes", ),
+            lambda: frozenset(
+                Language.objects.values_list("code", flat=True)))
+
+    def get_sparse_filter(self):
+        """
+        Get a function for a language-sparse checkout, that takes an fs path
+        and returns ``False`` if the path is below the directory of a
+        language that is not in Pootle
+
+        :returns: The function, or ``None`` if ``POOTLE_FS_SPARSE`` is not
+          set or the project config is not known yet
+        """
+        if not getattr(settings, "POOTLE_FS_SPARSE", False):
+            return
+        if not self.fs.current_config:
+            return
+        language_codes = self.get_language_codes()
+        finders = [
+            finder for __, finder
+            in self._get_section_finders(self.read_config())
+            if finder.lang_dir_regex is not None]
+        include_lang = self._get_lang_filter(language_codes, set())
+
+        def include_path(path):
+            file_path = self.local_fs_path + path
+            return all(
+                finder.include_path(file_path, include_lang)
+                for finder in finders)
+        return include_path
 
     @lru_cache(maxsize=None)
     def get_finder(self, translation_path):
@@ -313,6 +728,47 @@ class Plugin(object):
         if fs_path:
             return "/%s" % fs_path.lstrip("/")
 
+    @contextmanager
+    def locked(self, timeout=None, files=False):
+        """
+        Hold the ``project_lock``, so that only one action changes the
+        project at a time, in this or other processes on the host
+
+        Actions that are run while the lock is held by the same thread, eg
+        by ``sync_translations``, share it.
+
+        :param timeout: Seconds to wait for the lock, ``0`` to only try to
+          get it. Defaults to ``POOTLE_FS_LOCK_TIMEOUT``, or waiting until
+          the lock is released if that is not set.
+        :param files: Do not take the ``project_lock``, instead each action
+          claims the file that it changes, see ``claimed``. Several actions
+          can then sync different files of the project at the same time.
+        :raises LockTimeout: If the lock could not be acquired
+        """
+        if self._project_locked or self._files_locked:
+            yield
+            return
+        if files:
+            self._files_locked = True
+            try:
+                yield
+            finally:
+                self._files_locked = False
+            return
+        if timeout is None:
+            timeout = getattr(settings, "POOTLE_FS_LOCK_TIMEOUT", None)
+        lock = self.project_lock
+        if not lock.acquire(timeout=timeout):
+            raise LockTimeout(
+                "Project is locked by another action: %s"
+                % self.project.code)
+        self._project_locked = True
+        try:
+            yield
+        finally:
+            self._project_locked = False
+            lock.release()
+
     @responds_to_status
     def merge_translations(self, status, response,
                            pootle_path=None, fs_path=None, pootle_wins=False):
@@ -321,23 +777,20 @@ class Plugin(object):
         :param pootle_path: Path glob to filter translations to add matching
           ``pootle_path``
         """
-        from .models import StoreFS
-
+        status.load("conflict_untracked", "conflict")
         for fs_status in status["conflict_untracked"]:
-            fs_store = StoreFS.objects.create(
-                project=self.project,
-                store=Store.objects.get(
-                    pootle_path=fs_status.pootle_path),
-                path=fs_status.fs_path)
-            fs_store.staged_for_merge = True
             if pootle_wins:
-                fs_store.resolve_conflict = POOTLE_WINS
+                resolve_conflict = POOTLE_WINS
                 action_type = "staged_for_merge_pootle"
             else:
-                fs_store.resolve_conflict = FS_WINS
+                resolve_conflict = FS_WINS
                 action_type = "staged_for_merge_fs"
-            fs_store.save()
-            response.add(action_type, fs_status)
+            self.stage_action(
+                response, action_type, fs_status,
+                functools.partial(
+                    self.track_file, fs_status,
+                    staged_for_merge=True,
+                    resolve_conflict=resolve_conflict))
 
         for fs_status in status["conflict"]:
             fs_store = fs_status.store_fs
@@ -348,37 +801,152 @@ class Plugin(object):
             else:
                 fs_store.resolve_conflict = FS_WINS
                 action_type = "staged_for_merge_fs"
-            fs_store.save()
-            response.add(action_type, fs_status)
+            self.stage_action(response, action_type, fs_status, fs_store.save)
         return response
 
     @responds_to_status
     def merge_translation_files(self, status, response,
                                 pootle_path=None, fs_path=None):
-        for fs_status in status["merge_pootle"]:
-            fs_status.store_fs.file.sync_to_pootle(
-                merge=True, pootle_wins=True)
-            fs_status.store_fs.file.sync_from_pootle()
-            fs_status.store_fs.file.on_sync(
-                fs_status.store_fs.file.latest_hash,
-                fs_status.store_fs.store.get_max_unit_revision())
-            response.add("merged_from_pootle", fs_status)
-        for fs_status in status["merge_fs"]:
-            fs_status.store_fs.file.sync_to_pootle(
-                merge=True, pootle_wins=False)
-            fs_status.store_fs.file.sync_from_pootle()
-            fs_status.store_fs.file.on_sync(
-                fs_status.store_fs.file.latest_hash,
-                fs_status.store_fs.store.get_max_unit_revision())
-            response.add("merged_from_fs", fs_status)
+        status.load("merge_pootle", "merge_fs")
+        with self.chunked_transaction():
+            for fs_status in status["merge_pootle"]:
+                self.run_action(
+                    response, "merged_from_pootle", fs_status,
+                    functools.partial(
+                        fs_status.store_fs.file.merge, pootle_wins=True))
+            for fs_status in status["merge_fs"]:
+                self.run_action(
+                    response, "merged_from_fs", fs_status,
+                    functools.partial(
+                        fs_status.store_fs.file.merge, pootle_wins=False))
         return response
 
+    def on_file_changed(self, path):
+        """
+        Called when a file is written to or removed from the local checkout
+        while syncing
+        """
+        self._file_hashes.pop(path, None)
+        if self._changed_paths is not None:
+            self._changed_paths.add(path)
+        else:
+            self.record_local_changes([path])
+
+    def preload_identities(self, identities):
+        """
+        Load the project and its ``ProjectFS``, all languages and all of the
+        project's stores into ``identities`` in bulk
+        """
+        project_code = self.project.code
+
+        def in_project(pootle_path):
+            return pootle_path.split("/")[2:3] == [project_code]
+
+        identities.add_all(Project, "code", [self.project])
+        identities.add_all(ProjectFS, "project_id", [self.fs])
+        identities.add_all(
+            Language, "code", Language.objects.all(), complete=True)
+        identities.add_all(
+            Store, "pootle_path",
+            self.stores.select_related("translation_project__project"),
+            complete=in_project)
+
     def pull(self):
         """
         Pull the FS from external source if required.
+
+        This should be called through ``refresh``, which records what changed
+        in the ``checkout_manifest``.
+
+        :returns paths: Optionally, the paths that were added, modified or
+          removed by the pull. If they are not returned the checkout is
+          scanned to find them.
         """
         pass
 
+    def record_changes(self, paths=None):
+        """
+        Record a new version of the local checkout in the
+        ``checkout_manifest``. The caller should hold the ``pull_lock``.
+
+        If there is a ``BlobStore`` the changed files are linked to it.
+
+        :param paths: Paths that may have changed, or ``None`` to scan the
+          whole checkout
+        :returns changes: ``PathChanges`` since the previous version, or
+          ``None`` if there was no previous version
+        """
+        manifest = self.manifest_class(
+            self.local_fs_path, self.manifest_path).load()
+        if paths is None:
+            changes = manifest.scan()
+        else:
+            changes = manifest.update(paths)
+        if self.blobs is not None:
+            if changes is None:
+                self._add_blobs(manifest, list(manifest.files))
+            else:
+                self._add_blobs(manifest, changes.changed)
+        manifest.save()
+        return changes
+
+    def _add_blobs(self, manifest, paths):
+        for path in paths:
+            file_path = os.path.join(self.local_fs_path, path.lstrip("/"))
+            if not os.path.exists(file_path):
+                continue
+            self.blobs.add(file_path)
+            # linking to an existing blob can change the mtime
+            manifest.files[path] = get_signature(file_path)
+
+    def record_local_changes(self, paths):
+        """
+        Record files written to or removed from the local checkout in the
+        ``checkout_manifest``, if there is one
+        """
+        if not os.path.exists(self.manifest_path):
+            return
+        with self.pull_lock:
+            return self.record_changes(paths)
+
+    def refresh(self, max_age=None):
+        """
+        Pull the FS, unless the local checkout was pulled less than
+        ``max_age`` seconds ago
+
+        Pulls are single-flight - callers in this or other processes on the
+        host wait for a pull that is in progress, and share the result of a
+        pull that started after they called, rather than pulling again.
+
+        The paths that the pull added, modified or removed are recorded in
+        the ``checkout_manifest``.
+
+        :param max_age: Maximum age in seconds of the local checkout.
+          Defaults to ``pull_ttl``, if that is ``0`` the FS is always pulled.
+        :return pulled: ``True`` if the FS was pulled by this call
+        """
+        if max_age is None:
+            max_age = self.pull_ttl
+        requested = time.time()
+        with self.pull_lock:
+            pulled_at = self.pulled_at
+            if pulled_at is not None and pulled_at > requested:
+                logger.debug(
+                    "Sharing pull made while waiting: %s"
+                    % self.project.code)
+                return False
+            age = self.pull_age
+            if max_age and age is not None and age <= max_age:
+                logger.debug(
+                    "Using local checkout pulled %.1fs ago: %s"
+                    % (age, self.project.code))
+                return False
+            started = time.time()
+            changes = self.record_changes(self.pull())
+            self._write_pull_stamp(started)
+        logger.debug("Pulled %s: %s" % (self.project.code, changes))
+        return True
+
     @responds_to_status
     def pull_translations(self, status, response,
                           pootle_path=None, fs_path=None):
@@ -387,29 +955,62 @@ class Plugin(object):
         :param pootle_path: Path glob to filter translations to add matching
           ``pootle_path``
         """
-        for fs_status in (status['fs_added'] + status['fs_ahead']):
-            fs_status.store_fs.file.pull()
-            response.add("pulled_to_pootle", fs_status)
+        with self.chunked_transaction():
+            for fs_status in (status['fs_added'] + status['fs_ahead']):
+                self.run_action(
+                    response, "pulled_to_pootle", fs_status,
+                    fs_status.store_fs.file.pull)
         return response
 
-    def push(self, paths=None, message=None, response=None):
+    def push(self, response=None, paths=None):
         """
         Push the FS to an external source if required.
+
+        :param response: ``ActionResponse`` of the sync
+        :param paths: ``PathChanges`` of the fs paths that the sync wrote to
+          or removed from the local checkout, or ``None`` to push every path.
+          ``mirror_paths`` can be used to copy just these paths. Without
+          ``paths`` files must not be removed from the FS, as they may have
+          been added since the last pull. Plugins whose ``push`` does not
+          take ``paths`` are not given them.
         """
         return response
 
+    def _push(self, response, paths):
+        try:
+            argspec = inspect.getargspec(self.push)
+        except TypeError:
+            # not a function, eg a callable object
+            argspec = None
+        takes_paths = argspec is not None and (
+            "paths" in argspec.args or argspec.keywords is not None)
+        if takes_paths:
+            return self.push(response, paths=paths)
+        return self.push(response)
+
     @responds_to_status
     def push_translations(self, status, response,
                           pootle_path=None, fs_path=None):
-        self.push_translation_files(
-            status=status, pootle_path=pootle_path,
-            fs_path=fs_path, response=response)
-        for action_status in response.completed("pushed_to_fs"):
-            fs_file = action_status.store_fs.file
-            fs_file.on_sync(
-                fs_file.latest_hash,
-                action_status.store_fs.store.get_max_unit_revision())
-        return self.push(response)
+        with self.chunked_transaction() as chunked:
+            self.push_translation_files(
+                status=status, pootle_path=pootle_path,
+                fs_path=fs_path, response=response)
+            for action_status in list(response.completed("pushed_to_fs")):
+                store_fs = action_status.store_fs
+                fs_file = store_fs.file
+                version = store_fs.version
+                try:
+                    with chunked.savepoint():
+                        fs_file.on_sync(
+                            fs_file.current_hash, fs_file.store_revision)
+                except Exception as e:
+                    logger.exception(
+                        "Failed updating sync state: %s" % fs_file.path)
+                    # the save of the StoreFS has been rolled back
+                    store_fs.version = version
+                    action_status.complete = False
+                    action_status.msg = str(e)
+        return self._push(response, self.get_changed_fs_paths(response))
 
     @responds_to_status
     def push_translation_files(self, status, response,
@@ -421,9 +1022,11 @@ class Plugin(object):
           ``pootle_path``
         """
         pushable = status['pootle_added'] + status['pootle_ahead']
-        for fs_status in pushable:
-            fs_status.store_fs.file.push()
-            response.add('pushed_to_fs', fs_status)
+        with self.chunked_transaction():
+            for fs_status in pushable:
+                self.run_action(
+                    response, "pushed_to_fs", fs_status,
+                    fs_status.store_fs.file.push)
         return response
 
     def read(self, path):
@@ -433,12 +1036,21 @@ class Plugin(object):
         return content
 
     def update_config(self):
-        self.pull()
+        """
+        Update the project config from the ``.pootle.ini`` in the FS
+
+        The new config is parsed and validated before it is saved.
+
+        :raises ConfigurationError: If the new config is not valid
+        """
+        self.refresh()
         config = self.read(self.fs.pootle_config)
+        config_cache.get(config)
         self.fs.current_config.save(
             self.fs.pootle_config,
             File(io.BytesIO(config)))
         self.read_config.cache_clear()
+        self.get_fs_path.cache_clear()
         if "lang_mapper" in self.__dict__:
             del self.__dict__["lang_mapper"]
         return config
@@ -448,25 +1060,60 @@ class Plugin(object):
         """
         Read and parse the configuration for this project
 
+        Parsed configs are cached for the process by their content.
+
         :return config: Where ``config`` is an ``ConfigParser`` instance
         """
-        config = ConfigParser()
         if not self.fs.current_config:
             _conf = self.update_config()
         else:
             _conf = self.fs.current_config.file.read()
-        config.readfp(io.BytesIO(_conf))
-        return config
+        return config_cache.get(_conf)
 
-    def status(self, fs_path=None, pootle_path=None):
+    def status(self, fs_path=None, pootle_path=None, max_age=None):
         """
         Get a status object for showing current status of FS/Pootle
 
+        :param max_age: Use the local checkout without pulling if it was
+          pulled less than ``max_age`` seconds ago
         :return status: Where ``status`` is an instance of self.status_class
         """
-        self.pull()
-        return self.status_class(
-            self, fs_path=fs_path, pootle_path=pootle_path)
+        self.refresh(max_age)
+        with self.identity_map() as identities:
+            return self.status_class(
+                self, fs_path=fs_path, pootle_path=pootle_path,
+                identities=identities)
+
+    def status_counts(self, fs_path=None, pootle_path=None, max_age=None):
+        """
+        Get the number of files/Stores with each status, without creating a
+        ``Status`` for each of them
+
+        :param max_age: Use the local checkout without pulling if it was
+          pulled less than ``max_age`` seconds ago
+        :return counts: Where ``counts`` is an instance of
+          self.status_counts_class
+        """
+        self.refresh(max_age)
+        with self.identity_map() as identities:
+            return self.status_counts_class(
+                self, fs_path=fs_path, pootle_path=pootle_path,
+                identities=identities)
+
+    def _write_pull_stamp(self, started):
+        directory = os.path.dirname(self.pull_stamp_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # the start time is written, rather than relying on the mtime, as
+        # filesystem timestamps are too coarse to compare with time.time()
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(repr(started))
+            os.rename(tmp_path, self.pull_stamp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
 
     def reload(self):
         self.fs = ProjectFS.objects.get(pk=self.fs.pk)
@@ -475,6 +1122,7 @@ class Plugin(object):
         os.unlink(
             os.path.join(
                 self.local_fs_path, path.strip("/")))
+        self.on_file_changed(path)
 
     @responds_to_status
     def rm_translations(self, status, response,
@@ -484,25 +1132,24 @@ class Plugin(object):
         :param pootle_path: Path glob to filter translations to add matching
           ``pootle_path``
         """
-        from .models import StoreFS
+        status.load(
+            "fs_untracked", "pootle_untracked",
+            "pootle_removed", "fs_removed")
         untracked = (
             status["fs_untracked"] + status["pootle_untracked"])
 
         for fs_status in untracked:
-            fs_store = StoreFS.objects.create(
-                project=self.project,
-                pootle_path=fs_status.pootle_path,
-                path=fs_status.fs_path)
-            fs_store.staged_for_removal = True
-            fs_store.save()
-            response.add("staged_for_removal", fs_status)
+            self.stage_action(
+                response, "staged_for_removal", fs_status,
+                functools.partial(
+                    self.track_file, fs_status, staged_for_removal=True))
 
         removed = status["pootle_removed"] + status["fs_removed"]
         for fs_status in removed:
             fs_store = fs_status.store_fs
             fs_store.staged_for_removal = True
-            fs_store.save()
-            response.add("staged_for_removal", fs_status)
+            self.stage_action(
+                response, "staged_for_removal", fs_status, fs_store.save)
         return response
 
     @responds_to_status
@@ -513,29 +1160,155 @@ class Plugin(object):
         :param pootle_path: Path glob to filter translations to add matching
           ``pootle_path``
         """
-        for fs_status in status['to_remove']:
-            fs_status.store_fs.file.delete()
-            response.add("removed", fs_status)
+        with self.chunked_transaction():
+            for fs_status in status['to_remove']:
+                self.run_action(
+                    response, "removed", fs_status,
+                    fs_status.store_fs.file.delete)
         return response
 
+    @contextmanager
+    def claimed(self, fs_status):
+        """
+        Claim the file of ``fs_status`` for an action that is run with
+        ``locked(files=True)``, so that other actions in this or other
+        processes on the host do not change it at the same time. Other hosts
+        are caught by the ``StoreFS.version`` check.
+
+        Nothing is claimed if the action holds the ``project_lock``.
+
+        :raises LockTimeout: If the file is claimed by another action
+        """
+        if not self._files_locked:
+            yield
+            return
+        lock = self.get_file_lock(fs_status.pootle_path)
+        if not lock.acquire(blocking=False):
+            raise LockTimeout(
+                "File is being synced by another worker: %s"
+                % fs_status.pootle_path)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def run_action(self, response, action_type, fs_status, action):
+        """
+        Run ``action`` for a single file inside a savepoint of the current
+        chunked transaction, and add the result to the ``response``.
+
+        If the action raises, its database changes are rolled back and it is
+        added to the ``response`` as failed. The ``StoreFS`` keeps the
+        ``version`` it had before the action, so that it can be saved again.
+        """
+        store_fs = fs_status.store_fs
+        if store_fs is not None:
+            saved = store_fs.pk, store_fs.version
+        try:
+            with self.claimed(fs_status), \
+                    self._chunked_transaction.savepoint():
+                action()
+        except LockTimeout as e:
+            logger.warning(
+                "Failed %s: %s" % (action_type, fs_status.pootle_path))
+            return response.add(
+                action_type, fs_status, complete=False, msg=str(e))
+        except Exception as e:
+            logger.exception(
+                "Failed %s: %s" % (action_type, fs_status.pootle_path))
+            # any Store created by the action has been rolled back
+            identities = get_identity_map()
+            if identities is not None:
+                identities.discard(Store, "pootle_path", fs_status.pootle_path)
+            # as have any saves of the StoreFS
+            if store_fs is not None:
+                store_fs.pk, store_fs.version = saved
+            return response.add(
+                action_type, fs_status, complete=False, msg=str(e))
+        return response.add(action_type, fs_status)
+
+    def stage_action(self, response, action_type, fs_status, action):
+        """
+        Run the staging ``action`` for a file, and add the result to the
+        ``response``.
+
+        If the ``StoreFS`` was changed or created by another worker since the
+        status was loaded, the action is added to the ``response`` as failed.
+        """
+        try:
+            with self.claimed(fs_status):
+                action()
+        except (LockTimeout, StoreFSConflict) as e:
+            logger.warning(
+                "Failed %s: %s" % (action_type, fs_status.pootle_path))
+            return response.add(
+                action_type, fs_status, complete=False, msg=str(e))
+        return response.add(action_type, fs_status)
+
+    def track_file(self, fs_status, file_action=None, **kwargs):
+        """
+        Create the ``StoreFS`` for an untracked file or Store
+
+        :param file_action: Name of the ``FSFile`` method to call on the
+          new ``StoreFS``'s file, eg ``fetch``
+        :param kwargs: Fields to create the ``StoreFS`` with
+        :raises StoreFSConflict: If another worker is already tracking the
+          file or Store
+        """
+        from .models import StoreFS
+        tracked = self.translations.filter(
+            Q(pootle_path=fs_status.pootle_path) | Q(path=fs_status.fs_path))
+        if tracked.exists():
+            raise StoreFSConflict(
+                "File was tracked by another worker: %s" % fs_status.fs_path)
+        store_fs = StoreFS.objects.create(
+            project=self.project,
+            pootle_path=fs_status.pootle_path,
+            path=fs_status.fs_path,
+            **kwargs)
+        if file_action is not None:
+            getattr(store_fs.file, file_action)()
+        return store_fs
+
     @responds_to_status
     def sync_translations(self, status, response,
-                          pootle_path=None, fs_path=None):
-        self.remove_translation_files(
-            pootle_path=None, fs_path=None, response=response, status=status)
-        self.merge_translation_files(
-            pootle_path=None, fs_path=None, response=response, status=status)
-        self.pull_translations(
-            pootle_path=None, fs_path=None, response=response, status=status)
-        self.push_translations(
-            pootle_path=None, fs_path=None, response=response, status=status)
+                          pootle_path=None, fs_path=None, chunk_size=None):
+        """
+        :param chunk_size: Number of files to commit to the database at a
+          time, defaults to ``sync_chunk_size``
+        """
+        status.load(
+            "to_remove", "merge_pootle", "merge_fs",
+            "fs_added", "fs_ahead", "pootle_added", "pootle_ahead")
+        with self.chunked_transaction(chunk_size):
+            self.remove_translation_files(
+                pootle_path=None, fs_path=None,
+                response=response, status=status)
+            self.merge_translation_files(
+                pootle_path=None, fs_path=None,
+                response=response, status=status)
+            self.pull_translations(
+                pootle_path=None, fs_path=None,
+                response=response, status=status)
+            self.push_translations(
+                pootle_path=None, fs_path=None,
+                response=response, status=status)
         return response
 
 
 class Plugins(object):
+    """Registry of plugin classes by FS type.
+
+    Also hands out a single shared plugin instance per ``ProjectFS``, so
+    that the config, finders and language mapper for a project are only built
+    once per process. A shared instance is replaced when the ``ProjectFS``
+    type, url or config changes, or its plugin class is re-registered.
+    """
 
     def __init__(self):
         self.__plugins__ = {}
+        self.__instances__ = {}
+        self._lock = threading.Lock()
 
     def __getitem__(self, k):
         return self.__plugins__[k]
@@ -543,5 +1316,52 @@ class Plugins(object):
     def __contains__(self, k):
         return k in self.__plugins__
 
+    def clear_instances(self, fs=None):
+        """
+        Clear shared plugin instances
+
+        :param fs: Only clear the instance for this ``ProjectFS``
+        """
+        with self._lock:
+            if fs is None:
+                self.__instances__.clear()
+            else:
+                self.__instances__.pop(fs.pk, None)
+
+    def get_fs_version(self, fs):
+        return (
+            fs.fs_type,
+            fs.url,
+            fs.pootle_config,
+            fs.current_config and fs.current_config.name or None)
+
+    def get_plugin(self, fs):
+        """
+        Get the shared plugin instance for a ``ProjectFS``
+
+        :param fs: ``ProjectFS`` object
+        :raises KeyError: If the ``ProjectFS.fs_type`` is not registered
+        """
+        plugin_class = self[fs.fs_type]
+        if not fs.pk:
+            return plugin_class(fs)
+        with self._lock:
+            plugin = self.__instances__.get(fs.pk)
+            stale = (
+                plugin is None
+                or plugin.__class__ is not plugin_class
+                or (self.get_fs_version(plugin.fs)
+                    != self.get_fs_version(fs)))
+            if stale:
+                plugin = plugin_class(fs)
+                self.__instances__[fs.pk] = plugin
+            # a shared instance keeps the ``ProjectFS`` it was built with,
+            # as it may be in use by actions in other threads
+            return plugin
+
     def register(self, plugin):
-        self.__plugins__[plugin.name] = plugin
+        with self._lock:
+            self.__plugins__[plugin.name] = plugin
+            for k, instance in self.__instances__.items():
+                if instance.name == plugin.name:
+                    del self.__instances__[k]
@@ -76,10 +76,22 @@ FS_ACTION["merged_from_pootle"] = {
 
 class ActionStatus(Status):
 
-    def __init__(self, action_type, original_status, complete=True, msg=None):
+    __slots__ = (
+        "action_type", "_complete", "original_status", "msg", "response")
+
+    def __init__(self, action_type, original_status, complete=True, msg=None,
+                 response=None):
         self.action_type = action_type
-        self.complete = complete
+        self._complete = complete
         self.original_status = original_status
+        self.msg = msg
+        self.response = response
+        # objects that did not exist when the status was checked are loaded
+        # in bulk by path
+        if original_status.store_id is None:
+            self.loader.add(Store, "pootle_path", self.pootle_path)
+        if original_status.store_fs_id is None:
+            self.loader.add(StoreFS, "pootle_path", self.pootle_path)
 
     def __str__(self):
         if self.failed:
@@ -91,6 +103,19 @@ class ActionStatus(Status):
             % (self.project, failed,
                self.action_type, self.pootle_path, self.fs_path))
 
+    @property
+    def complete(self):
+        return self._complete
+
+    @complete.setter
+    def complete(self, complete):
+        complete = bool(complete)
+        if complete == bool(self._complete):
+            return
+        self._complete = complete
+        if self.response is not None:
+            self.response._count(self, complete and 1 or -1)
+
     @property
     def failed(self):
         return not self.complete
@@ -99,6 +124,10 @@ class ActionStatus(Status):
     def fs_path(self):
         return self.original_status.fs_path
 
+    @property
+    def loader(self):
+        return self.original_status.loader
+
     @property
     def pootle_path(self):
         return self.original_status.pootle_path
@@ -115,34 +144,45 @@ class ActionStatus(Status):
     def store(self):
         if self.original_status.store:
             return self.original_status.store
-        try:
-            return Store.objects.get(
-                pootle_path=self.original_status.pootle_path)
-        except Store.DoesNotExist:
-            return None
+        return self.loader.get_one(Store, "pootle_path", self.pootle_path)
 
     @property
     def store_fs(self):
         if self.original_status.store_fs:
             return self.original_status.store_fs
-        try:
-            return StoreFS.objects.get(
-                pootle_path=self.original_status.pootle_path,
-                fs_path=self.original_status.fs_path)
-        except:
-            return None
+        for store_fs in self.loader.get(
+                StoreFS, "pootle_path", self.pootle_path):
+            if store_fs.path == self.fs_path:
+                return store_fs
 
 
 class ActionResponse(object):
+    """Actions taken by a plugin, by action type.
+
+    Completed and failed actions are counted by type as they are added or
+    their ``complete`` status changes, so that counting them does not
+    iterate the actions.
+    """
 
     __actions__ = None
 
-    def __init__(self, plugin):
+    def __init__(self, plugin, on_change=None):
+        """
+        :param on_change: Function called with each action when it is added
+          and when its ``complete`` status changes
+        """
         self.plugin = plugin
-        self.__actions__ = {}
+        self.on_change = on_change
+        self.__actions__ = OrderedDict()
+        self.__completed__ = {}
+        self.__failed__ = {}
         for k in FS_ACTION.keys():
             self.__actions__[k] = []
-            self.__actions__[k] = []
+            self.__completed__[k] = 0
+            self.__failed__[k] = 0
+        self.__types__ = 0
+        self.total_completed = 0
+        self.total_failed = 0
 
     def __getitem__(self, k):
         return self.__actions__[k]
@@ -153,7 +193,7 @@ class ActionResponse(object):
                 yield k
 
     def __len__(self):
-        return len([x for x in self.__iter__()])
+        return self.__types__
 
     def __str__(self):
         if self.made_changes:
@@ -171,30 +211,49 @@ class ActionResponse(object):
 
     @property
     def has_failed(self):
-        return len(list(self.failed())) and True or False
+        return self.total_failed > 0
 
     @property
     def made_changes(self):
-        for complete in self.completed():
-            return True
-        return False
+        return self.total_completed > 0
 
     def add(self, action_type, fs_status, complete=True, msg=None):
         action = ActionStatus(
-            action_type, fs_status, complete=complete, msg=msg)
-        self.__actions__[action_type].append(action)
+            action_type, fs_status, complete=complete, msg=msg,
+            response=self)
+        actions = self.__actions__[action_type]
+        if not actions:
+            self.__types__ += 1
+        actions.append(action)
+        self._count(action)
+        if self.on_change:
+            self.on_change(action)
         return action
 
     def completed(self, *action_types):
         action_types = action_types or self.action_types
         for action_type in action_types:
+            if not self.__completed__[action_type]:
+                continue
             for action in self.__actions__[action_type]:
                 if not action.failed:
                     yield action
 
+    def count_completed(self, *action_types):
+        if not action_types:
+            return self.total_completed
+        return sum(self.__completed__[k] for k in action_types)
+
+    def count_failed(self, *action_types):
+        if not action_types:
+            return self.total_failed
+        return sum(self.__failed__[k] for k in action_types)
+
     def failed(self, *action_types):
         action_types = action_types or self.action_types
         for action_type in action_types:
+            if not self.__failed__[action_type]:
+                continue
             for action in self.__actions__[action_type]:
                 if action.failed:
                     yield action
@@ -204,10 +263,34 @@ class ActionResponse(object):
 
     def get_action_title(self, action_type, failures=False):
         st_type = self.get_action_type(action_type)
-        return (
-            "%s (%s)"
-            % (st_type['title'],
-               len(list(self.completed()))))
+        if failures:
+            count = self.count_failed(action_type)
+        else:
+            count = self.count_completed(action_type)
+        return "%s (%s)" % (st_type['title'], count)
 
     def get_action_type(self, action_type):
         return FS_ACTION[action_type]
+
+    def _count(self, action, change=None):
+        """
+        Update the counts for ``action``
+
+        :param change: ``1`` if the action has changed from failed to
+          complete, ``-1`` for the reverse, or ``None`` if it has been added
+        """
+        action_type = action.action_type
+        if change is None:
+            if action.complete:
+                self.__completed__[action_type] += 1
+                self.total_completed += 1
+            else:
+                self.__failed__[action_type] += 1
+                self.total_failed += 1
+            return
+        self.__completed__[action_type] += change
+        self.total_completed += change
+        self.__failed__[action_type] -= change
+        self.total_failed -= change
+        if self.on_change:
+            self.on_change(action)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, models
+
+from .locks import LockTimeout
+from .models import ProjectFS
+
+
+logger = logging.getLogger(__name__)
+
+FETCH = "fetch"
+PUSH = "push"
+
+
+class Scheduler(object):
+    """Runs the jobs of each enabled ``ProjectFS`` at its ``fetch_frequency``
+    and ``push_frequency``, in seconds, with at most ``max_jobs`` running at a
+    time.
+
+    A ``fetch`` job pulls the FS, and if it changed fetches the new files and
+    syncs. A ``push`` job syncs if there are new revisions in Pootle, and
+    with ``add_stores`` also adds new ``Stores``. A job is skipped if neither
+    the local checkout nor the Pootle revision of the project have changed
+    since it was last synced by the scheduler, and retried at its next
+    interval if another action holds the project lock.
+    """
+
+    # proportion of the interval that each run is moved by at random, so
+    # that projects with the same frequency do not all run together
+    jitter = 0.1
+    # seconds between checking for due jobs
+    poll_interval = 1
+
+    def __init__(self, max_jobs=None, add_stores=False):
+        """
+        :param add_stores: Add ``Stores`` that are not in the FS yet when
+          running ``push`` jobs
+        """
+        self.max_jobs = (
+            max_jobs
+            or getattr(settings, "POOTLE_FS_JOBS", None)
+            or multiprocessing.cpu_count())
+        self.add_stores = add_stores
+        # (project_code, job_type) -> (interval, next run time)
+        self.__schedule__ = {}
+        # project_code -> (checkout version, Pootle revision) when synced
+        self.__synced__ = {}
+        self.running = set()
+        self._lock = threading.Lock()
+
+    def get_due_jobs(self, now=None):
+        """
+        :returns jobs: A list of ``(project_code, job_type)`` that are due
+          and not running, earliest first
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            due = [
+                (next_run, job) for job, (interval, next_run)
+                in self.__schedule__.items()
+                if next_run <= now and job[0] not in self.running]
+        return [job for next_run, job in sorted(due)]
+
+    def get_next_run(self, interval, now=None):
+        if now is None:
+            now = time.time()
+        return now + interval * random.uniform(
+            1 - self.jitter, 1 + self.jitter)
+
+    def get_project_state(self, plugin):
+        """The checkout version and the Pootle revision of a project"""
+        revision = plugin.stores.aggregate(
+            revision=models.Max("unit__revision"))["revision"]
+        return plugin.checkout_manifest.version, revision or 0
+
+    def load_projects(self, now=None):
+        """
+        Schedule the jobs of the enabled projects with a frequency, and
+        unschedule those of other projects
+        """
+        if now is None:
+            now = time.time()
+        project_fs = ProjectFS.objects.filter(enabled=True).filter(
+            models.Q(fetch_frequency__gt=0)
+            | models.Q(push_frequency__gt=0))
+        intervals = {}
+        for project_code, fetch, push in project_fs.values_list(
+                "project__code", "fetch_frequency", "push_frequency"):
+            if fetch > 0:
+                intervals[(project_code, FETCH)] = fetch
+            if push > 0:
+                intervals[(project_code, PUSH)] = push
+        with self._lock:
+            for job in list(self.__schedule__):
+                if job not in intervals:
+                    del self.__schedule__[job]
+            for job, interval in intervals.items():
+                scheduled = self.__schedule__.get(job)
+                if scheduled is not None and scheduled[0] == interval:
+                    continue
+                # spread the first runs over the jitter of the interval
+                self.__schedule__[job] = (
+                    interval,
+                    now + interval * random.uniform(0, self.jitter))
+        return intervals
+
+    def run(self, once=False):
+        """
+        Run due jobs until interrupted
+
+        :param once: Run the jobs that are due and return when they are done
+        """
+        pool = ThreadPool(self.max_jobs)
+        logger.info("Started fs scheduler with %s jobs" % self.max_jobs)
+        try:
+            while True:
+                results = self.tick(pool)
+                if once:
+                    for result in results:
+                        result.wait()
+                    return
+                time.sleep(self.poll_interval)
+        finally:
+            pool.close()
+            pool.join()
+
+    def run_job(self, project_code, job_type):
+        """
+        Run a job for a project
+
+        :returns result: ``"synced"``, ``"skipped"``, ``"locked"`` or
+          ``"failed"``
+        """
+        try:
+            return self._run_job(project_code, job_type)
+        except LockTimeout:
+            logger.debug(
+                "Project is locked, not running %s: %s"
+                % (job_type, project_code))
+            return "locked"
+        except Exception:
+            logger.exception(
+                "Failed fs %s job: %s" % (job_type, project_code))
+            return "failed"
+        finally:
+            with self._lock:
+                self.running.discard(project_code)
+                scheduled = self.__schedule__.get((project_code, job_type))
+                if scheduled is not None:
+                    self.__schedule__[(project_code, job_type)] = (
+                        scheduled[0], self.get_next_run(scheduled[0]))
+
+    def _run_job(self, project_code, job_type):
+        plugin = ProjectFS.objects.get(project__code=project_code).plugin
+        synced = self.__synced__.get(project_code)
+        # a push only depends on Pootle, so it is skipped without pulling
+        unchanged = (
+            job_type == PUSH
+            and synced is not None
+            and self.get_project_state(plugin)[1] == synced[1])
+        if unchanged:
+            logger.debug(
+                "Skipping unchanged %s: %s" % (job_type, project_code))
+            return "skipped"
+        started = time.time()
+        # the status is read under the lock, so that it is current when the
+        # actions use it
+        with plugin.locked(timeout=0):
+            plugin.refresh()
+            if job_type == FETCH and self.get_project_state(plugin) == synced:
+                logger.debug(
+                    "Skipping unchanged %s: %s" % (job_type, project_code))
+                return "skipped"
+            # use the checkout that was just pulled
+            status = plugin.status(max_age=time.time() - started)
+            if status.has_changed:
+                if job_type == FETCH:
+                    plugin.fetch_translations(status=status)
+                elif self.add_stores:
+                    plugin.add_translations(status=status)
+                plugin.sync_translations(max_age=time.time() - started)
+            self.__synced__[project_code] = self.get_project_state(plugin)
+        logger.info("Ran fs %s job: %s" % (job_type, project_code))
+        return "synced"
+
+    def _run_pooled_job(self, project_code, job_type):
+        try:
+            return self.run_job(project_code, job_type)
+        finally:
+            # each pool thread has its own database connection
+            connection.close()
+
+    def tick(self, pool, now=None):
+        """
+        Start the jobs that are due in the ``pool``
+
+        :returns results: The ``AsyncResult`` of each job started
+        """
+        self.load_projects(now)
+        results = []
+        for project_code, job_type in self.get_due_jobs(now):
+            with self._lock:
+                if project_code in self.running:
+                    continue
+                self.running.add(project_code)
+            results.append(
+                pool.apply_async(
+                    self._run_pooled_job, (project_code, job_type)))
+        return results
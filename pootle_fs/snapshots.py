@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import gzip
+from hashlib import md5
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = "__snapshots__"
+
+
+class SnapshotStore(object):
+    """Compressed snapshots of file content as it was when last synced,
+    stored on disk by ``StoreFS`` and hash.
+
+    Only the ``retention`` most recent snapshots are kept for each
+    ``StoreFS``.
+    """
+
+    def __init__(self, path, retention=2):
+        self.path = path
+        self.retention = retention
+
+    def __contains__(self, k):
+        store_fs, latest_hash = k
+        return os.path.exists(self.get_path(store_fs, latest_hash))
+
+    @property
+    def enabled(self):
+        return self.retention > 0
+
+    def clear(self):
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+
+    def delete(self, store_fs):
+        """Remove all snapshots for a ``StoreFS``"""
+        store_fs_path = self.get_store_fs_path(store_fs)
+        if os.path.exists(store_fs_path):
+            shutil.rmtree(store_fs_path)
+
+    def get(self, store_fs, latest_hash=None):
+        """
+        Get the content of a file as it was when it had ``latest_hash``
+
+        :param latest_hash: Defaults to the ``StoreFS.last_sync_hash``
+        :returns: The file content, or ``None`` if there is no snapshot
+        """
+        if latest_hash is None:
+            latest_hash = store_fs.last_sync_hash
+        if not latest_hash or not store_fs.pk:
+            return
+        snapshot_path = self.get_path(store_fs, latest_hash)
+        if not os.path.exists(snapshot_path):
+            return
+        with gzip.open(snapshot_path, "rb") as f:
+            return f.read()
+
+    def get_path(self, store_fs, latest_hash):
+        if not re.match(r"^[\w\-]+$", latest_hash):
+            latest_hash = md5(latest_hash).hexdigest()
+        return os.path.join(
+            self.get_store_fs_path(store_fs),
+            "%s.gz" % latest_hash)
+
+    def get_store_fs_path(self, store_fs):
+        return os.path.join(self.path, str(store_fs.pk))
+
+    def prune(self, store_fs, keep=None):
+        """Remove all but the ``retention`` most recent snapshots for a
+        ``StoreFS``
+
+        :param keep: Path to a snapshot that should always be kept
+        """
+        store_fs_path = self.get_store_fs_path(store_fs)
+        if not os.path.exists(store_fs_path):
+            return
+        snapshots = sorted(
+            (os.path.join(store_fs_path, filename)
+             for filename in os.listdir(store_fs_path)
+             if filename.endswith(".gz")),
+            key=lambda path: (path == keep, os.path.getmtime(path)),
+            reverse=True)
+        for snapshot_path in snapshots[self.retention:]:
+            os.unlink(snapshot_path)
+
+    def save(self, store_fs, latest_hash, content):
+        """
+        Save a snapshot of the content of a file with ``latest_hash``
+
+        The snapshot is written to a temporary file and then moved into
+        place, so a partial snapshot is never read. Nothing is written if
+        there is already a snapshot with ``latest_hash``.
+        """
+        if not self.enabled or not latest_hash or not store_fs.pk:
+            return
+        snapshot_path = self.get_path(store_fs, latest_hash)
+        if os.path.exists(snapshot_path):
+            return
+        directory = os.path.dirname(snapshot_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                with gzip.GzipFile(fileobj=tmp, mode="wb") as f:
+                    f.write(content)
+            os.rename(tmp_path, snapshot_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        logger.debug("Saved snapshot: %s" % snapshot_path)
+        self.prune(store_fs, keep=snapshot_path)
@@ -11,13 +11,17 @@ from fnmatch import fnmatch
 import logging
 import re
 import os
+import time
+import weakref
 
+from django.db import models
 from django.utils.functional import cached_property
-from django.utils.lru_cache import lru_cache
 
 from pootle_project.models import Project
+from pootle_store.models import Store
 
-from .models import FS_WINS, POOTLE_WINS
+from .identity import IdentityMap, lookup, use_identity_map
+from .models import FS_WINS, POOTLE_WINS, ProjectFS, StoreFS
 
 
 logger = logging.getLogger(__name__)
@@ -73,26 +77,110 @@ FS_STATUS["to_remove"] = {
     "description": "Files or Stores that have been staged or removal on sync"}
 
 
+class StatusLoader(object):
+    """Shared by ``Status`` records, which only keep ids and paths.
+
+    Holds the plugin that the records belong to, and loads the ``StoreFS``
+    and ``Store`` instances for all of the records in bulk the first time
+    that any of them is needed. Instances that are still in use elsewhere
+    when they are needed are reused rather than loaded again.
+    """
+
+    chunk_size = 500
+
+    def __init__(self, plugin=None):
+        self.plugin = plugin
+        self.__alive__ = weakref.WeakValueDictionary()
+        self.__loaded__ = {}
+        self.__pending__ = {}
+
+    @property
+    def project(self):
+        if self.plugin:
+            return self.plugin.project
+
+    def add(self, model, field, value, instance=None):
+        """
+        Add a lookup to be loaded in bulk with the other lookups on ``field``
+
+        :param instance: The instance for the lookup if one is already
+          loaded
+        """
+        if value is None:
+            return
+        key = (model, field, value)
+        if instance is not None:
+            self.__alive__[key] = instance
+        if key not in self.__loaded__:
+            self.__pending__.setdefault((model, field), set()).add(value)
+
+    def get(self, model, field, value):
+        """
+        :return instances: The instances of ``model`` where ``field`` matches
+          ``value``
+        """
+        if value is None:
+            return []
+        key = (model, field, value)
+        if key not in self.__loaded__:
+            self.add(model, field, value)
+            self._load(model, field)
+        return self.__loaded__[key]
+
+    def get_one(self, model, field, value):
+        for instance in self.get(model, field, value):
+            return instance
+
+    def _load(self, model, field):
+        to_load = []
+        for value in self.__pending__.pop((model, field), ()):
+            key = (model, field, value)
+            if key in self.__loaded__:
+                continue
+            instance = self.__alive__.get(key)
+            if instance is not None:
+                self.__loaded__[key] = [instance]
+            else:
+                self.__loaded__[key] = []
+                to_load.append(value)
+        for i in range(0, len(to_load), self.chunk_size):
+            instances = model.objects.filter(
+                **{"%s__in" % field: to_load[i:i + self.chunk_size]})
+            for instance in instances:
+                self.__loaded__[
+                    (model, field, getattr(instance, field))].append(instance)
+
+
 class Status(object):
 
+    __slots__ = (
+        "status", "fs_path", "pootle_path", "store_fs_id", "store_id",
+        "loader")
+
     def __init__(self, status, store_fs=None, store=None,
-                 fs_path=None, pootle_path=None):
+                 fs_path=None, pootle_path=None, loader=None):
         self.status = status
-        self.store_fs = store_fs
+        self.loader = loader or StatusLoader()
+        self.store_fs_id = None
         if store_fs:
-            self.store = store_fs.store
+            self.store_fs_id = store_fs.pk
+            self.store_id = store_fs.store_id
+            self.loader.add(StoreFS, "pk", store_fs.pk, store_fs)
+        elif store:
+            self.store_id = store.pk
+            self.loader.add(Store, "pk", store.pk, store)
         else:
-            self.store = store
+            self.store_id = None
         self.fs_path = fs_path
         self.pootle_path = pootle_path
-        self._set_paths()
+        self._set_paths(store_fs, store)
 
     def __eq__(self, other):
         return (
             isinstance(other, self.__class__)
             and other.status == self.status
-            and other.store_fs == self.store_fs
-            and other.store == self.store
+            and other.store_fs_id == self.store_fs_id
+            and other.store_id == self.store_id
             and other.fs_path == self.fs_path
             and other.pootle_path == self.pootle_path)
 
@@ -107,13 +195,13 @@ class Status(object):
             % (self.project, self.status,
                self.pootle_path, self.fs_path))
 
-    def _set_paths(self):
+    def _set_paths(self, store_fs=None, store=None):
 
-        if self.store_fs:
-            self.fs_path = self.store_fs.path
-            self.pootle_path = self.store_fs.pootle_path
-        elif self.store:
-            self.pootle_path = self.store.pootle_path
+        if store_fs:
+            self.fs_path = store_fs.path
+            self.pootle_path = store_fs.pootle_path
+        elif store:
+            self.pootle_path = store.pootle_path
 
         if not self.fs_path or not self.pootle_path:
             raise ValueError(
@@ -121,37 +209,63 @@ class Status(object):
 
     @property
     def plugin(self):
+        if self.loader.plugin:
+            return self.loader.plugin
         if self.store_fs:
             return self.store_fs.fs.plugin
-        return self.project.fs.get().plugin
+        return lookup(ProjectFS, "project_id", self.project.pk).plugin
 
     @property
     def project(self):
+        if self.loader.project:
+            return self.loader.project
         if self.store_fs:
             return self.store_fs.project
         else:
-            return Project.objects.get(
-                code=self.pootle_path.strip("/").split("/")[1])
+            return lookup(
+                Project, "code", self.pootle_path.strip("/").split("/")[1])
+
+    @property
+    def store(self):
+        return self.loader.get_one(Store, "pk", self.store_id)
+
+    @property
+    def store_fs(self):
+        return self.loader.get_one(StoreFS, "pk", self.store_fs_id)
 
 
 class ProjectFSStatus(object):
+    """Status of the files and Stores of a project, by status type.
+
+    Each status type is checked the first time it is used, and the data that
+    the checks share is only loaded once. Lookups made while checking use the
+    ``identities`` that the status was created with.
+    """
 
     link_status_class = Status
 
-    def __init__(self, fs, fs_path=None, pootle_path=None):
+    def __init__(self, fs, fs_path=None, pootle_path=None, identities=None):
         self.fs = fs
+        self.loader = StatusLoader(fs)
+        self.identities = identities
         self.__status__ = {}
         self._check_status(fs_path=fs_path, pootle_path=pootle_path)
 
     def __contains__(self, k):
-        return k in self.__status__ and self.__status__[k]
+        return k in FS_STATUS and bool(self[k])
 
     def __getitem__(self, k):
+        if k not in self.__status__:
+            if k not in FS_STATUS:
+                raise KeyError(k)
+            logger.debug("Checking %s" % k)
+            with use_identity_map(self.identities):
+                self.__status__[k] = list(getattr(self, "get_%s" % k)())
         return self.__status__[k]
 
     def __iter__(self):
-        for k in self.__status__:
-            if self.__status__[k]:
+        for k in FS_STATUS:
+            if self[k]:
                 yield k
 
     def __str__(self):
@@ -159,11 +273,18 @@ class ProjectFSStatus(object):
             return (
                 "<ProjectFSStatus(%s): %s>"
                 % (self.fs.project,
-                   ', '.join(["%s: %s" % (k, len(v))
-                              for k, v in self.__status__.items()
-                              if v])))
+                   ', '.join(["%s: %s" % (k, len(self[k]))
+                              for k in self])))
         return "<ProjectFSStatus(%s): Everything up-to-date>" % self.fs.project
 
+    @property
+    def age(self):
+        """Seconds since the files that the status was checked against were
+        pulled, or ``None`` if that is not known
+        """
+        if self.pulled_at is not None:
+            return max(0, time.time() - self.pulled_at)
+
     @cached_property
     def addable_translations(self):
         return self.fs.addable_translations
@@ -178,7 +299,7 @@ class ProjectFSStatus(object):
 
     @property
     def has_changed(self):
-        return any(self.__status__.values())
+        return any(self[k] for k in FS_STATUS)
 
     @cached_property
     def pootle_path_root(self):
@@ -186,15 +307,16 @@ class ProjectFSStatus(object):
 
     @cached_property
     def store_fs_paths(self):
-        return self.fs.translations.values_list("path", flat=True)
+        return set(self.fs.translations.values_list("path", flat=True))
 
     @cached_property
     def store_fs_pootle_paths(self):
-        return self.fs.translations.values_list("pootle_path", flat=True)
+        return set(
+            self.fs.translations.values_list("pootle_path", flat=True))
 
     @cached_property
     def store_paths(self):
-        return self.fs.stores.values_list("pootle_path", flat=True)
+        return set(self.fs.stores.values_list("pootle_path", flat=True))
 
     @cached_property
     def store_reversed_paths(self):
@@ -215,6 +337,17 @@ class ProjectFSStatus(object):
                 path__startswith=self.fs_path_root)
         return synced
 
+    @cached_property
+    def synced_files(self):
+        """The ``StoreFS`` matching the filters that have been synced, shared
+        by the status checks that use them
+        """
+        return list(self._filtered_qs(self.synced_translations))
+
+    @cached_property
+    def unsynced_files(self):
+        return list(self._filtered_qs(self.unsynced_translations))
+
     @cached_property
     def unsynced_translations(self):
         unsynced = self.fs.unsynced_translations.exclude(
@@ -232,101 +365,80 @@ class ProjectFSStatus(object):
         return re.compile("[\?\[\*].*")
 
     def add(self, k, v):
-        if k in self.__status__:
-            self.__status__[k].append(v)
-
-    def check_status(self, fs_path=None, pootle_path=None):
-        self.fs.pull()
+        if k in FS_STATUS:
+            self[k].append(v)
+
+    def check_status(self, fs_path=None, pootle_path=None, max_age=None):
+        self.fs.refresh(max_age)
+        if self.identities is not None:
+            # Stores may have been added or removed since the last check
+            self.identities = IdentityMap()
+            self.fs.preload_identities(self.identities)
         return self._check_status(
             fs_path=fs_path, pootle_path=pootle_path)
 
+    def link_status(self, status, **kwargs):
+        return self.link_status_class(status, loader=self.loader, **kwargs)
+
     def get_both_removed(self):
-        for store_fs in self._filtered_qs(self.synced_translations):
-            if not store_fs.file.exists and not store_fs.store:
-                yield self.link_status_class(
+        for store_fs in self.synced_files:
+            if not store_fs.file.exists and not store_fs.store_id:
+                yield self.link_status(
                     "both_removed",
                     store_fs=store_fs)
 
     def get_conflict(self):
-        for store_fs in self._filtered_qs(self.synced_translations):
+        for store_fs in self.synced_files:
             pootle_changed, fs_changed = self._get_changes(store_fs)
             if fs_changed and pootle_changed and not store_fs.resolve_conflict:
-                yield self.link_status_class(
+                yield self.link_status(
                     "conflict",
                     store_fs=store_fs)
 
     def get_conflict_untracked(self):
-        reversed_paths = self.store_reversed_paths
-        for pootle_path, path in self.fs_translations:
-            if self._filtered(pootle_path, path):
-                continue
-            if pootle_path in self.store_fs_pootle_paths:
-                continue
-            if path in self.store_fs_paths:
-                continue
-            conflicts = False
-            if pootle_path in self.store_paths:
-                conflicts = True
-            elif path in reversed_paths:
-                pootle_path = reversed_paths[path]
-                conflicts = True
-            if conflicts:
-                # print("Yielding conflict_untracked status")
-                yield self.link_status_class(
-                    "conflict_untracked",
-                    pootle_path=pootle_path,
-                    fs_path=path)
+        for pootle_path, path in self._get_conflict_untracked_paths():
+            yield self.link_status(
+                "conflict_untracked",
+                pootle_path=pootle_path,
+                fs_path=path)
 
     def get_fs_added(self):
-        unsynced = self._filtered_qs(
-            self.unsynced_translations.exclude(
-                resolve_conflict=POOTLE_WINS))
-        for store_fs in unsynced:
+        for store_fs in self.unsynced_files:
+            if store_fs.resolve_conflict == POOTLE_WINS:
+                continue
             if store_fs.file.exists:
-                yield self.link_status_class(
+                yield self.link_status(
                     "fs_added",
                     store_fs=store_fs)
-        synced = self._filtered_qs(
-            self.synced_translations.filter(
-                resolve_conflict=FS_WINS))
-        for store_fs in synced:
-            if not store_fs.store and store_fs.file.exists:
-                yield self.link_status_class(
+        for store_fs in self.synced_files:
+            if store_fs.resolve_conflict != FS_WINS:
+                continue
+            if not store_fs.store_id and store_fs.file.exists:
+                yield self.link_status(
                     "fs_added",
                     store_fs=store_fs)
 
     def get_fs_ahead(self):
-        for store_fs in self._filtered_qs(self.synced_translations):
+        for store_fs in self.synced_files:
             pootle_changed, fs_changed = self._get_changes(store_fs)
             if fs_changed:
                 if not pootle_changed or store_fs.resolve_conflict == FS_WINS:
-                    yield self.link_status_class(
+                    yield self.link_status(
                         "fs_ahead",
                         store_fs=store_fs)
 
     def get_fs_removed(self):
-        synced = self._filtered_qs(
-            self.synced_translations.exclude(
-                resolve_conflict=POOTLE_WINS))
-        for store_fs in synced:
-            if not store_fs.file.exists and store_fs.store:
-                yield self.link_status_class(
+        for store_fs in self.synced_files:
+            if store_fs.resolve_conflict == POOTLE_WINS:
+                continue
+            if store_fs.store_id and not store_fs.file.exists:
+                yield self.link_status(
                     "fs_removed",
                     store_fs=store_fs)
 
     def get_fs_untracked(self):
-        reversed_paths = self.store_reversed_paths
-        for pootle_path, path in self.fs_translations:
-            if self._filtered(pootle_path, path):
-                continue
-            exists_anywhere = (
-                pootle_path in self.store_fs_pootle_paths
-                or pootle_path in self.store_paths
-                or path in self.store_fs_paths
-                or path in reversed_paths)
-            if exists_anywhere:
-                continue
-            yield self.link_status_class(
+        for pootle_path, path in self._get_fs_untracked_paths():
+            yield self.link_status(
                 "fs_untracked",
                 pootle_path=pootle_path,
                 fs_path=path)
@@ -336,49 +448,46 @@ class ProjectFSStatus(object):
             staged_for_merge=True, resolve_conflict=POOTLE_WINS)
 
         for store_fs in self._filtered_qs(to_merge):
-            yield self.link_status_class("merge_pootle", store_fs=store_fs)
+            yield self.link_status("merge_pootle", store_fs=store_fs)
 
     def get_merge_fs(self):
         to_merge = self.fs.translations.filter(
             staged_for_merge=True, resolve_conflict=FS_WINS)
 
         for store_fs in self._filtered_qs(to_merge):
-            yield self.link_status_class("merge_fs", store_fs=store_fs)
+            yield self.link_status("merge_fs", store_fs=store_fs)
 
     def get_pootle_added(self):
-        unsynced = self._filtered_qs(
-            self.unsynced_translations.exclude(
-                resolve_conflict=FS_WINS))
-        for store_fs in unsynced:
-            if store_fs.store:
-                yield self.link_status_class(
+        for store_fs in self.unsynced_files:
+            if store_fs.resolve_conflict == FS_WINS:
+                continue
+            if store_fs.store_id:
+                yield self.link_status(
                     "pootle_added",
                     store_fs=store_fs)
-        synced = self._filtered_qs(
-            self.synced_translations.filter(
-                resolve_conflict=POOTLE_WINS))
-        for store_fs in synced:
-            if not store_fs.file.exists and store_fs.store:
-                yield self.link_status_class(
+        for store_fs in self.synced_files:
+            if store_fs.resolve_conflict != POOTLE_WINS:
+                continue
+            if store_fs.store_id and not store_fs.file.exists:
+                yield self.link_status(
                     "pootle_added",
                     store_fs=store_fs)
 
     def get_pootle_ahead(self):
-        for store_fs in self._filtered_qs(self.synced_translations):
+        for store_fs in self.synced_files:
             pootle_changed, fs_changed = self._get_changes(store_fs)
             if pootle_changed:
                 if not fs_changed or store_fs.resolve_conflict == POOTLE_WINS:
-                    yield self.link_status_class(
+                    yield self.link_status(
                         "pootle_ahead",
                         store_fs=store_fs)
 
     def get_pootle_removed(self):
-        synced = self._filtered_qs(
-            self.synced_translations.exclude(
-                resolve_conflict=FS_WINS))
-        for store_fs in synced:
-            if store_fs.file.exists and not store_fs.store:
-                yield self.link_status_class(
+        for store_fs in self.synced_files:
+            if store_fs.resolve_conflict == FS_WINS:
+                continue
+            if not store_fs.store_id and store_fs.file.exists:
+                yield self.link_status(
                     "pootle_removed",
                     store_fs=store_fs)
 
@@ -390,7 +499,7 @@ class ProjectFSStatus(object):
                 self.fs.local_fs_path,
                 self.fs.get_fs_path(store.pootle_path).lstrip("/"))
             if not os.path.exists(target):
-                yield self.link_status_class(
+                yield self.link_status(
                     "pootle_untracked",
                     store=store,
                     fs_path=path)
@@ -411,50 +520,235 @@ class ProjectFSStatus(object):
         to_remove = self.fs.translations.filter(staged_for_removal=True)
 
         for store_fs in self._filtered_qs(to_remove):
-            yield self.link_status_class("to_remove", store_fs=store_fs)
+            yield self.link_status("to_remove", store_fs=store_fs)
 
     def get_unchanged(self):
         problem_paths = []
-        for k, v in self.__status__.items():
-            if v:
-                problem_paths += [p.pootle_path for p in v]
+        for k in self:
+            problem_paths += [p.pootle_path for p in self[k]]
         return self.synced_translations.exclude(
             pootle_path__in=problem_paths)
 
+    def load(self, *status_types):
+        """
+        Check the given status types now, rather than when they are first
+        used. Actions that change files or Stores load the status types
+        that they use before making any changes.
+        """
+        for k in status_types or FS_STATUS.keys():
+            self[k]
+        return self
+
     def _check_status(self, fs_path=None, pootle_path=None):
         self.fs_path = fs_path
         self.pootle_path = pootle_path
+        self.pulled_at = self.fs.pulled_at
         self._clear_cache()
-        logger.debug("Checking status")
-        for k in FS_STATUS.keys():
-            logger.debug("Checking %s" % k)
-            for v in getattr(self, "get_%s" % k)():
-                self.add(k, v)
         return self
 
     def _clear_cache(self):
         for k in self.__dict__.keys():
-            if callable(getattr(self, k, None)):
+            if isinstance(getattr(self.__class__, k, None), cached_property):
                 del self.__dict__[k]
-        self._get_changes.cache_clear()
-        self._filtered.cache_clear()
-        self.__status__ = {k: [] for k in FS_STATUS.keys()}
+        self.__changes__ = {}
+        self.__filtered__ = {}
+        self.__status__ = {}
+
+    def _get_conflict_untracked_paths(self):
+        reversed_paths = self.store_reversed_paths
+        for pootle_path, path in self.fs_translations:
+            if self._filtered(pootle_path, path):
+                continue
+            if pootle_path in self.store_fs_pootle_paths:
+                continue
+            if path in self.store_fs_paths:
+                continue
+            if pootle_path in self.store_paths:
+                yield pootle_path, path
+            elif path in reversed_paths:
+                yield reversed_paths[path], path
+
+    def _get_fs_untracked_paths(self):
+        reversed_paths = self.store_reversed_paths
+        for pootle_path, path in self.fs_translations:
+            if self._filtered(pootle_path, path):
+                continue
+            exists_anywhere = (
+                pootle_path in self.store_fs_pootle_paths
+                or pootle_path in self.store_paths
+                or path in self.store_fs_paths
+                or path in reversed_paths)
+            if not exists_anywhere:
+                yield pootle_path, path
 
-    @lru_cache(maxsize=None)
     def _filtered(self, pootle_path, fs_path):
-        return (
-            (self.pootle_path
-             and not fnmatch(pootle_path, self.pootle_path))
-            or
-            (self.fs_path
-             and not fnmatch(fs_path, self.fs_path)))
+        k = (pootle_path, fs_path)
+        if k not in self.__filtered__:
+            self.__filtered__[k] = (
+                (self.pootle_path
+                 and not fnmatch(pootle_path, self.pootle_path))
+                or
+                (self.fs_path
+                 and not fnmatch(fs_path, self.fs_path)))
+        return self.__filtered__[k]
 
     def _filtered_qs(self, qs):
         for store_fs in qs.iterator():
             if not self._filtered(store_fs.pootle_path, store_fs.path):
                 yield store_fs
 
-    @lru_cache(maxsize=None)
     def _get_changes(self, store_fs):
-        fs_file = store_fs.file
-        return fs_file.pootle_changed, fs_file.fs_changed
+        if store_fs.pk not in self.__changes__:
+            fs_file = store_fs.file
+            self.__changes__[store_fs.pk] = (
+                fs_file.pootle_changed, fs_file.fs_changed)
+        return self.__changes__[store_fs.pk]
+
+
+class ProjectFSStatusCounts(ProjectFSStatus):
+    """The number of files or Stores with each status.
+
+    Counts are the same as those of a ``ProjectFSStatus``, but are made with
+    aggregate queries and a pass over the files without creating ``Status``
+    records. Files are hashed with ``Plugin.get_path_hash`` - only if the
+    plugin can not hash a file by its path is its ``StoreFS`` loaded, to
+    hash it with the plugin's file class.
+    """
+
+    def __str__(self):
+        if self.has_changed:
+            return (
+                "<ProjectFSStatusCounts(%s): %s>"
+                % (self.fs.project,
+                   ', '.join(["%s: %s" % (k, v)
+                              for k, v in self.__status__.items()
+                              if v])))
+        return (
+            "<ProjectFSStatusCounts(%s): Everything up-to-date>"
+            % self.fs.project)
+
+    @cached_property
+    def store_revisions(self):
+        return dict(
+            self.fs.stores.annotate(
+                max_revision=models.Max("unit__revision")).values_list(
+                    "pootle_path", "max_revision"))
+
+    def get_status_title(self, status_type):
+        st_type = self.get_status_type(status_type)
+        return "%s (%s)" % (st_type['title'], self[status_type])
+
+    def _check_status(self, fs_path=None, pootle_path=None):
+        self.fs_path = fs_path
+        self.pootle_path = pootle_path
+        self.pulled_at = self.fs.pulled_at
+        self._clear_cache()
+        logger.debug("Counting status")
+        self.__status__ = OrderedDict((k, 0) for k in FS_STATUS.keys())
+        self._count_untracked()
+        self._count_unsynced()
+        self._count_synced()
+        self._count_staged()
+        return self
+
+    def _count_paths(self, qs):
+        if not self.pootle_path and not self.fs_path:
+            return qs.count()
+        return len(
+            [pootle_path for pootle_path, path
+             in qs.values_list("pootle_path", "path")
+             if not self._filtered(pootle_path, path)])
+
+    def _count_staged(self):
+        translations = self.fs.translations
+        self.__status__["merge_pootle"] = self._count_paths(
+            translations.filter(
+                staged_for_merge=True, resolve_conflict=POOTLE_WINS))
+        self.__status__["merge_fs"] = self._count_paths(
+            translations.filter(
+                staged_for_merge=True, resolve_conflict=FS_WINS))
+        self.__status__["to_remove"] = self._count_paths(
+            translations.filter(staged_for_removal=True))
+
+    def _count_synced(self):
+        synced = self.synced_translations.values_list(
+            "pootle_path", "path", "store_id", "resolve_conflict",
+            "last_sync_hash", "last_sync_revision")
+        # files that the plugin can only hash with its file class
+        unhashed = {}
+        for row in synced:
+            pootle_path, path = row[:2]
+            if self._filtered(pootle_path, path):
+                continue
+            if not self._exists(path):
+                self._count_synced_row(row, False, False)
+                continue
+            latest_hash = self.fs.get_path_hash(path)
+            if latest_hash is None:
+                unhashed[path] = row
+                continue
+            self._count_synced_row(row, True, latest_hash != row[4])
+        if unhashed:
+            for store_fs in self.synced_translations.filter(
+                    path__in=list(unhashed)).iterator():
+                self._count_synced_row(
+                    unhashed[store_fs.path], True,
+                    bool(store_fs.file.fs_changed))
+
+    def _count_synced_row(self, row, exists, fs_changed):
+        status = self.__status__
+        pootle_path, path, store_id, resolve_conflict = row[:4]
+        last_sync_revision = row[5]
+        has_store = store_id is not None
+        pootle_changed = (
+            pootle_path in self.store_revisions
+            and ((self.store_revisions[pootle_path] or 0)
+                 != last_sync_revision))
+        if fs_changed and pootle_changed and not resolve_conflict:
+            status["conflict"] += 1
+        if fs_changed:
+            if not pootle_changed or resolve_conflict == FS_WINS:
+                status["fs_ahead"] += 1
+        if pootle_changed:
+            if not fs_changed or resolve_conflict == POOTLE_WINS:
+                status["pootle_ahead"] += 1
+        if has_store and not exists:
+            if resolve_conflict != POOTLE_WINS:
+                status["fs_removed"] += 1
+            else:
+                status["pootle_added"] += 1
+        if exists and not has_store:
+            if resolve_conflict != FS_WINS:
+                status["pootle_removed"] += 1
+            else:
+                status["fs_added"] += 1
+
+    def _count_unsynced(self):
+        status = self.__status__
+        unsynced = self.unsynced_translations.values_list(
+            "pootle_path", "path", "store_id", "resolve_conflict")
+        for pootle_path, path, store_id, resolve_conflict in unsynced:
+            if self._filtered(pootle_path, path):
+                continue
+            if resolve_conflict != POOTLE_WINS and self._exists(path):
+                status["fs_added"] += 1
+            if resolve_conflict != FS_WINS and store_id is not None:
+                status["pootle_added"] += 1
+
+    def _count_untracked(self):
+        status = self.__status__
+        status["fs_untracked"] = len(list(self._get_fs_untracked_paths()))
+        status["conflict_untracked"] = len(
+            list(self._get_conflict_untracked_paths()))
+        addable = self.fs.stores.exclude(obsolete=True).filter(
+            fs__isnull=True).values_list("pootle_path", flat=True)
+        for pootle_path in addable:
+            path = self.fs.get_fs_path(pootle_path)
+            if not path or self._filtered(pootle_path, path):
+                continue
+            if not self._exists(path):
+                status["pootle_untracked"] += 1
+
+    def _exists(self, path):
+        return os.path.exists(
+            os.path.join(self.fs.local_fs_path, path.lstrip("/")))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from contextlib import contextmanager
+import logging
+
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedTransaction(object):
+    """Commits sync actions in chunks of ``chunk_size`` files, wrapping each
+    file in its own savepoint so that a failing file can be rolled back
+    without affecting the rest of the chunk.
+
+    Changes made to the filesystem are not transactional and are not rolled
+    back.
+    """
+
+    def __init__(self, chunk_size, using=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        self.chunk_size = chunk_size
+        self.using = using
+        self.count = 0
+        self.chunks = 0
+        self._atomic = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.commit(exc_type, exc_value, traceback)
+
+    def commit(self, exc_type=None, exc_value=None, traceback=None):
+        """Close the current chunk, committing it unless an exception is
+        passed, in which case it is rolled back.
+        """
+        if self._atomic is None:
+            return
+        atomic, self._atomic = self._atomic, None
+        atomic.__exit__(exc_type, exc_value, traceback)
+        self.chunks += 1
+        logger.debug(
+            "Committed sync chunk %s (%s files)"
+            % (self.chunks, self.count))
+
+    @contextmanager
+    def savepoint(self):
+        if self._atomic is None:
+            self._atomic = transaction.atomic(using=self.using)
+            self._atomic.__enter__()
+        try:
+            with transaction.atomic(using=self.using):
+                yield
+        finally:
+            self.count += 1
+            if not self.count % self.chunk_size:
+                self.commit()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import errno
+import json
+import logging
+from multiprocessing.pool import ThreadPool
+import os
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import close_old_connections
+from django.utils import six
+from django.utils.six.moves import socketserver
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_SOCKET = "__worker__.sock"
+
+# commands for a project share its plugin, so only one runs at a time
+_project_locks = {}
+_project_locks_lock = threading.Lock()
+
+
+def get_socket_path():
+    """The socket of the fs worker, ``POOTLE_FS_WORKER_SOCKET`` or a socket
+    in ``POOTLE_FS_PATH``
+    """
+    return (
+        getattr(settings, "POOTLE_FS_WORKER_SOCKET", None)
+        or os.path.join(settings.POOTLE_FS_PATH, WORKER_SOCKET))
+
+
+def get_project_lock(project_code):
+    with _project_locks_lock:
+        return _project_locks.setdefault(project_code, threading.Lock())
+
+
+def run_command(argv):
+    """
+    Run an ``fs`` command line for a project, capturing its output
+
+    Commands for the same project run one at a time. Commands that are not
+    for a single project are not run, as they may start a process pool.
+
+    :param argv: The arguments of the ``fs`` command
+    :returns: A ``(exit_code, stdout, stderr)`` tuple
+    """
+    from .management.commands.fs import Command
+
+    command = Command()
+    stdout = six.StringIO()
+    stderr = six.StringIO()
+    exit_code = 0
+    argv = ["pootle", "fs"] + list(argv)
+    try:
+        if not command.is_project_command(argv):
+            raise CommandError(
+                "Only commands for a single project can be run by the fs "
+                "worker")
+        with get_project_lock(argv[2]):
+            command.run_argv(
+                argv, forwarded=True, stdout=stdout, stderr=stderr)
+    except Exception as e:
+        if not isinstance(e, CommandError):
+            logger.exception("Failed fs command: %s" % " ".join(argv[2:]))
+        stderr.write("%s: %s\n" % (e.__class__.__name__, e))
+        exit_code = 1
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+def send_command(socket_path, argv):
+    """
+    Run an ``fs`` command line in the worker listening on ``socket_path``
+
+    :param argv: The arguments of the ``fs`` command
+    :returns: A ``(exit_code, stdout, stderr)`` tuple
+    :raises socket.error: If there is no worker to connect to
+    :raises CommandError: If the connection to the worker is lost while it
+      runs the command
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except socket.error:
+        client.close()
+        raise
+    try:
+        client.sendall(json.dumps(dict(argv=list(argv))).encode("utf-8"))
+        client.sendall(b"\n")
+        line = client.makefile("rb").readline()
+        response = json.loads(line.decode("utf-8"))
+    except (socket.error, ValueError) as e:
+        raise CommandError("Lost connection to the fs worker: %s" % e)
+    finally:
+        client.close()
+    return response["exit_code"], response["stdout"], response["stderr"]
+
+
+class WorkerRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode("utf-8"))
+        exit_code, stdout, stderr = run_command(request["argv"])
+        self.wfile.write(
+            json.dumps(
+                dict(exit_code=exit_code,
+                     stdout=stdout,
+                     stderr=stderr)).encode("utf-8"))
+        self.wfile.write(b"\n")
+
+
+class WorkerServer(socketserver.UnixStreamServer):
+    """Runs ``fs`` command lines sent to a Unix socket, up to ``jobs`` at a
+    time.
+
+    Commands run in a fixed pool of threads, so the plugins and configs of
+    the process, and the database connection of each thread, are reused from
+    one command to the next.
+    """
+
+    def __init__(self, socket_path, jobs=1):
+        self.pool = ThreadPool(jobs)
+        socketserver.UnixStreamServer.__init__(
+            self, socket_path, WorkerRequestHandler)
+
+    def process_request(self, request, client_address):
+        self.pool.apply_async(
+            self._process_request, (request, client_address))
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        self.pool.close()
+        self.pool.join()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+    def _process_request(self, request, client_address):
+        # drop connections that are broken or older than CONN_MAX_AGE
+        close_old_connections()
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            close_old_connections()
+
+
+def create_server(socket_path, jobs=1):
+    """
+    Create a ``WorkerServer`` on ``socket_path``, that only the user the
+    process runs as can connect to
+
+    :raises CommandError: If a worker is already listening on the socket
+    """
+    if os.path.exists(socket_path):
+        try:
+            check = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                check.connect(socket_path)
+            finally:
+                check.close()
+        except socket.error as e:
+            if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+                raise
+            # left by a worker that did not shut down
+            os.unlink(socket_path)
+        else:
+            raise CommandError(
+                "An fs worker is already running on %s" % socket_path)
+    directory = os.path.dirname(socket_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    umask = os.umask(0o077)
+    try:
+        return WorkerServer(socket_path, jobs=jobs)
+    finally:
+        os.umask(umask)
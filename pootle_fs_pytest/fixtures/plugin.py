@@ -12,7 +12,8 @@ import shutil
 
 import pytest
 
-from pootle_fs_pytest.utils import create_plugin, create_test_suite
+from pootle_fs_pytest.utils import (
+    _clear_plugins, create_plugin, create_test_suite)
 
 
 _plugin_fetch_base = {
@@ -114,6 +115,18 @@ def fs_plugin(fs_plugin_base):
     return create_plugin("example", fs_plugin_base)
 
 
+@pytest.fixture
+def fs_plugin_local(fs_plugin_base):
+    from pootle_fs import plugins
+    from pootle_fs.local import LocalPlugin
+
+    tutorial, src_path, repo_path, dir_path = fs_plugin_base
+    shutil.copytree(src_path, repo_path)
+    _clear_plugins()
+    plugins.register(LocalPlugin)
+    return create_plugin("local", fs_plugin_base, register=False)
+
+
 @pytest.fixture
 def fs_plugin_base(tutorial, tmpdir, settings, system, english, zulu):
     from django.core.cache import caches
@@ -156,6 +156,7 @@ def _register_plugin(name="example", plugin=None, clear=True):
         _clear_plugins()
 
     from pootle_fs import Plugin, plugins, FSFile
+    from pootle_fs.mirror import mirror_paths
 
     class ExampleFSFile(FSFile):
 
@@ -172,12 +173,10 @@ def _register_plugin(name="example", plugin=None, clear=True):
         def get_latest_hash(self):
             return md5(str(datetime.now())).hexdigest()
 
-        def push(self, response):
-            if os.path.exists(self.fs.url):
-                shutil.rmtree(self.fs.url)
-            shutil.copytree(
-                self.local_fs_path,
-                self.fs.url)
+        def push(self, response=None, paths=None):
+            mirror_paths(
+                self.local_fs_path, self.fs.url, paths,
+                prune=paths is not None)
             return response
 
         def pull(self):
@@ -195,6 +194,7 @@ def _register_plugin(name="example", plugin=None, clear=True):
 def _clear_plugins():
     from pootle_fs import plugins
     plugins.__plugins__ = {}
+    plugins.clear_instances()
 
 
 def _fake_pull(dir_path, src=EXAMPLE_FS):
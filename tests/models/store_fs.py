@@ -9,6 +9,7 @@
 
 import pytest
 
+from pootle_fs.exceptions import StoreFSConflict
 from pootle_fs.models import StoreFS, ProjectFS
 
 from django.core.exceptions import ValidationError
@@ -209,3 +210,25 @@ def test_save_store_fs_bad_project(en_tutorial_po_fs_store):
     fs_store.pootle_path = "/en/tutorial_BAD/example.po"
     with pytest.raises(ValidationError):
         fs_store.save()
+
+
+@pytest.mark.django_db
+def test_save_store_fs_version(en_tutorial_po_fs_store):
+    fs_store = en_tutorial_po_fs_store
+    version = fs_store.version
+    other = StoreFS.objects.get(pk=fs_store.pk)
+    fs_store.last_sync_hash = "ABC"
+    fs_store.save()
+    assert fs_store.version == version + 1
+
+    # the row was changed since the other instance was loaded
+    other.last_sync_hash = "DEF"
+    with pytest.raises(StoreFSConflict):
+        other.save()
+    assert other.version == version
+    assert StoreFS.objects.get(pk=fs_store.pk).last_sync_hash == "ABC"
+
+    # the row was removed
+    StoreFS.objects.filter(pk=fs_store.pk).delete()
+    with pytest.raises(StoreFSConflict):
+        fs_store.save()
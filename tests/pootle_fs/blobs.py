@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+import pytest
+
+from pootle_fs.blobs import BlobStore
+from pootle_fs.manifest import hash_file
+
+
+def _write(file_path, content):
+    if not os.path.exists(os.path.dirname(file_path)):
+        os.makedirs(os.path.dirname(file_path))
+    with open(file_path, "w") as f:
+        f.write(content)
+
+
+def _inode(file_path):
+    return os.stat(file_path).st_ino
+
+
+@pytest.mark.django
+def test_blob_store(tmpdir):
+    blobs = BlobStore(os.path.join(str(tmpdir), "__blobs__"))
+    en_po = os.path.join(str(tmpdir), "project1", "en.po")
+    zu_po = os.path.join(str(tmpdir), "project2", "zu.po")
+    fr_po = os.path.join(str(tmpdir), "project2", "fr.po")
+    _write(en_po, "same")
+    _write(zu_po, "same")
+    _write(fr_po, "different")
+    assert blobs.get_key(en_po) is None
+
+    key = blobs.add(en_po)
+    assert key == hash_file(en_po)
+    assert _inode(blobs.get_path(key)) == _inode(en_po)
+    assert blobs.get_key(en_po) == key
+
+    # identical content is only stored once
+    assert blobs.add(zu_po) == key
+    assert _inode(zu_po) == _inode(en_po)
+    assert blobs.add(fr_po) != key
+
+    # keys are found for blobs added by other processes
+    other = BlobStore(blobs.path)
+    assert other.get_key(zu_po) == key
+
+    # files linked from outside the store are copied into it
+    outside = os.path.join(str(tmpdir), "outside", "de.po")
+    linked = os.path.join(str(tmpdir), "project1", "de.po")
+    _write(outside, "linked")
+    os.link(outside, linked)
+    de_key = blobs.add(linked)
+    assert _inode(linked) == _inode(blobs.get_path(de_key))
+    assert _inode(linked) != _inode(outside)
+
+    # unlinked blobs are pruned
+    os.unlink(fr_po)
+    os.unlink(outside)
+    assert blobs.prune() == 1
+    assert blobs.get_key(en_po) == key
+
+
+@pytest.mark.django
+def test_local_plugin_blobs(fs_plugin_local, settings, monkeypatch):
+    settings.POOTLE_FS_BLOBS = True
+    plugin = fs_plugin_local
+    plugin.refresh()
+    blobs = plugin.blobs
+    assert blobs is not None
+    manifest = plugin.checkout_manifest
+    inodes = {}
+    for path in manifest.files:
+        file_path = os.path.join(plugin.local_fs_path, path.lstrip("/"))
+        key = blobs.get_key(file_path)
+        assert key == hash_file(file_path)
+        inodes.setdefault(key, set()).add(_inode(file_path))
+        # the checkout is no longer linked to the FS directory
+        assert (
+            _inode(file_path)
+            != _inode(os.path.join(plugin.fs.url, path.lstrip("/"))))
+    # files with the same content share a blob
+    assert all(len(x) == 1 for x in inodes.values())
+
+    # the hash of synced files comes from the blob key
+    plugin.fetch_translations()
+    plugin.sync_translations()
+
+    def _no_hashing(file_path):
+        raise AssertionError("Hashed %s" % file_path)
+
+    monkeypatch.setattr("pootle_fs.local.hash_file", _no_hashing)
+    for store_fs in plugin.translations.all():
+        assert store_fs.file.latest_hash == store_fs.last_sync_hash
@@ -7,6 +7,7 @@
 # AUTHORS file for copyright and authorship information.
 
 import io
+import json
 import os
 
 import pytest
@@ -532,3 +533,85 @@ def test_command_no_color(fs_plugin):
     assert os.environ["DJANGO_COLORS"] == "light"
     call_command("fs", "tutorial", "status", no_color=True)
     assert os.environ["DJANGO_COLORS"] == "nocolor"
+
+
+def _read_jsonl(out):
+    return [json.loads(line) for line in out.strip().split("\n")]
+
+
+@pytest.mark.django
+def test_command_status_jsonl(fs_plugin_suite, capsys):
+    plugin = fs_plugin_suite
+    call_command("fs", plugin.project.code, "status", format="jsonl")
+    out, err = capsys.readouterr()
+    records = _read_jsonl(out)
+    status = plugin.status()
+    summary = records.pop()
+    assert summary["type"] == "summary"
+    assert summary["project"] == plugin.project.code
+    assert summary["counts"] == {k: len(status[k]) for k in status}
+    assert (
+        [(r["status"], r["pootle_path"], r["fs_path"]) for r in records]
+        == [(k, s.pootle_path, s.fs_path) for k in status for s in status[k]])
+    assert all(r["type"] == "status" for r in records)
+
+
+@pytest.mark.django
+def test_command_fetch_jsonl(fs_plugin_suite, capsys):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    call_command(
+        "fs", plugin.project.code, "fetch_translations", format="jsonl")
+    out, err = capsys.readouterr()
+    records = _read_jsonl(out)
+    summary = records.pop()
+    assert summary["type"] == "summary"
+    assert summary["completed"] == {"fetched_from_fs": len(records)}
+    assert summary["failed"] == {"fetched_from_fs": 0}
+    assert (
+        sorted(r["pootle_path"] for r in records)
+        == sorted(s.pootle_path for s in status["fs_untracked"]))
+    for record in records:
+        assert record["type"] == "action"
+        assert record["action"] == "fetched_from_fs"
+        assert record["status"] == "fs_untracked"
+        assert record["complete"] is True
+
+
+@pytest.mark.django
+def test_command_status_counts(fs_plugin_suite, capsys):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    call_command("fs", plugin.project.code, "status", counts=True)
+    out, err = capsys.readouterr()
+    assert out == "".join(
+        "%s\n" % status.get_status_title(k) for k in status)
+    call_command(
+        "fs", plugin.project.code, "status", counts=True, format="jsonl")
+    out, err = capsys.readouterr()
+    summary, = _read_jsonl(out)
+    assert summary["counts"] == {k: len(status[k]) for k in status}
+
+
+@pytest.mark.django
+def test_command_fs_all_projects(fs_plugin_suite, capsys):
+    plugin = fs_plugin_suite
+    code = plugin.project.code
+    results = call_command(
+        "fs", "sync_translations", all_projects=True, jobs=1)
+    assert [(c, exit_code) for c, exit_code, output in results] == [
+        (code, 0)]
+    out, err = capsys.readouterr()
+    assert out.startswith("%s\n%s\n" % (code, "=" * len(code)))
+
+    # a glob selects projects by code
+    call_command("fs", "%s*" % code[:3], "status", jobs=1)
+    out, err = capsys.readouterr()
+    assert out.startswith("%s\n%s\n" % (code, "=" * len(code)))
+
+    with pytest.raises(CommandError):
+        call_command("fs", "DOES_NOT_EXIST*", "status", jobs=1)
+    plugin.fs.enabled = False
+    plugin.fs.save()
+    with pytest.raises(CommandError):
+        call_command("fs", "status", all_projects=True, jobs=1)
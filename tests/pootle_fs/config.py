@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+import pytest
+
+from pootle_fs.config import ConfigCache, config_cache
+from pootle_fs.exceptions import ConfigurationError
+
+
+CONFIG = """
+[default]
+translation_path = po/<lang>.po
+
+[subdir1]
+translation_path = subdir1/<lang>.po
+"""
+
+BAD_CONFIGS = (
+    "not a config",
+    "[subdir1]\ntranslation_path = po/<lang>.po\n",
+    "[default]\nlang_mapping = en_FOO en\n")
+
+
+@pytest.mark.django
+def test_config_cache():
+    configs = ConfigCache()
+    config = configs.get(CONFIG)
+    assert CONFIG in configs
+    assert len(configs) == 1
+    assert config.sections() == ["default", "subdir1"]
+    assert config.get("subdir1", "translation_path") == "subdir1/<lang>.po"
+
+    # a copy of the cached config is returned
+    config.set("default", "translation_path", "changed/<lang>.po")
+    new_config = configs.get(CONFIG)
+    assert new_config is not config
+    assert len(configs) == 1
+    assert new_config.get("default", "translation_path") == "po/<lang>.po"
+
+    configs.clear()
+    assert CONFIG not in configs
+
+
+@pytest.mark.django
+def test_config_cache_maxsize():
+    configs = ConfigCache(maxsize=2)
+    contents = [
+        "%s\n# %s" % (CONFIG, i)
+        for i in range(3)]
+    for content in contents:
+        configs.get(content)
+    assert len(configs) == 2
+    assert contents[0] not in configs
+    assert contents[2] in configs
+
+
+@pytest.mark.django
+def test_config_cache_bad():
+    for content in BAD_CONFIGS:
+        with pytest.raises(ConfigurationError):
+            ConfigCache().get(content)
+
+
+@pytest.mark.django
+def test_config_plugin_update(fs_plugin):
+    config = fs_plugin.read_config()
+    fs_plugin.fs.current_config.seek(0)
+    assert fs_plugin.fs.current_config.read() in config_cache
+
+    # invalid configs are not saved
+    with open(os.path.join(fs_plugin.fs.url, ".pootle.ini"), "w") as f:
+        f.write(BAD_CONFIGS[1])
+    with pytest.raises(ConfigurationError):
+        fs_plugin.update_config()
+    assert fs_plugin.read_config().sections() == config.sections()
+
+    with open(os.path.join(fs_plugin.fs.url, ".pootle.ini"), "w") as f:
+        f.write(CONFIG)
+    fs_plugin.update_config()
+    assert CONFIG in config_cache
+    assert fs_plugin.read_config().sections() == ["default", "subdir1"]
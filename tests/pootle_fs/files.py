@@ -7,16 +7,21 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from hashlib import md5
 import os
 
 import pytest
 
 from pootle_language.models import Language
+from pootle_statistics.models import Submission, SubmissionTypes
+from pootle_store.models import Store, Unit
 from pootle_translationproject.models import TranslationProject
 
 from pootle_fs.files import FSFile
 from pootle_fs.models import StoreFS
 
+from pootle_fs_pytest.utils import _edit_file, _update_store
+
 
 def _test_store_fs_files(src_path):
     for store_fs in StoreFS.objects.all():
@@ -137,3 +142,279 @@ def test_file_push_unchanged(fs_plugin_suite, caplog):
         if x.levelname == "DEBUG"
         and x not in synced_logs]
     assert not new_logs
+
+
+def _spy_store_update(monkeypatch):
+    updated = []
+    _update = Store.update
+
+    def _store_update(store, *args, **kwargs):
+        updated.append(store.pootle_path)
+        return _update(store, *args, **kwargs)
+
+    monkeypatch.setattr(Store, "update", _store_update)
+    return updated
+
+
+@pytest.mark.django
+def test_file_pull_delta(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    assert store_fs.unit_fingerprints.keys() == ["Hello, world"]
+
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    monkeypatch.setattr(FSFile, "delta_threshold", 1)
+    updated = _spy_store_update(monkeypatch)
+    response = plugin.sync_translations()
+    assert (
+        [x.pootle_path for x in response["pulled_to_pootle"]]
+        == [store_fs.pootle_path])
+
+    # only the new unit was added - the Store was not updated wholesale
+    assert updated == []
+    store_fs = StoreFS.objects.get(pk=store_fs.pk)
+    assert len(store_fs.unit_fingerprints) == 2
+    assert (
+        sorted(store_fs.store.units.values_list("unitid", flat=True))
+        == sorted(store_fs.unit_fingerprints.keys()))
+    assert (
+        store_fs.store.get_max_unit_revision()
+        == store_fs.last_sync_revision)
+
+
+@pytest.mark.django
+def test_file_pull_delta_submissions(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    po_file = os.path.join(plugin.fs.url, "gnu_style/po/en.po")
+    with open(po_file) as f:
+        content = f.read()
+    with open(po_file, "w") as f:
+        f.write(
+            content.replace(
+                'msgstr "Hello, world"', 'msgstr "Hello, delta world"'))
+    monkeypatch.setattr(FSFile, "delta_threshold", 1)
+    updated = _spy_store_update(monkeypatch)
+    plugin.sync_translations()
+    assert updated == []
+
+    # the changed unit is recorded as it would be by ``Store.update``
+    unit = store_fs.store.units.get(unitid="Hello, world")
+    assert unit.target == "Hello, delta world"
+    submission = Submission.objects.filter(unit=unit).latest("pk")
+    assert submission.type == SubmissionTypes.UPLOAD
+    assert submission.submitter == plugin.pootle_user
+
+
+@pytest.mark.django
+def test_file_pull_delta_order(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    po_file = os.path.join(plugin.fs.url, "gnu_style/po/en.po")
+    with open(po_file) as f:
+        content = f.read()
+    with open(po_file, "w") as f:
+        f.write(
+            content.replace(
+                '#: Hello, world',
+                '#: Goodbye\nmsgid "Goodbye"\nmsgstr "Goodbye"\n\n'
+                '#: Hello, world'))
+    monkeypatch.setattr(FSFile, "delta_threshold", 1)
+    updated = _spy_store_update(monkeypatch)
+    plugin.sync_translations()
+    assert updated == []
+
+    # the new unit is added at its position in the file
+    assert (
+        list(
+            store_fs.store.units.order_by("index").values_list(
+                "unitid", flat=True))
+        == ["Goodbye", "Hello, world"])
+
+
+@pytest.mark.django
+def test_file_pull_delta_unsaved(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    revision = store_fs.last_sync_revision
+    po_file = os.path.join(plugin.fs.url, "gnu_style/po/en.po")
+    with open(po_file) as f:
+        content = f.read()
+    with open(po_file, "w") as f:
+        f.write(content.replace("#: Hello, world", "#: Hello, world:2"))
+    monkeypatch.setattr(FSFile, "delta_threshold", 1)
+    # Pootle does not save the changed field
+    monkeypatch.setattr(Unit, "update", lambda unit, *args, **kwargs: False)
+    plugin.sync_translations()
+
+    # no unit was saved, so the Store is still in sync
+    store_fs = StoreFS.objects.get(pk=store_fs.pk)
+    assert store_fs.last_sync_revision == revision
+    assert store_fs.store.get_max_unit_revision() == revision
+    assert not plugin.status().has_changed
+
+
+@pytest.mark.django
+def test_file_pull_store_update_no_result(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    _update = Store.update
+
+    def _store_update(store, *args, **kwargs):
+        _update(store, *args, **kwargs)
+
+    # older versions of Pootle do not return the result of the update
+    monkeypatch.setattr(Store, "update", _store_update)
+    response = plugin.sync_translations()
+    assert (
+        [x.fs_path for x in response.completed("pulled_to_pootle")]
+        == ["/gnu_style/po/en.po"])
+    assert not plugin.status().has_changed
+
+
+@pytest.mark.django
+def test_file_write_content_hash(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    fs_file = plugin.translations.get(path="/gnu_style/po/en.po").file
+
+    def _latest_hash(fs_file):
+        raise AssertionError("File was hashed again")
+
+    monkeypatch.setattr(fs_file.__class__, "hashes_content", True)
+    monkeypatch.setattr(
+        fs_file.__class__, "latest_hash", property(_latest_hash))
+    # the hash is found from the content written
+    fs_file.write("content")
+    assert fs_file.current_hash == md5("content").hexdigest()
+
+
+@pytest.mark.django
+def test_file_pull_delta_pootle_changed(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    _update_store(plugin, store_fs.pootle_path)
+    plugin.fetch_translations(force=True)
+    monkeypatch.setattr(FSFile, "delta_threshold", 1)
+    updated = _spy_store_update(monkeypatch)
+
+    # the Store has changed since the last sync so the delta cant be used
+    plugin.sync_translations()
+    assert updated == [store_fs.pootle_path]
+
+
+@pytest.mark.django
+def test_file_merge_single_pass(fs_plugin_suite, monkeypatch):
+    plugin = fs_plugin_suite
+    plugin.merge_translations()
+    synced = []
+    serialized = []
+    _on_sync = FSFile.on_sync
+    _serialize = Store.serialize
+
+    def _spy_on_sync(fs_file, *args):
+        synced.append(fs_file.pootle_path)
+        return _on_sync(fs_file, *args)
+
+    def _spy_serialize(store, *args, **kwargs):
+        serialized.append(store.pootle_path)
+        return _serialize(store, *args, **kwargs)
+
+    monkeypatch.setattr(FSFile, "on_sync", _spy_on_sync)
+    monkeypatch.setattr(Store, "serialize", _spy_serialize)
+    response = plugin.sync_translations()
+    merged = [
+        x.pootle_path for x
+        in response.completed("merged_from_fs")]
+    assert merged
+
+    # each merged, pulled or pushed file is synced once, and only merged
+    # or pushed files are serialized - once
+    assert (
+        sorted(synced)
+        == sorted(
+            x.pootle_path for x
+            in response.completed(
+                "merged_from_fs", "pulled_to_pootle", "pushed_to_fs")))
+    assert (
+        sorted(serialized)
+        == sorted(
+            x.pootle_path for x
+            in response.completed("merged_from_fs", "pushed_to_fs")))
+
+
+@pytest.mark.django
+def test_file_sync_hashed_once(fs_plugin_suite, monkeypatch):
+    plugin = fs_plugin_suite
+    hashed = []
+    file_class = plugin.file_class
+    _latest_hash = file_class.latest_hash
+
+    def _spy_latest_hash(fs_file):
+        hashed.append(fs_file.pootle_path)
+        return _latest_hash.fget(fs_file)
+
+    monkeypatch.setattr(
+        file_class, "latest_hash", property(_spy_latest_hash))
+    status = plugin.status()
+    del hashed[:]
+    response = plugin.sync_translations(status=status)
+    synced = [
+        x.pootle_path for x
+        in response.completed(
+            "pulled_to_pootle", "pushed_to_fs", "merged_from_fs")]
+    assert synced
+    # files that have not changed since the status keep their hash
+    assert len(hashed) == len(set(hashed))
+    assert set(hashed) <= set(synced)
+
+
+@pytest.mark.django
+def test_file_hash_reused(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    hashed = []
+    file_class = plugin.file_class
+    _latest_hash = file_class.latest_hash
+
+    def _spy_latest_hash(fs_file):
+        hashed.append(fs_file.path)
+        return _latest_hash.fget(fs_file)
+
+    monkeypatch.setattr(
+        file_class, "latest_hash", property(_spy_latest_hash))
+    plugin.status()
+    del hashed[:]
+    status = plugin.status()
+    assert not status.has_changed
+    assert hashed == []
+
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    status = plugin.status()
+    assert hashed == ["/gnu_style/po/en.po"]
+    assert (
+        [x.fs_path for x in status["fs_ahead"]]
+        == ["/gnu_style/po/en.po"])
+
+
+@pytest.mark.django
+def test_file_memoized(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    assert store_fs.file is store_fs.file
+    fs_file = store_fs.file
+    assert fs_file.current_hash == fs_file.latest_hash
+    assert fs_file.store_revision == fs_file.store.get_max_unit_revision()
+
+    # the hash is memoized until the file changes
+    current_hash = fs_file.current_hash
+    assert fs_file.current_hash is current_hash
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    plugin.pull()
+    assert fs_file.current_hash != current_hash
+    assert fs_file.current_hash == fs_file.latest_hash
+
+    # the revision is memoized until the Store changes
+    _update_store(plugin, store_fs.pootle_path)
+    assert fs_file.store_revision != fs_file.store.get_max_unit_revision()
+    fs_file.clear_cache()
+    assert fs_file.store_revision == fs_file.store.get_max_unit_revision()
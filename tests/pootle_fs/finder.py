@@ -82,3 +82,33 @@ def test_finder_match(finder_matches):
 def test_finder_find(fs_finder):
     finder, expected = fs_finder
     assert sorted(expected) == sorted(f for f in finder.find())
+
+
+@pytest.mark.django
+def test_finder_lang_dir(tmpdir):
+    root = str(tmpdir)
+    assert TranslationFileFinder(
+        os.path.join(root, "po/<lang>.po")).lang_dir_regex is None
+    finder = TranslationFileFinder(
+        os.path.join(root, "<directory_path>/<lang>/<filename>.po"))
+    assert finder.lang_dir_regex is None
+    finder = TranslationFileFinder(
+        os.path.join(root, "locales/<lang>/<directory_path>/<filename>.po"))
+    assert finder.get_dir_lang(os.path.join(root, "locales/zu/")) == "zu"
+    assert finder.get_dir_lang(os.path.join(root, "locales/zu/sub/")) == "zu"
+    assert finder.get_dir_lang(os.path.join(root, "locales/")) is None
+
+    for lang in ["en", "zu", "xx"]:
+        os.makedirs(os.path.join(root, "locales", lang, "sub"))
+        with open(os.path.join(root, "locales", lang, "sub", "a.po"), "w"):
+            pass
+    walked = []
+
+    def include_lang(lang):
+        walked.append(lang)
+        return lang != "xx"
+    found = sorted(
+        matched["lang"] for __, matched in finder.find(include_lang))
+    assert found == ["en", "zu"]
+    # the skipped language directory was not walked
+    assert walked.count("xx") == 1
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from pootle_language.models import Language
+from pootle_project.models import Project
+from pootle_store.models import Store
+
+from pootle_fs.identity import (
+    IdentityMap, get_identity_map, identity_map, lookup)
+
+
+@pytest.mark.django
+def test_identity_map(english):
+    identities = IdentityMap()
+    assert identities.get(Language, "code", "en") == english
+    assert (identities.hits, identities.misses) == (0, 1)
+    assert identities.get(Language, "code", "en") is identities.get(
+        Language, "code", "en")
+    assert (identities.hits, identities.misses) == (2, 1)
+
+    # missing objects are cached too
+    with pytest.raises(Language.DoesNotExist):
+        identities.get(Language, "code", "DOES_NOT_EXIST")
+    with pytest.raises(Language.DoesNotExist):
+        identities.get(Language, "code", "DOES_NOT_EXIST")
+    assert (identities.hits, identities.misses) == (3, 2)
+
+    identities.discard(Language, "code", "en")
+    assert (Language, "code", "en") not in identities
+    assert identities.get(Language, "code", "en") == english
+    assert identities.misses == 3
+
+
+@pytest.mark.django
+def test_identity_map_context(english):
+    assert get_identity_map() is None
+    with identity_map() as (identities, created):
+        assert created
+        assert get_identity_map() is identities
+        with identity_map() as (nested, nested_created):
+            assert nested is identities
+            assert not nested_created
+        assert lookup(Language, "code", "en") is lookup(
+            Language, "code", "en")
+        assert identities.hits == 1
+    assert get_identity_map() is None
+    assert lookup(Language, "code", "en") is not lookup(
+        Language, "code", "en")
+
+
+@pytest.mark.django
+def test_identity_map_plugin_preload(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    with plugin.identity_map() as identities:
+        assert lookup(Project, "code", plugin.project.code) is plugin.project
+        for store in plugin.stores:
+            assert lookup(Store, "pootle_path", store.pootle_path) == store
+        assert identities.misses == 0
+
+        # the project's stores are all preloaded, so a missing one is known
+        # to not exist
+        with pytest.raises(Store.DoesNotExist):
+            lookup(
+                Store, "pootle_path",
+                "/en/%s/DOES_NOT_EXIST.po" % plugin.project.code)
+        assert (
+            Store, "pootle_path",
+            "/en/%s/DOES_NOT_EXIST.po" % plugin.project.code) in identities
+        assert plugin.pootle_user is plugin.pootle_user
+
+
+@pytest.mark.django
+def test_identity_map_plugin_sync(fs_plugin):
+    fs_plugin.fetch_translations()
+    response = fs_plugin.sync_translations()
+    assert get_identity_map() is None
+    for action_status in response.completed("pulled_to_pootle"):
+        store_fs = action_status.store_fs
+        assert store_fs.store.pootle_path == store_fs.pootle_path
+        assert store_fs.last_sync_hash
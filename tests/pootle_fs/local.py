@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+import pytest
+
+from pootle_store.models import Store
+
+from pootle_fs_pytest.utils import _edit_file, _update_store
+
+from pootle_fs.files import FSFile
+from pootle_fs.local import LocalFSFile, LocalPlugin
+from pootle_fs.manifest import PathChanges, hash_file
+from pootle_fs.models import StoreFS
+from pootle_fs.status import FS_STATUS
+
+
+def _same_file(path, other):
+    return os.stat(path).st_ino == os.stat(other).st_ino
+
+
+@pytest.mark.django
+def test_local_plugin_registered():
+    # the test fixtures clear the registry, so check a fresh one
+    from pootle_fs.plugin import Plugins
+
+    assert LocalPlugin.name == "local"
+    registry = Plugins()
+    registry.register(LocalPlugin)
+    assert registry["local"] is LocalPlugin
+
+
+@pytest.mark.django
+def test_local_plugin_pull(fs_plugin_local):
+    plugin = fs_plugin_local
+    assert isinstance(plugin, LocalPlugin)
+    assert plugin.refresh() is True
+    assert len(list(plugin.find_translations())) == 18
+
+    # files are hard linked into the local checkout
+    en_po = "gnu_style/po/en.po"
+    assert _same_file(
+        os.path.join(plugin.fs.url, en_po),
+        os.path.join(plugin.local_fs_path, en_po))
+    version = plugin.checkout_manifest.version
+
+    # only the changed files are mirrored
+    with open(os.path.join(plugin.fs.url, "gnu_style/po/fr.po"), "w") as f:
+        f.write("")
+    os.unlink(os.path.join(plugin.fs.url, en_po))
+    assert plugin.refresh() is True
+    assert (
+        plugin.checkout_manifest.changes_since(version)
+        == PathChanges(
+            added=["/gnu_style/po/fr.po"],
+            removed=["/gnu_style/po/en.po"]))
+    assert not os.path.exists(os.path.join(plugin.local_fs_path, en_po))
+    assert os.path.exists(
+        os.path.join(plugin.local_fs_path, "gnu_style/po/fr.po"))
+
+
+@pytest.mark.django
+def test_local_plugin_sync(fs_plugin_local):
+    plugin = fs_plugin_local
+    plugin.add_translations()
+    plugin.fetch_translations()
+    plugin.sync_translations()
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    assert isinstance(store_fs.file, LocalFSFile)
+    assert store_fs.file.latest_hash == hash_file(store_fs.file.file_path)
+    assert store_fs.last_sync_hash == store_fs.file.latest_hash
+
+    fs_path = os.path.join(plugin.fs.url, "gnu_style/po/en.po")
+    local_path = os.path.join(plugin.local_fs_path, "gnu_style/po/en.po")
+    _update_store(plugin, store_fs.pootle_path)
+    response = plugin.sync_translations()
+    assert (
+        [x.fs_path for x in response.completed("pushed_to_fs")]
+        == ["/gnu_style/po/en.po"])
+    # the file was replaced in the local checkout and linked back to the FS
+    assert _same_file(fs_path, local_path)
+    with open(fs_path) as f:
+        assert f.read() == plugin.read("gnu_style/po/en.po")
+    assert not plugin.status().has_changed
+
+
+@pytest.mark.django
+def test_local_plugin_push_all(fs_plugin_local):
+    plugin = fs_plugin_local
+    plugin.refresh()
+    # a file is added to the FS after the local checkout was pulled
+    fr_po = os.path.join(plugin.fs.url, "gnu_style/po/fr.po")
+    with open(fr_po, "w") as f:
+        f.write("")
+    en_po = os.path.join(plugin.fs.url, "gnu_style/po/en.po")
+    os.unlink(en_po)
+
+    # pushing every path restores files, but does not remove new ones
+    plugin.push()
+    assert os.path.exists(fr_po)
+    assert os.path.exists(en_po)
+
+
+@pytest.mark.django
+def test_local_plugin_merge(fs_plugin_local, monkeypatch):
+    plugin = fs_plugin_local
+    plugin.fetch_translations()
+    plugin.sync_translations()
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    _update_store(plugin, store_fs.pootle_path)
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    plugin.merge_translations()
+    status = plugin.status()
+    hashed = []
+    revisions = []
+    _latest_hash = LocalFSFile.latest_hash
+    _get_max_unit_revision = Store.get_max_unit_revision
+
+    def _spy_latest_hash(fs_file):
+        hashed.append(fs_file.path)
+        return _latest_hash.fget(fs_file)
+
+    def _spy_get_max_unit_revision(store):
+        revisions.append(store.pootle_path)
+        return _get_max_unit_revision(store)
+
+    monkeypatch.setattr(
+        LocalFSFile, "latest_hash", property(_spy_latest_hash))
+    monkeypatch.setattr(
+        Store, "get_max_unit_revision", _spy_get_max_unit_revision)
+    response = plugin.sync_translations(status=status)
+    assert (
+        [x.fs_path for x in response.completed("merged_from_fs")]
+        == ["/gnu_style/po/en.po"])
+
+    # the merged file is not hashed or its revision queried again
+    assert store_fs.path not in hashed
+    assert store_fs.pootle_path not in revisions
+    monkeypatch.undo()
+    store_fs = StoreFS.objects.get(pk=store_fs.pk)
+    assert store_fs.last_sync_hash == hash_file(store_fs.file.file_path)
+    assert (
+        store_fs.last_sync_revision
+        == store_fs.store.get_max_unit_revision())
+
+
+@pytest.mark.django
+def test_local_plugin_status_counts(fs_plugin_local, monkeypatch):
+    plugin = fs_plugin_local
+    plugin.fetch_translations()
+    plugin.sync_translations()
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    _update_store(plugin, store_fs.pootle_path)
+    _edit_file(plugin, "/gnu_style/po/zu.po")
+    created = []
+    _store_fs_init = StoreFS.__init__
+    _fs_file_init = FSFile.__init__
+
+    def _spy_store_fs_init(store_fs, *args, **kwargs):
+        created.append(store_fs)
+        _store_fs_init(store_fs, *args, **kwargs)
+
+    def _spy_fs_file_init(fs_file, *args, **kwargs):
+        created.append(fs_file)
+        _fs_file_init(fs_file, *args, **kwargs)
+
+    monkeypatch.setattr(StoreFS, "__init__", _spy_store_fs_init)
+    monkeypatch.setattr(FSFile, "__init__", _spy_fs_file_init)
+    counts = plugin.status_counts()
+    # files are hashed by path, without loading each StoreFS
+    assert created == []
+    monkeypatch.undo()
+    assert counts["pootle_ahead"] == 1
+    assert counts["fs_ahead"] == 1
+    status = plugin.status()
+    assert (
+        {k: counts[k] for k in FS_STATUS}
+        == {k: len(status[k]) for k in FS_STATUS})
+
+
+@pytest.mark.django
+def test_local_plugin_sparse(fs_plugin_local, settings):
+    plugin = fs_plugin_local
+    settings.POOTLE_FS_SPARSE = True
+    xx_po = "non_gnu_style/locales/xx/example1.po"
+    os.makedirs(os.path.join(plugin.fs.url, os.path.dirname(xx_po)))
+    with open(os.path.join(plugin.fs.url, xx_po), "w") as f:
+        f.write("")
+    # the config is not known before it is first read
+    plugin.read_config()
+    assert os.path.exists(os.path.join(plugin.local_fs_path, xx_po))
+    plugin.refresh()
+    missing_langs = set()
+    plugin.find_translation_files(missing_langs=missing_langs)
+    assert "xx" not in missing_langs
+    # the unknown language is left out of the checkout
+    assert not os.path.exists(os.path.join(plugin.local_fs_path, xx_po))
+    assert os.path.exists(
+        os.path.join(
+            plugin.local_fs_path, "non_gnu_style/locales/zu/example1.po"))
+
+
+@pytest.mark.django
+def test_local_plugin_sparse_push(fs_plugin_local, settings):
+    plugin = fs_plugin_local
+    settings.POOTLE_FS_SPARSE = True
+    xx_po = "non_gnu_style/locales/xx/example1.po"
+    os.makedirs(os.path.join(plugin.fs.url, os.path.dirname(xx_po)))
+    with open(os.path.join(plugin.fs.url, xx_po), "w") as f:
+        f.write("")
+    plugin.read_config()
+    plugin.refresh()
+    assert not os.path.exists(os.path.join(plugin.local_fs_path, xx_po))
+
+    # the languages left out of the checkout are left alone in the FS
+    plugin.push()
+    assert os.path.exists(os.path.join(plugin.fs.url, xx_po))
+    plugin.push(paths=PathChanges(removed=["/%s" % xx_po]))
+    assert os.path.exists(os.path.join(plugin.fs.url, xx_po))
+    assert os.path.exists(
+        os.path.join(plugin.fs.url, "non_gnu_style/locales/zu/example1.po"))
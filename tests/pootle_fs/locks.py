@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+import threading
+import time
+
+import pytest
+
+from pootle_fs.locks import FileLock, LockTimeout
+
+
+@pytest.mark.django
+def test_file_lock(tmpdir):
+    lock_path = os.path.join(str(tmpdir), "locks", "example.lock")
+    lock = FileLock(lock_path)
+    assert not lock.locked
+    with lock:
+        assert lock.locked
+        assert os.path.exists(lock_path)
+        other = FileLock(lock_path, timeout=0.1)
+        assert not other.acquire(blocking=False)
+        assert not other.acquire(timeout=0.1)
+        with pytest.raises(LockTimeout):
+            with other:
+                pass
+    assert not lock.locked
+    other = FileLock(lock_path)
+    assert other.acquire(blocking=False)
+    other.release()
+
+
+@pytest.mark.django
+def test_plugin_pull_single_flight(fs_plugin, monkeypatch):
+    plugin = fs_plugin
+    pulls = []
+    pulling = threading.Event()
+    waiting = threading.Event()
+    _pull = plugin.pull
+
+    def _slow_pull():
+        pulls.append(plugin.project.code)
+        pulling.set()
+        waiting.wait(5)
+        return _pull()
+
+    monkeypatch.setattr(plugin, "pull", _slow_pull)
+    results = []
+
+    def _refresh():
+        results.append(plugin.refresh())
+
+    first = threading.Thread(target=_refresh)
+    first.start()
+    pulling.wait(5)
+    waiters = [threading.Thread(target=_refresh) for i in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    # let the other callers start waiting for the pull in progress
+    time.sleep(0.2)
+    waiting.set()
+    first.join()
+    for waiter in waiters:
+        waiter.join()
+
+    # the pull in progress started before the other callers asked, so one
+    # of them pulls again and the other shares that pull
+    assert len(pulls) == 2
+    assert sorted(results) == [False, True, True]
+
+    # later callers pull again
+    assert plugin.refresh() is True
+    assert len(pulls) == 3
+
+
+@pytest.mark.django
+def test_plugin_pull_ttl(fs_plugin, settings, monkeypatch):
+    plugin = fs_plugin
+    pulls = []
+    _pull = plugin.pull
+
+    def _counted_pull():
+        pulls.append(plugin.project.code)
+        return _pull()
+
+    monkeypatch.setattr(plugin, "pull", _counted_pull)
+    settings.POOTLE_FS_PULL_TTL = 3600
+    plugin.status()
+    plugin.status()
+    assert len(pulls) == 1
+    # an explicit max_age takes precedence
+    plugin.refresh(max_age=0)
+    assert len(pulls) == 2
+
+
+@pytest.mark.django
+def test_plugin_project_lock(fs_plugin):
+    plugin = fs_plugin
+    plugin.fetch_translations()
+    locked = threading.Event()
+    release = threading.Event()
+
+    def _hold_lock():
+        with plugin.locked():
+            locked.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=_hold_lock)
+    holder.start()
+    locked.wait(5)
+    try:
+        with pytest.raises(LockTimeout):
+            plugin.sync_translations(lock_timeout=0)
+        with pytest.raises(LockTimeout):
+            plugin.sync_translations(lock_timeout=0.1)
+        # status does not need the lock
+        assert plugin.status().has_changed
+    finally:
+        release.set()
+        holder.join()
+
+    # actions run by sync_translations share its lock
+    response = plugin.sync_translations(lock_timeout=0)
+    assert response.made_changes
+    lock = plugin.project_lock
+    assert lock.acquire(blocking=False)
+    lock.release()
+
+
+@pytest.mark.django
+def test_plugin_lock_files(fs_plugin_suite):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    to_pull = status["fs_ahead"] + status["fs_added"]
+    claimed = to_pull[0].pootle_path
+    locked = threading.Event()
+    release = threading.Event()
+
+    def _hold_locks():
+        with plugin.locked():
+            with plugin.get_file_lock(claimed):
+                locked.set()
+                release.wait(5)
+
+    holder = threading.Thread(target=_hold_locks)
+    holder.start()
+    locked.wait(5)
+    try:
+        # the project lock is not needed, but the claimed file is skipped
+        response = plugin.sync_translations(
+            status=status, lock_timeout=0, lock_files=True)
+    finally:
+        release.set()
+        holder.join()
+    failed = list(response.failed())
+    assert [x.pootle_path for x in failed] == [claimed]
+    assert "another worker" in failed[0].msg
+    assert (
+        len(list(response.completed("pulled_to_pootle")))
+        == len(to_pull) - 1)
+    lock = plugin.get_file_lock(claimed)
+    assert lock.acquire(blocking=False)
+    lock.release()
+
+    # the skipped file is picked up by the next sync
+    response = plugin.sync_translations(lock_files=True)
+    assert (
+        [x.pootle_path for x in response.completed("pulled_to_pootle")]
+        == [claimed])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+import pytest
+
+from pootle_fs.manifest import CheckoutManifest, PathChanges, scan_files
+
+
+def _write(root, path, content):
+    file_path = os.path.join(root, path.strip("/"))
+    if not os.path.exists(os.path.dirname(file_path)):
+        os.makedirs(os.path.dirname(file_path))
+    with open(file_path, "w") as f:
+        f.write(content)
+
+
+@pytest.mark.django
+def test_path_changes_update():
+    changes = PathChanges(
+        added=["/a.po"], modified=["/b.po"], removed=["/c.po"])
+    assert len(changes) == 3
+    assert list(changes) == ["/a.po", "/b.po", "/c.po"]
+    changes.update(
+        PathChanges(
+            added=["/c.po", "/d.po"], modified=["/a.po"],
+            removed=["/a.po", "/b.po"]))
+    assert changes == PathChanges(
+        added=["/d.po"], modified=["/c.po"], removed=["/b.po"])
+    assert changes.changed == set(["/c.po", "/d.po"])
+    assert not PathChanges()
+
+
+@pytest.mark.django
+def test_checkout_manifest(tmpdir):
+    root = os.path.join(str(tmpdir), "checkout")
+    manifest_path = os.path.join(str(tmpdir), "manifest")
+    _write(root, "/po/en.po", "en")
+    _write(root, "/po/zu.po", "zu")
+    _write(root, "/.git/HEAD", "ref")
+    assert sorted(scan_files(root)) == ["/po/en.po", "/po/zu.po"]
+
+    manifest = CheckoutManifest(root, manifest_path)
+    assert manifest.signature is None
+    # there is nothing to compare the first version to
+    assert manifest.scan() is None
+    assert manifest.version == 1
+    manifest.save()
+    assert manifest.signature is not None
+
+    _write(root, "/po/en.po", "english")
+    _write(root, "/po/fr.po", "fr")
+    os.unlink(os.path.join(root, "po/zu.po"))
+    manifest = CheckoutManifest(root, manifest_path).load()
+    assert manifest.version == 1
+    assert manifest.scan() == PathChanges(
+        added=["/po/fr.po"], modified=["/po/en.po"], removed=["/po/zu.po"])
+    # only the paths given are checked
+    _write(root, "/po/zu.po", "zulu")
+    _write(root, "/po/de.po", "de")
+    assert manifest.update(["/po/zu.po"]) == PathChanges(added=["/po/zu.po"])
+    assert manifest.version == 3
+    # unchanged paths do not make a new version
+    assert not manifest.update(["/po/zu.po"])
+    assert manifest.version == 3
+    manifest.save()
+
+    manifest = CheckoutManifest(root, manifest_path).load()
+    assert manifest.changes_since(3) == PathChanges()
+    assert manifest.changes_since(1) == PathChanges(
+        added=["/po/fr.po"], modified=["/po/en.po", "/po/zu.po"])
+    assert manifest.changes_since(0) is None
+    assert manifest.changes_since(4) is None
+    manifest.changes = manifest.changes[-1:]
+    assert manifest.changes_since(1) is None
+
+    manifest.clear()
+    assert not os.path.exists(manifest_path)
+    assert manifest.version == 0
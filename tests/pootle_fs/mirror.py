@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+import pytest
+
+from pootle_fs.manifest import PathChanges, scan_files
+from pootle_fs.mirror import mirror_paths
+
+
+def _write(root, path, content):
+    file_path = os.path.join(root, path.strip("/"))
+    if not os.path.exists(os.path.dirname(file_path)):
+        os.makedirs(os.path.dirname(file_path))
+    with open(file_path, "w") as f:
+        f.write(content)
+
+
+def _same_file(source, target, path):
+    return (
+        os.stat(os.path.join(source, path.strip("/"))).st_ino
+        == os.stat(os.path.join(target, path.strip("/"))).st_ino)
+
+
+@pytest.mark.django
+def test_mirror_paths(tmpdir):
+    source = os.path.join(str(tmpdir), "source")
+    target = os.path.join(str(tmpdir), "target")
+    _write(source, "/po/en.po", "en")
+    _write(source, "/po/zu.po", "zu")
+    _write(source, "/.pootle.ini", "[default]")
+    assert (
+        mirror_paths(source, target)
+        == PathChanges(added=["/.pootle.ini", "/po/en.po", "/po/zu.po"]))
+    assert sorted(scan_files(source)) == sorted(scan_files(target))
+    # nothing has changed
+    assert not mirror_paths(source, target)
+
+    _write(source, "/po/en.po", "english")
+    _write(source, "/po/fr.po", "fr")
+    os.unlink(os.path.join(source, "po/zu.po"))
+    _write(target, "/other/de.po", "de")
+
+    # only the paths given are mirrored
+    assert (
+        mirror_paths(source, target, ["/po/en.po", "/po/zu.po"])
+        == PathChanges(modified=["/po/en.po"], removed=["/po/zu.po"]))
+    with open(os.path.join(target, "po/en.po")) as f:
+        assert f.read() == "english"
+    assert not os.path.exists(os.path.join(target, "po/fr.po"))
+
+    # empty directories are removed
+    assert (
+        mirror_paths(source, target)
+        == PathChanges(added=["/po/fr.po"], removed=["/other/de.po"]))
+    assert not os.path.exists(os.path.join(target, "other"))
+    assert sorted(scan_files(source)) == sorted(scan_files(target))
+
+
+@pytest.mark.django
+def test_mirror_paths_no_prune(tmpdir):
+    source = os.path.join(str(tmpdir), "source")
+    target = os.path.join(str(tmpdir), "target")
+    _write(source, "/po/en.po", "en")
+    _write(target, "/po/en.po", "old")
+    _write(target, "/po/zu.po", "zu")
+    _write(source, "/po/xx.po", "xx")
+
+    # files are added and updated, but never removed from target
+    assert (
+        mirror_paths(
+            source, target, prune=False,
+            include=lambda path: path != "/po/xx.po")
+        == PathChanges(modified=["/po/en.po"]))
+    with open(os.path.join(target, "po/zu.po")) as f:
+        assert f.read() == "zu"
+    assert not os.path.exists(os.path.join(target, "po/xx.po"))
+    assert not mirror_paths(source, target, ["/po/zu.po"], prune=False)
+    assert os.path.exists(os.path.join(target, "po/zu.po"))
+
+
+@pytest.mark.django
+def test_mirror_paths_link(tmpdir):
+    source = os.path.join(str(tmpdir), "source")
+    target = os.path.join(str(tmpdir), "target")
+    _write(source, "/po/en.po", "en")
+    _write(target, "/po/en.po", "en")
+    assert not _same_file(source, target, "/po/en.po")
+
+    # the content is the same, so the file is linked but not changed
+    assert not mirror_paths(source, target, link=True)
+    assert _same_file(source, target, "/po/en.po")
+
+    # replaced files are linked
+    _write(source, "/po/zu.po", "zu")
+    os.unlink(os.path.join(source, "po/en.po"))
+    _write(source, "/po/en.po", "english")
+    assert (
+        mirror_paths(source, target, link=True)
+        == PathChanges(added=["/po/zu.po"], modified=["/po/en.po"]))
+    assert _same_file(source, target, "/po/en.po")
+    assert _same_file(source, target, "/po/zu.po")
+    assert not mirror_paths(source, target, link=True)
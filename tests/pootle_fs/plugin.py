@@ -11,12 +11,16 @@ import os
 import pytest
 from ConfigParser import ConfigParser
 
+from django.db.models import F
+
 from pootle_fs_pytest.suite import (
     run_fetch_test, run_add_test, run_rm_test, run_merge_test)
-from pootle_fs_pytest.utils import _edit_file
+from pootle_fs_pytest.utils import _edit_file, _remove_file
 
+from pootle_fs.files import FSFile
 from pootle_fs.language import LanguageMapper
-from pootle_fs.models import ProjectFS
+from pootle_fs.manifest import PathChanges
+from pootle_fs.models import ProjectFS, StoreFS
 
 
 TEST_LANG_MAPPING = """
@@ -57,9 +61,14 @@ def test_plugin_instance(fs_plugin):
     assert fs_plugin.stores.exists() is False
     assert fs_plugin.translations.exists() is False
 
-    # any instance of the same plugin is equal
+    # the plugin instance is shared between ProjectFS objects
     new_plugin = ProjectFS.objects.get(project=fs_plugin.project).plugin
     assert fs_plugin == new_plugin
+    assert fs_plugin is new_plugin
+
+    # any instance of the same plugin is equal
+    new_plugin = fs_plugin.__class__(fs_plugin.fs)
+    assert fs_plugin == new_plugin
     assert fs_plugin is not new_plugin
 
     # but the plugin doesnt equate to a cabbage 8)
@@ -224,6 +233,79 @@ def test_plugin_language_mapper_bad(fs_plugin_suite, zulu):
     assert plugin.lang_mapper["zu"] == zulu
 
 
+@pytest.mark.django
+def test_plugin_sync_failed_file(fs_plugin_suite, monkeypatch):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    pulled = status["fs_ahead"] + status["fs_added"]
+    failing = pulled[0].pootle_path
+    _pull = FSFile.pull
+
+    def _failing_pull(fs_file):
+        if fs_file.pootle_path == failing:
+            raise ValueError("Bad file")
+        return _pull(fs_file)
+
+    monkeypatch.setattr(FSFile, "pull", _failing_pull)
+    response = plugin.sync_translations(chunk_size=1)
+    assert response.has_failed
+    failed = list(response.failed())
+    assert [x.pootle_path for x in failed] == [failing]
+    assert failed[0].action_type == "pulled_to_pootle"
+    assert failed[0].msg == "Bad file"
+    assert (
+        len(list(response.completed("pulled_to_pootle")))
+        == len(pulled) - 1)
+
+    # the failed file is still waiting to be synced
+    monkeypatch.undo()
+    status = plugin.status()
+    assert (
+        [x.pootle_path for x in status["fs_ahead"] + status["fs_added"]]
+        == [failing])
+
+
+@pytest.mark.django
+def test_plugin_sync_conflicting_file(fs_plugin_suite):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    conflicting = status["fs_ahead"][0]
+    # another worker syncs the file after the status was loaded
+    StoreFS.objects.filter(pk=conflicting.store_fs.pk).update(
+        version=F("version") + 1)
+    response = plugin.sync_translations(status=status)
+    failed = list(response.failed())
+    assert [x.pootle_path for x in failed] == [conflicting.pootle_path]
+    assert "another worker" in failed[0].msg
+    assert len(list(response.completed("pulled_to_pootle"))) == (
+        len(status["fs_ahead"] + status["fs_added"]) - 1)
+
+
+@pytest.mark.django
+def test_plugin_sync_failed_action_version(fs_plugin_suite, monkeypatch):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    fs_status = status["fs_ahead"][0]
+    store_fs = fs_status.store_fs
+    version = store_fs.version
+
+    def _failing_save(*args):
+        raise ValueError("Failed saving snapshot")
+
+    # the action fails after the StoreFS was saved
+    monkeypatch.setattr(plugin.snapshots, "save", _failing_save)
+    response = plugin.sync_translations(status=status)
+    assert (
+        fs_status.pootle_path
+        in [x.pootle_path for x in response.failed()])
+
+    # the save was rolled back, and the StoreFS can still be saved
+    assert store_fs.version == version
+    assert StoreFS.objects.get(pk=store_fs.pk).version == version
+    store_fs.save()
+    assert StoreFS.objects.get(pk=store_fs.pk).version == version + 1
+
+
 # Parametrized ADD
 @pytest.mark.django_db(transaction=True)
 def test_plugin_add(fs_plugin_suite, add_translations):
@@ -257,3 +339,137 @@ def test_plugin_merge_pootle(fs_plugin_suite, merge_translations):
         fs_plugin_suite,
         pootle_wins=True,
         **merge_translations)
+
+
+@pytest.mark.django
+def test_plugin_status_max_age(fs_plugin, monkeypatch):
+    plugin = fs_plugin
+    pulls = []
+    _pull = plugin.pull
+
+    def _counted_pull():
+        pulls.append(plugin.project.code)
+        return _pull()
+
+    monkeypatch.setattr(plugin, "pull", _counted_pull)
+    assert plugin.pulled_at is None
+    assert plugin.pull_age is None
+
+    # not yet pulled so it is pulled anyway
+    status = plugin.status(max_age=3600)
+    assert len(pulls) == 1
+    assert plugin.pulled_at is not None
+    assert 0 <= status.age < 3600
+
+    status = plugin.status(max_age=3600)
+    assert len(pulls) == 1
+    assert status.age is not None
+    plugin.status_counts(max_age=3600)
+    assert len(pulls) == 1
+
+    # without max_age it is always pulled
+    plugin.status()
+    assert len(pulls) == 2
+    plugin.fetch_translations(max_age=3600)
+    assert len(pulls) == 2
+
+    plugin.clear_repo()
+    assert plugin.pulled_at is None
+    plugin.status(max_age=float("inf"))
+    assert len(pulls) == 3
+
+
+@pytest.mark.django
+def test_plugin_pull_changes(fs_plugin_synced, monkeypatch):
+    plugin = fs_plugin_synced
+    plugin.refresh()
+    version = plugin.checkout_manifest.version
+    assert version
+    translations = sorted(plugin.find_translations())
+    plugin.refresh()
+    assert plugin.checkout_manifest.changes_since(version) == PathChanges()
+
+    _edit_file(plugin, "/gnu_style/po/zu.po")
+    _edit_file(plugin, "/non_gnu_style/locales/en/foo/bar/baz.po")
+    _remove_file(plugin, "/gnu_style/po/en.po")
+    plugin.refresh()
+    assert plugin.checkout_manifest.version > version
+    assert (
+        plugin.checkout_manifest.changes_since(version)
+        == PathChanges(
+            added=["/non_gnu_style/locales/en/foo/bar/baz.po"],
+            modified=["/gnu_style/po/zu.po"],
+            removed=["/gnu_style/po/en.po"]))
+
+    # only the changed paths are matched, the checkout is not walked
+    walked = []
+    _find = plugin.finder_class.find
+
+    def _spy_find(finder):
+        walked.append(finder.translation_path)
+        return _find(finder)
+
+    monkeypatch.setattr(plugin.finder_class, "find", _spy_find)
+    found = sorted(plugin.find_translations())
+    assert not walked
+    assert found != translations
+    assert "/gnu_style/po/en.po" not in [path for __, path in found]
+    assert (
+        "/non_gnu_style/locales/en/foo/bar/baz.po"
+        in [path for __, path in found])
+
+    # and the result is the same as walking the checkout
+    plugin.clear_repo()
+    plugin.refresh()
+    assert plugin.checkout_manifest.changes_since(version) is None
+    assert sorted(plugin.find_translations()) == found
+    assert walked
+
+
+@pytest.mark.django
+def test_plugin_push_paths(fs_plugin_suite, monkeypatch):
+    plugin = fs_plugin_suite
+    pushed = []
+    _push = plugin.push
+
+    def _spy_push(response=None, paths=None):
+        pushed.append(paths)
+        return _push(response, paths=paths)
+
+    monkeypatch.setattr(plugin, "push", _spy_push)
+    response = plugin.sync_translations()
+    assert len(pushed) == 1
+    paths = pushed[0]
+    assert paths.modified == set(
+        x.fs_path for x in response.completed(
+            "pushed_to_fs", "merged_from_fs", "merged_from_pootle"))
+    assert paths.modified
+    assert paths.removed == set(
+        x.fs_path for x in response.completed("removed"))
+    assert not paths.added
+
+    # the pushed files were mirrored to the FS
+    for path in paths.modified:
+        with open(os.path.join(plugin.fs.url, path.strip("/"))) as f:
+            assert f.read() == plugin.read(path.strip("/"))
+    for path in paths.removed:
+        assert not os.path.exists(
+            os.path.join(plugin.fs.url, path.strip("/")))
+
+
+@pytest.mark.django
+def test_plugin_push_legacy(fs_plugin_suite, monkeypatch):
+    plugin = fs_plugin_suite
+    pushed = []
+
+    class LegacyPlugin(plugin.__class__):
+
+        def push(self, response):
+            pushed.append(response)
+            return response
+
+    # plugins written before push took paths still work
+    monkeypatch.setattr(plugin, "__class__", LegacyPlugin)
+    response = plugin.sync_translations()
+    assert pushed == [response]
+    assert not response.has_failed
@@ -12,6 +12,7 @@ import pytest
 from pootle_fs_pytest.utils import _clear_plugins
 
 from pootle_fs import Plugin, plugins
+from pootle_fs.models import ProjectFS, StoreFS
 
 
 @pytest.mark.django
@@ -25,3 +26,48 @@ def test_register_plugin():
 
     assert "example" in plugins
     assert plugins["example"] == ExamplePlugin
+
+
+@pytest.mark.django
+def test_plugin_instances_shared(fs_plugin):
+    fs_plugin.fetch_translations()
+    project_fs = ProjectFS.objects.get(pk=fs_plugin.fs.pk)
+    assert project_fs is not fs_plugin.fs
+    assert project_fs.plugin is fs_plugin
+    # the shared instance keeps its own ProjectFS
+    assert fs_plugin.fs is not project_fs
+    store_fses = StoreFS.objects.filter(project=fs_plugin.project)
+    assert store_fses.exists()
+    for store_fs in store_fses:
+        assert store_fs.fs.plugin is fs_plugin
+    with fs_plugin.identity_map():
+        for store_fs in StoreFS.objects.filter(project=fs_plugin.project):
+            assert store_fs.fs is fs_plugin.fs
+
+
+@pytest.mark.django
+def test_plugin_instances_invalidated(fs_plugin):
+    fs_plugin.read_config()
+    project_fs = ProjectFS.objects.get(pk=fs_plugin.fs.pk)
+
+    # changing the url gives a new plugin
+    project_fs.url = "%s_changed" % project_fs.url
+    project_fs.save()
+    plugin = ProjectFS.objects.get(pk=fs_plugin.fs.pk).plugin
+    assert plugin is not fs_plugin
+    assert plugin.fs.url == project_fs.url
+
+    # as does a change of config
+    project_fs = ProjectFS.objects.get(pk=fs_plugin.fs.pk)
+    project_fs.current_config = None
+    project_fs.save()
+    assert ProjectFS.objects.get(pk=fs_plugin.fs.pk).plugin is not plugin
+
+    # or re-registering the plugin class
+    plugin = ProjectFS.objects.get(pk=fs_plugin.fs.pk).plugin
+    plugins.register(plugin.__class__)
+    assert ProjectFS.objects.get(pk=fs_plugin.fs.pk).plugin is not plugin
+
+    plugin = ProjectFS.objects.get(pk=fs_plugin.fs.pk).plugin
+    plugins.clear_instances(plugin.fs)
+    assert ProjectFS.objects.get(pk=fs_plugin.fs.pk).plugin is not plugin
@@ -227,3 +227,58 @@ def test_response_arg(fs_plugin_suite):
 
     new_response = plugin.sync_translations(response=response)
     assert response is new_response
+
+
+@pytest.mark.django
+def test_action_response_store_fs(fs_plugin):
+    response = fs_plugin.fetch_translations()
+    fetched = list(response.completed("fetched_from_fs"))
+    assert fetched
+    for action in fetched:
+        assert action.original_status.store_fs is None
+        assert not hasattr(action, "__dict__")
+        store_fs = action.store_fs
+        assert isinstance(store_fs, StoreFS)
+        assert store_fs.pootle_path == action.pootle_path
+        assert store_fs.path == action.fs_path
+        assert action.store_fs is store_fs
+
+
+@pytest.mark.django
+def test_action_response_counts(fs_plugin):
+    response = ActionResponse(fs_plugin)
+    status = fs_plugin.status()
+    assert len(response) == 0
+    assert response.count_completed() == 0
+
+    for i, fs_status in enumerate(status["fs_untracked"]):
+        response.add("fetched_from_fs", fs_status, complete=bool(i % 2))
+    response.add("added_from_pootle", status["fs_untracked"][0])
+    assert len(response) == 2
+    assert response.count_completed() == 10
+    assert response.count_completed("fetched_from_fs") == 9
+    assert response.count_failed("fetched_from_fs") == 9
+    assert response.count_failed("added_from_pootle") == 0
+    assert (
+        response.get_action_title("fetched_from_fs")
+        == "Fetched from filesystem (9)")
+    assert (
+        response.get_action_title("added_from_pootle")
+        == "Added from Pootle (1)")
+    assert (
+        response.get_action_title("fetched_from_fs", failures=True)
+        == "Fetched from filesystem (9)")
+
+    for action in response.failed("fetched_from_fs"):
+        action.complete = True
+    assert response.count_completed("fetched_from_fs") == 18
+    assert response.count_failed() == 0
+    assert not response.has_failed
+
+    action = response["added_from_pootle"][0]
+    action.complete = False
+    action.complete = False
+    assert response.count_failed("added_from_pootle") == 1
+    assert response.count_completed() == 18
+    assert list(response.failed()) == [action]
+    assert response.has_failed
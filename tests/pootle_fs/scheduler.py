@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from pootle_fs_pytest.utils import _update_store
+
+from pootle_fs.scheduler import FETCH, PUSH, Scheduler
+
+
+@pytest.mark.django
+def test_scheduler_load_projects(fs_plugin):
+    fs = fs_plugin.fs
+    code = fs.project.code
+    scheduler = Scheduler(max_jobs=1)
+    assert scheduler.load_projects(now=1000) == {}
+
+    fs.fetch_frequency = 60
+    fs.save()
+    assert scheduler.load_projects(now=1000) == {(code, FETCH): 60}
+    # the first run is within the jitter of the interval
+    assert scheduler.get_due_jobs(now=1000 + 60 * scheduler.jitter) == [
+        (code, FETCH)]
+    scheduler.running.add(code)
+    assert scheduler.get_due_jobs(now=2000) == []
+    scheduler.running.discard(code)
+
+    fs.enabled = False
+    fs.save()
+    assert scheduler.load_projects(now=1000) == {}
+    assert scheduler.get_due_jobs(now=2000) == []
+
+
+@pytest.mark.django
+def test_scheduler_run_job(fs_plugin_suite):
+    plugin = fs_plugin_suite
+    code = plugin.project.code
+    scheduler = Scheduler(max_jobs=1)
+    assert scheduler.run_job(code, FETCH) == "synced"
+    # neither the FS nor Pootle have changed
+    assert scheduler.run_job(code, FETCH) == "skipped"
+    assert scheduler.run_job(code, PUSH) == "skipped"
+
+    store_fs = plugin.translations.filter(
+        last_sync_hash__isnull=False).first()
+    _update_store(plugin, store_fs.pootle_path)
+    assert scheduler.run_job(code, PUSH) == "synced"
+    assert scheduler.run_job(code, PUSH) == "skipped"
+
+
+@pytest.mark.django
+def test_scheduler_push_add_stores(fs_plugin_suite):
+    plugin = fs_plugin_suite
+    code = plugin.project.code
+    untracked = [
+        x.pootle_path for x in plugin.status()["pootle_untracked"]]
+    assert untracked
+
+    # push jobs only add new Stores if asked to
+    assert Scheduler(max_jobs=1).run_job(code, PUSH) == "synced"
+    assert (
+        [x.pootle_path for x in plugin.status()["pootle_untracked"]]
+        == untracked)
+    assert (
+        Scheduler(max_jobs=1, add_stores=True).run_job(code, PUSH)
+        == "synced")
+    assert not plugin.status()["pootle_untracked"]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+
+import pytest
+
+from pootle.core.models import Revision
+
+from pootle_fs.models import StoreFS
+from pootle_fs.snapshots import SnapshotStore
+
+from pootle_fs_pytest.utils import _edit_file
+
+
+@pytest.mark.django
+def test_snapshots_on_sync(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    assert isinstance(plugin.snapshots, SnapshotStore)
+    for store_fs in plugin.translations:
+        assert (store_fs, store_fs.last_sync_hash) in plugin.snapshots
+        assert plugin.snapshots.get(store_fs) == store_fs.file.read()
+
+
+@pytest.mark.django
+def test_snapshots_retention(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    first_hash = store_fs.last_sync_hash
+    first_content = store_fs.file.read()
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    plugin.sync_translations()
+    store_fs = StoreFS.objects.get(pk=store_fs.pk)
+    assert store_fs.last_sync_hash != first_hash
+
+    # the previous snapshot is kept and can be read by hash
+    assert plugin.snapshots.get(store_fs, first_hash) == first_content
+    assert plugin.snapshots.get(store_fs) == store_fs.file.read()
+    assert store_fs.file.base_store.units[-1].source.startswith("PO Update")
+
+    plugin.snapshots.retention = 1
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    plugin.sync_translations()
+    store_fs = StoreFS.objects.get(pk=store_fs.pk)
+    assert os.listdir(plugin.snapshots.get_store_fs_path(store_fs)) == [
+        os.path.basename(
+            plugin.snapshots.get_path(store_fs, store_fs.last_sync_hash))]
+    assert plugin.snapshots.get(store_fs, first_hash) is None
+
+
+@pytest.mark.django
+def test_snapshots_merge(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    unit = store_fs.store.units.get(unitid="Hello, world")
+    unit.target = "Hello, world from Pootle"
+    unit.revision = Revision.incr()
+    unit.save()
+    _edit_file(plugin, "/gnu_style/po/en.po")
+    status = plugin.status()
+    assert (
+        [x.fs_path for x in status["conflict"]]
+        == ["/gnu_style/po/en.po"])
+
+    # the unit was not changed in the file since the last sync, so it keeps
+    # the translation from Pootle even though the FS wins
+    plugin.merge_translations()
+    plugin.sync_translations()
+    store_fs = StoreFS.objects.get(pk=store_fs.pk)
+    assert (
+        store_fs.store.units.get(unitid="Hello, world").target
+        == "Hello, world from Pootle")
+    assert store_fs.store.units.filter(
+        unitid__startswith="PO Update").exists()
+    assert "Hello, world from Pootle" in store_fs.file.read()
+    assert plugin.snapshots.get(store_fs) == store_fs.file.read()
+
+
+@pytest.mark.django
+def test_snapshots_removed(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    store_fs = plugin.translations.get(path="/gnu_style/po/en.po")
+    snapshot_path = plugin.snapshots.get_store_fs_path(store_fs)
+    assert os.path.exists(snapshot_path)
+    os.unlink(os.path.join(plugin.fs.url, "gnu_style/po/en.po"))
+    plugin.rm_translations()
+    plugin.sync_translations()
+    assert not os.path.exists(snapshot_path)
+
+
+@pytest.mark.django
+def test_snapshots_disabled(fs_plugin, settings):
+    settings.POOTLE_FS_SNAPSHOT_RETENTION = 0
+    fs_plugin.fetch_translations()
+    fs_plugin.sync_translations()
+    assert not fs_plugin.snapshots.enabled
+    assert not os.path.exists(fs_plugin.snapshots.path)
+
+
+@pytest.mark.django
+def test_snapshots_clear_repo(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    assert os.path.exists(plugin.snapshots.path)
+    plugin.clear_repo()
+    assert not os.path.exists(plugin.snapshots.path)
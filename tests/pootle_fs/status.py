@@ -10,8 +10,10 @@ import pytest
 
 from pootle_store.models import Store
 
+from pootle_fs.identity import IdentityMap, get_identity_map
 from pootle_fs.models import StoreFS
-from pootle_fs.status import ProjectFSStatus, Status
+from pootle_fs.status import (
+    FS_STATUS, ProjectFSStatus, ProjectFSStatusCounts, Status)
 
 from pootle_fs_pytest.utils import (
     STATUS_TYPES, _test_status, _edit_file)
@@ -145,3 +147,104 @@ def test_status(fs_status):
     plugin, cb, outcome = fs_status
     cb(plugin)
     _test_status(plugin, outcome)
+
+
+@pytest.mark.django
+def test_status_compact(fs_plugin_synced):
+    plugin = fs_plugin_synced
+    for store_fs in plugin.translations.all()[:5]:
+        _edit_file(plugin, store_fs.path)
+    status = plugin.status()
+    fs_ahead = status["fs_ahead"]
+    assert fs_ahead
+    for fs_status in fs_ahead:
+        assert not hasattr(fs_status, "__dict__")
+        assert fs_status.loader is status.loader
+        assert fs_status.plugin is plugin
+        assert fs_status.project is plugin.project
+
+    # the StoreFS and Store instances are loaded together
+    store_fses = [fs_status.store_fs for fs_status in fs_ahead]
+    assert all(isinstance(store_fs, StoreFS) for store_fs in store_fses)
+    assert (
+        [store_fs.pootle_path for store_fs in store_fses]
+        == [fs_status.pootle_path for fs_status in fs_ahead])
+    assert all(
+        fs_status.store_fs is store_fs
+        for fs_status, store_fs in zip(fs_ahead, store_fses))
+    assert all(
+        fs_status.store == fs_status.store_fs.store
+        for fs_status in fs_ahead)
+
+
+# Parametrized: PLUGIN_STATUS
+@pytest.mark.django
+def test_status_counts(fs_status):
+    plugin, cb, outcome = fs_status
+    cb(plugin)
+    for kwargs in [{}, dict(pootle_path="/en/*"), dict(fs_path="*/po/*")]:
+        status = plugin.status(**kwargs)
+        counts = plugin.status_counts(**kwargs)
+        assert isinstance(counts, ProjectFSStatusCounts)
+        assert (
+            {k: counts[k] for k in FS_STATUS}
+            == {k: len(status[k]) for k in FS_STATUS})
+        assert list(counts) == list(status)
+        assert counts.has_changed == status.has_changed
+
+
+@pytest.mark.django
+def test_status_lazy(fs_plugin_suite):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    assert status.__status__ == {}
+    fs_untracked = status["fs_untracked"]
+    assert status.__status__.keys() == ["fs_untracked"]
+    assert status["fs_untracked"] is fs_untracked
+
+    plugin.fetch_translations(status=status)
+    assert status.__status__.keys() == ["fs_untracked"]
+    status = plugin.status()
+    plugin.fetch_translations(status=status, force=True)
+    assert (
+        sorted(status.__status__.keys())
+        == ["conflict", "conflict_untracked", "fs_untracked",
+            "pootle_removed"])
+
+    # all of the status types are checked when the status is listed
+    status = plugin.status()
+    assert list(status) == [k for k in FS_STATUS if status[k]]
+    assert sorted(status.__status__.keys()) == sorted(FS_STATUS.keys())
+    with pytest.raises(KeyError):
+        status["not_a_status"]
+
+
+@pytest.mark.django
+def test_status_lazy_identity_map(fs_plugin_suite, monkeypatch):
+    plugin = fs_plugin_suite
+    status = plugin.status()
+    assert isinstance(status.identities, IdentityMap)
+    assert get_identity_map() is None
+    identities = []
+    get_conflict = status.get_conflict
+
+    def _get_conflict():
+        identities.append(get_identity_map())
+        return get_conflict()
+
+    monkeypatch.setattr(status, "get_conflict", _get_conflict)
+    # status types checked after the status was created use its identity map
+    assert status["conflict"]
+    assert identities == [status.identities]
+    assert get_identity_map() is None
+
+    # each status has its own caches
+    other = plugin.status()
+    other["conflict"]
+    assert status.__changes__
+    other_identities = other.identities
+    other.check_status()
+    assert not other.__changes__
+    assert status.__changes__
+    # Stores added since the status was created are looked up again
+    assert other.identities is not other_identities
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from django.core.management import CommandError
+
+from pootle_fs.worker import create_server, run_command, send_command
+
+
+@pytest.mark.django
+def test_worker_run_command(fs_plugin):
+    code = fs_plugin.project.code
+    exit_code, out, err = run_command([code, "info"])
+    assert exit_code == 0
+    assert "URL: %s" % fs_plugin.fs.url in out
+    assert not err
+
+    exit_code, out, err = run_command(["BAD_PROJECT_CODE"])
+    assert exit_code == 1
+    assert err == "CommandError: Unrecognised project: BAD_PROJECT_CODE\n"
+
+    # the worker does not run itself, or commands for many projects
+    for argv in (["worker"], ["--all", "status"], ["*", "status"]):
+        exit_code, out, err = run_command(argv)
+        assert exit_code == 1
+        assert err.startswith("CommandError: Only commands for a single")
+
+    # options that change the process are ignored
+    environ = dict(os.environ)
+    path = list(sys.path)
+    exit_code, out, err = run_command(
+        [code, "info", "--no-color", "--pythonpath=/tmp",
+         "--settings", "not.a.settings.module"])
+    assert exit_code == 0
+    assert dict(os.environ) == environ
+    assert sys.path == path
+
+
+@pytest.mark.django
+def test_worker_project_lock(monkeypatch):
+    from pootle_fs.management.commands.fs import Command
+
+    running = []
+    overlapped = []
+
+    def _run_argv(command, argv, **kwargs):
+        if argv[2] in running:
+            overlapped.append(argv[2])
+        running.append(argv[2])
+        time.sleep(0.05)
+        running.remove(argv[2])
+
+    monkeypatch.setattr(Command, "run_argv", _run_argv)
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda argv: results.append(run_command(argv)),
+            args=([code, "status"], ))
+        for code in ("project0", "project0", "project1", "project1")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [result[0] for result in results] == [0, 0, 0, 0]
+    # commands for the same project do not run at the same time
+    assert overlapped == []
+
+
+@pytest.mark.django
+def test_worker_socket(tmpdir, settings):
+    from pootle_fs.management.commands.fs import Command
+
+    socket_path = os.path.join(str(tmpdir), "worker.sock")
+    settings.POOTLE_FS_WORKER_SOCKET = socket_path
+    argv = ["pootle", "fs", "scheduler", "--once"]
+    # there is no worker to forward to
+    assert not Command().forward_to_worker(["pootle", "fs"])
+
+    server = create_server(socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        with pytest.raises(CommandError):
+            create_server(socket_path)
+        exit_code, out, err = send_command(socket_path, argv[2:])
+        assert exit_code == 1
+        assert err.startswith("CommandError: ")
+        # global subcommands are not forwarded
+        assert not Command().forward_to_worker(argv)
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+    assert not os.path.exists(socket_path)
+
+    # a socket left by a worker that did not shut down is replaced
+    with open(socket_path, "w"):
+        pass
+    assert not Command().forward_to_worker(["pootle", "fs"])
+    create_server(socket_path).server_close()